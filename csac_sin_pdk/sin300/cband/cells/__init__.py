@@ -1,9 +1,11 @@
 """Cells."""
 
 from .rings import *
+from .ring_arrays import *
 from .couplers import *
 from .gratings import *
 from .waveguides import *
 from .cband_cs_pdk import *
 from .IO import *
 from .transitions import *
+from .loss_structures import *
@@ -0,0 +1,293 @@
+"""Propagation loss test structures: cutbacks and spirals."""
+
+from collections import Counter
+
+import gdsfactory as gf
+from gdsfactory.typings import ComponentSpec, CrossSectionSpec, Ints
+
+_ROUTE_INFO = "route_info_"
+
+
+class LengthBook:
+    """Accumulates waveguide length per cross-section from the cells it is given.
+
+    Lengths come from the ``route_info_*`` entries that the PDK straights and
+    bends write into their ``info`` from their parameters, so nothing is
+    measured from polygons.
+    """
+
+    def __init__(self) -> None:
+        """Start an empty book."""
+        self.lengths: Counter[str] = Counter()
+        self.length_straight = 0.0
+        self.length_bend = 0.0
+        self.num_bends = 0
+
+    def add(self, component: gf.Component, n: int = 1) -> None:
+        """Books ``n`` placements of ``component``."""
+        info = component.info.model_dump()
+        suffix = "_length"
+        for key, value in info.items():
+            if (
+                key.startswith(_ROUTE_INFO)
+                and key.endswith(suffix)
+                and not key.endswith("_taper_length")
+                and key != f"{_ROUTE_INFO}length"
+            ):
+                self.lengths[key[len(_ROUTE_INFO) : -len(suffix)]] += n * value
+        length = info.get("length", info.get(f"{_ROUTE_INFO}length", 0.0))
+        num_bends = int(info.get(f"{_ROUTE_INFO}n_bend_90", 0))
+        if num_bends:
+            self.num_bends += n * num_bends
+            self.length_bend += n * length
+        else:
+            self.length_straight += n * length
+
+    @property
+    def length(self) -> float:
+        """Total waveguide length in um."""
+        return self.length_straight + self.length_bend
+
+    def write_info(self, component: gf.Component) -> None:
+        """Stores the book in ``component.info`` using gdsfactory route_info keys."""
+        component.info["length"] = round(self.length, 3)
+        component.info["length_straight"] = round(self.length_straight, 3)
+        component.info["length_bend"] = round(self.length_bend, 3)
+        component.info["num_bends"] = self.num_bends
+        component.info[f"{_ROUTE_INFO}length"] = round(self.length, 3)
+        component.info[f"{_ROUTE_INFO}n_bend_90"] = self.num_bends
+        for xs, length in self.lengths.items():
+            component.info[f"{_ROUTE_INFO}{xs}_length"] = round(length, 3)
+
+
+def _chain(
+    c: gf.Component,
+    port: gf.Port,
+    segments: list[tuple[float, bool]],
+    bend: gf.Component,
+    straight: ComponentSpec,
+    cross_section: CrossSectionSpec,
+    book: LengthBook,
+) -> gf.Port:
+    """Places ``straight -> 90 deg bend`` segments and returns the last port.
+
+    Args:
+        c: component to place into.
+        port: port to start from.
+        segments: (straight length, turn left) per segment. A length of 0 skips
+            the straight and a turn of None only places the straight.
+        bend: 90 degree bend.
+        straight: straight spec.
+        cross_section: for the straights.
+        book: length book to update.
+    """
+    for length, left in segments:
+        if length > 0:
+            s = gf.get_component(straight, length=length, cross_section=cross_section)
+            ref = c << s
+            ref.connect("o1", port)
+            port = ref.ports["o2"]
+            book.add(s)
+        if left is None:
+            continue
+        ref = c << bend
+        ref.connect("o1", port, mirror=not left)
+        port = ref.ports["o2"]
+        book.add(bend)
+    return port
+
+
+def _bend_size(bend: gf.Component) -> float:
+    return abs(bend.ports["o2"].dx - bend.ports["o1"].dx)
+
+
+@gf.cell
+def cutback(
+    rows: int = 4,
+    length: float = 500.0,
+    spacing: float = 60.0,
+    bend: ComponentSpec = "bend_euler",
+    straight: ComponentSpec = "straight",
+    cross_section: CrossSectionSpec = "strip",
+) -> gf.Component:
+    """Returns a serpentine cutback of ``rows`` straights joined by U-turns.
+
+    Every U-turn reuses the same bend cell. The total length, the number of
+    bends and the length per cross-section are stored in ``info``.
+
+    Args:
+        rows: number of straight rows.
+        length: length of each row in um.
+        spacing: row pitch in um. Must be at least twice the bend size.
+        bend: 90 degree bend spec.
+        straight: straight spec.
+        cross_section: cross_section spec.
+
+    .. code::
+
+        o1 ──────────────────╮
+                             │ spacing
+           ╭─────────────────╯
+           │
+           ╰──────────────────  o2
+    """
+    if rows < 1:
+        raise ValueError(f"rows={rows} must be >= 1")
+
+    c = gf.Component()
+    book = LengthBook()
+    b = gf.get_component(bend, cross_section=cross_section)
+    dy = _bend_size(b)
+    if spacing < 2 * dy:
+        raise ValueError(f"spacing={spacing} must be >= 2 * bend size={2 * dy}")
+
+    row = gf.get_component(straight, length=length, cross_section=cross_section)
+    ref = c << row
+    book.add(row)
+    port_in = ref.ports["o1"]
+    port = ref.ports["o2"]
+    for i in range(rows - 1):
+        left = i % 2 == 1
+        port = _chain(
+            c,
+            port,
+            [(0, not left), (spacing - 2 * dy, not left), (length, None)],
+            b,
+            straight,
+            cross_section,
+            book,
+        )
+
+    c.add_port("o1", port=port_in)
+    c.add_port("o2", port=port)
+    book.write_info(c)
+    c.info["rows"] = rows
+    return c
+
+
+@gf.cell
+def cutback_ridge_assembled(
+    rows: Ints = (2, 4, 8, 16),
+    length: float = 500.0,
+    spacing: float = 60.0,
+    pitch: float = 50.0,
+    grating_coupler: ComponentSpec | None = "SiN300nm_1550nm_TE_STRIP_Grating",
+    cross_section: CrossSectionSpec = "strip",
+) -> gf.Component:
+    """Returns cutbacks of increasing length stacked for loss extraction.
+
+    Each cutback is terminated with grating couplers on both ends and its
+    length is listed in ``info['lengths']`` in the same order as ``rows``.
+
+    Args:
+        rows: rows of each cutback.
+        length: row length in um.
+        spacing: row pitch in um.
+        pitch: clearance between cutbacks in um.
+        grating_coupler: spec for the input/output gratings. None leaves the
+            cutback ports as ports of the assembly.
+        cross_section: cross_section spec.
+    """
+    c = gf.Component()
+    lengths = []
+    num_bends = []
+    y = 0.0
+    for i, n in enumerate(rows):
+        cb = cutback(rows=n, length=length, spacing=spacing, cross_section=cross_section)
+        ref = c << cb
+        ref.dmove((0, y - cb.dymin))
+        y += cb.dysize + pitch
+        lengths.append(cb.info["length"])
+        num_bends.append(cb.info["num_bends"])
+
+        if grating_coupler is None:
+            c.add_port(f"o{2 * i + 1}", port=ref.ports["o1"])
+            c.add_port(f"o{2 * i + 2}", port=ref.ports["o2"])
+            continue
+        for name in ("o1", "o2"):
+            gc = c << gf.get_component(grating_coupler)
+            gc.connect("o1", ref.ports[name])
+
+    c.info["lengths"] = lengths
+    c.info["num_bends"] = num_bends
+    return c
+
+
+@gf.cell
+def spiral(
+    num_loops: int = 3,
+    spacing: float = 5.0,
+    length_x: float = 100.0,
+    length_y: float = 0.0,
+    bend: ComponentSpec = "bend_euler",
+    straight: ComponentSpec = "straight",
+    cross_section: CrossSectionSpec = "strip",
+) -> gf.Component:
+    """Returns a rectangular double spiral delay line.
+
+    Two interleaved arms, one the 180 degree rotation of the other, spiral
+    outwards from an S-shaped centre made of two bends. All bends are the same
+    cell and the straights only depend on their length. The total length,
+    the number of bends and the length per cross-section are stored in
+    ``info``.
+
+    Args:
+        num_loops: loops per arm.
+        spacing: pitch between adjacent waveguides in um.
+        length_x: length of the innermost horizontal straight in um.
+        length_y: length of the innermost vertical straight in um.
+        bend: 90 degree bend spec.
+        straight: straight spec.
+        cross_section: cross_section spec.
+    """
+    if num_loops < 1:
+        raise ValueError(f"num_loops={num_loops} must be >= 1")
+
+    c = gf.Component()
+    b = gf.get_component(bend, cross_section=cross_section)
+    r = _bend_size(b)
+    xs = gf.get_cross_section(cross_section)
+    if spacing < xs.width:
+        raise ValueError(f"spacing={spacing} must be >= waveguide width={xs.width}")
+
+    # lane coordinates of the arm that starts at (r, r) heading east
+    x1 = 2 * r + length_x
+    y2 = 3 * r + length_y
+
+    def lane(k: int) -> float:
+        return x1 + spacing * ((k - 1) // 2) if k % 2 else y2 + spacing * ((k - 2) // 2)
+
+    num_bends = 4 * num_loops
+    segments = [(x1 - 2 * r, True), (y2 - r - 2 * r, True)]
+    segments += [(lane(k - 2) + lane(k) - 2 * r, True) for k in range(3, num_bends + 1)]
+    segments += [(2 * lane(num_bends - 1), None)]
+
+    def start_port(x: float, y: float, orientation: float) -> gf.Port:
+        return gf.Port(
+            name="o1",
+            center=(x, y),
+            orientation=orientation,
+            width=xs.width,
+            layer=gf.get_layer(xs.layer),
+            port_type="optical",
+        )
+
+    book = LengthBook()
+    _chain(c, start_port(-r, -r, 0), [(0, True), (0, False)], b, straight, cross_section, book)
+    east = _chain(c, start_port(r, r, 0), segments, b, straight, cross_section, book)
+    west = _chain(c, start_port(-r, -r, 180), segments, b, straight, cross_section, book)
+
+    c.add_port("o1", port=west)
+    c.add_port("o2", port=east)
+    book.write_info(c)
+    c.info["num_loops"] = num_loops
+    return c
+
+
+if __name__ == "__main__":
+    from csac_sin_pdk.sin300.cband import PDK
+
+    PDK.activate()
+    c = spiral()
+    print(c.info)
+    c.show()
@@ -0,0 +1,176 @@
+"""Ring resonator DOE arrays."""
+
+import itertools
+
+import gdsfactory as gf
+from gdsfactory.typings import ComponentSpec, CrossSectionSpec, Floats, LayerSpec
+
+from csac_sin_pdk.sin300.cband.tech import TECH
+
+
+def ring_label(
+    prefix: str, radius: float, gap: float, length_x: float, copy: int
+) -> str:
+    """Returns the manifest label of one ring in a :func:`ring_array`."""
+    return f"{prefix}_r{radius:g}_g{gap:g}_lx{length_x:g}_{copy}"
+
+
+@gf.cell
+def ring_single_shared(
+    gap: float = TECH.gap_strip,
+    radius: float = 30.0,
+    length_x: float = 4.0,
+    length_y: float = 0.6,
+    length_extension: float = 3.0,
+    cross_section: CrossSectionSpec = "strip",
+) -> gf.Component:
+    """Returns a single ring assembled only from shared subcells.
+
+    Same topology as :func:`ring_single`, but the coupler is not a separate
+    flattened cell: the bus is a straight placed ``gap`` below the bottom
+    straight of the ring. The four bends only depend on the radius and the
+    straights only on their length, so all rings of a sweep share them.
+
+    Args:
+        gap: gap between the bus and the ring in um.
+        radius: bend radius in um.
+        length_x: coupling length in um.
+        length_y: vertical straight length in um.
+        length_extension: bus length beyond the ring on each side in um.
+        cross_section: cross_section spec.
+    """
+    c = gf.Component()
+    xs = gf.get_cross_section(cross_section)
+    bend = gf.get_component("bend_euler", radius=radius, cross_section=cross_section)
+    dx = abs(bend.ports["o2"].dx - bend.ports["o1"].dx)
+    length_bus = length_x + 2 * dx + 2 * length_extension
+
+    bus = c << gf.get_component("straight", length=length_bus, cross_section=cross_section)
+    bus.dmove((-length_bus / 2, 0))
+
+    sx = gf.get_component("straight", length=length_x, cross_section=cross_section)
+    sy = gf.get_component("straight", length=length_y, cross_section=cross_section)
+    bottom = c << sx
+    bottom.dmove((-length_x / 2, gap + xs.width))
+
+    # right, top and left sides; the fourth bend closes onto the bottom straight
+    port = bottom.ports["o2"]
+    for straight, length in ((sy, length_y), (sx, length_x), (sy, length_y), (None, 0)):
+        b = c << bend
+        b.connect("o1", port)
+        port = b.ports["o2"]
+        if straight is not None and length > 0:
+            s = c << straight
+            s.connect("o1", port)
+            port = s.ports["o2"]
+
+    c.add_port("o1", port=bus.ports["o1"])
+    c.add_port("o2", port=bus.ports["o2"])
+    c.info["length"] = 4 * bend.info["length"] + 2 * length_x + 2 * length_y
+    return c
+
+
+@gf.cell
+def ring_array(
+    gaps: Floats = (TECH.gap_strip,),
+    radii: Floats = (30.0,),
+    lengths_x: Floats = (4.0,),
+    length_y: float = 0.6,
+    copies: int = 1,
+    ring: ComponentSpec = "ring_single_shared",
+    pitch_x: float | None = None,
+    pitch_y: float | None = None,
+    spacing: float = 20.0,
+    cross_section: CrossSectionSpec = "strip",
+    label_prefix: str = "rings",
+    layer_label: LayerSpec | None = "labels",
+) -> gf.Component:
+    """Returns an array of rings sweeping gap, radius and coupling length.
+
+    Every unique (gap, radius, length_x) combination is built once through the
+    ``ring`` cell. The default :func:`ring_single_shared` is made only of
+    bends and straights referenced by name, so each bend radius and each
+    straight length is a single subcell across the whole array. Repeated
+    copies of a ring are placed as one instance array.
+
+    Rows sweep the radius, columns sweep gap and then length_x, and copies of
+    the same ring sit next to each other along x.
+
+    Args:
+        gaps: coupler gaps in um.
+        radii: ring radii in um.
+        lengths_x: coupler lengths in um.
+        length_y: vertical straight length in um.
+        copies: number of copies of every ring.
+        ring: ring spec taking gap, radius, length_x, length_y and cross_section.
+        pitch_x: column pitch in um. Defaults to widest ring plus spacing.
+        pitch_y: row pitch in um. Defaults to tallest ring plus spacing.
+        spacing: clearance between rings when the pitch is derived.
+        cross_section: cross_section spec.
+        label_prefix: prefix of the per-ring labels used by the DOE manifest.
+        layer_label: layer for the labels. None skips labels.
+
+    .. code::
+
+        radius ▲
+               │  ◯ ◯   ◯ ◯   ◯ ◯     (copies ◯ ◯ of each gap/length_x)
+               │  ◯ ◯   ◯ ◯   ◯ ◯
+               └──────────────────► gap, length_x
+    """
+    if copies < 1:
+        raise ValueError(f"copies={copies} must be >= 1")
+
+    c = gf.Component()
+    columns = list(itertools.product(gaps, lengths_x))
+    rings = {
+        (radius, gap, length_x): gf.get_component(
+            ring,
+            gap=gap,
+            radius=radius,
+            length_x=length_x,
+            length_y=length_y,
+            cross_section=cross_section,
+        )
+        for radius in radii
+        for gap, length_x in columns
+    }
+
+    width = max(r.dxsize for r in rings.values())
+    height = max(r.dysize for r in rings.values())
+    pitch_x = pitch_x or width + spacing
+    pitch_y = pitch_y or height + spacing
+    block_x = copies * pitch_x
+
+    for row, radius in enumerate(radii):
+        for column, (gap, length_x) in enumerate(columns):
+            component = rings[(radius, gap, length_x)]
+            x0 = column * block_x - component.dxmin
+            y0 = row * pitch_y - component.dymin
+            ref = c.add_ref(
+                component,
+                columns=copies,
+                rows=1,
+                column_pitch=pitch_x,
+                row_pitch=pitch_y,
+            )
+            ref.dmove((x0, y0))
+
+            if layer_label is None:
+                continue
+            for copy in range(copies):
+                text = ring_label(label_prefix, radius, gap, length_x, copy)
+                c.add_label(text, position=(x0 + copy * pitch_x, y0), layer=layer_label)
+
+    c.info["num_rings"] = len(rings) * copies
+    c.info["num_unique_rings"] = len(rings)
+    c.info["pitch_x"] = pitch_x
+    c.info["pitch_y"] = pitch_y
+    return c
+
+
+if __name__ == "__main__":
+    from csac_sin_pdk.sin300.cband import PDK
+
+    PDK.activate()
+    c = ring_array(gaps=(0.2, 0.3, 0.4), radii=(30, 40), lengths_x=(4, 8), copies=3)
+    c.show()
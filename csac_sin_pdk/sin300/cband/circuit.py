@@ -0,0 +1,204 @@
+"""Hierarchical circuit simulation with S-matrix reuse.
+
+Flattening a chip into one SAX circuit evaluates every copy of a repeated
+MZI or ring separately. :func:`simulate_hierarchical` instead walks the
+recursive netlist bottom-up. Each unique leaf device (model and settings)
+and each unique sub-circuit (cell name, netlist and models) is evaluated
+once per wavelength grid, and the resulting S-matrices are stored in an
+:class:`SMatrixCache`. Each parent is then composed from its cached blocks
+with a sparse (KLU) backend. The recursive netlist comes from the memoised
+extractor in :mod:`csac_sin_pdk.sin300.cband.netlist`, so repeated
+simulate loops on an unchanged die reduce to cache lookups.
+
+Leaf models receive the instance settings that are not None, completed by
+the cell ``info`` (for example the length of a bend), restricted to the
+arguments the model accepts.
+
+.. code::
+
+    import numpy as np
+    from csac_sin_pdk.sin300.cband import PDK
+    from csac_sin_pdk.sin300.cband.circuit import simulate_hierarchical
+
+    PDK.activate()
+    s = simulate_hierarchical(chip, wl=np.linspace(1.5, 1.6, 201))
+    t = abs(s["o1", "o2"]) ** 2
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+from functools import partial
+from typing import Any
+
+import gdsfactory as gf
+import numpy as np
+import sax
+from kfactory.kcell import ProtoTKCell
+
+from csac_sin_pdk.sin300.cband.netlist import NetlistCache, get_netlist
+
+__all__ = ["SMatrixCache", "clear_smatrix_cache", "simulate_hierarchical"]
+
+
+def _hash(value: Any) -> str:
+    text = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def _parameters(model: Callable[..., Any]) -> set[str]:
+    """Returns the keyword arguments a model accepts."""
+    func = model
+    while isinstance(func, partial):
+        func = func.func
+    return set(inspect.signature(func).parameters) | set(
+        getattr(model, "keywords", {})
+    )
+
+
+def _model_key(model: Callable[..., Any]) -> str:
+    """Returns the identity of a model, with the keywords of partials.
+
+    The repr of a function holds its address, so two models with the same
+    name are told apart for as long as they are alive.
+    """
+    return _hash(repr(model))
+
+
+def _constant(sdict: sax.SDict) -> Callable[[], sax.SDict]:
+    def model() -> sax.SDict:
+        return sdict
+
+    return model
+
+
+class SMatrixCache:
+    """S-matrices of leaf devices and sub-circuits, per wavelength grid.
+
+    Args:
+        max_entries: least recently used S-matrices beyond this are dropped.
+    """
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        """Create an empty cache."""
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._sdicts: OrderedDict[tuple[str, ...], sax.SDict] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Number of cached S-matrices."""
+        return len(self._sdicts)
+
+    def clear(self) -> None:
+        """Drops all entries and resets the counters."""
+        self._sdicts.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, key: tuple[str, ...], evaluate: Callable[[], sax.SDict]
+    ) -> sax.SDict:
+        """Returns the cached S-matrix of a key, evaluating it on a miss."""
+        sdict = self._sdicts.get(key)
+        if sdict is not None:
+            self._sdicts.move_to_end(key)
+            self.hits += 1
+            return sdict
+        self.misses += 1
+        sdict = evaluate()
+        self._sdicts[key] = sdict
+        while len(self._sdicts) > self.max_entries:
+            self._sdicts.popitem(last=False)
+        return sdict
+
+
+_cache = SMatrixCache()
+
+
+def clear_smatrix_cache() -> None:
+    """Drops all entries of the shared S-matrix cache."""
+    _cache.clear()
+
+
+def simulate_hierarchical(
+    component: ProtoTKCell,
+    wl: float | np.ndarray = 1.55,
+    models: Mapping[str, Callable[..., sax.SDict]] | None = None,
+    backend: str = "klu",
+    cache: SMatrixCache | None = None,
+    netlist_cache: NetlistCache | None = None,
+) -> sax.SDict:
+    """Returns the S-matrix of a component, reusing repeated blocks.
+
+    Args:
+        component: component to simulate.
+        wl: wavelengths in um.
+        models: model of every leaf component. Defaults to the active PDK models.
+        backend: SAX backend composing each level.
+        cache: S-matrix cache. Defaults to a cache shared by all calls.
+        netlist_cache: netlist cache. Defaults to the shared netlist cache.
+
+    Raises:
+        ValueError: if a leaf component has no model.
+    """
+    cache = _cache if cache is None else cache
+    models = gf.get_active_pdk().models if models is None else models
+    wl = np.asarray(wl, dtype=float)
+    grid = hashlib.sha256(wl.tobytes() + str(wl.shape).encode()).hexdigest()[:16]
+    netlists = get_netlist(component, recursive=True, cache=netlist_cache)
+    if not netlists:
+        raise ValueError(f"{component.name!r} has no instances to simulate.")
+
+    blocks: dict[str, tuple[str, sax.SDict]] = {}
+    models_key = _hash({name: _model_key(model) for name, model in models.items()})
+
+    def leaf(
+        name: str, settings: dict[str, Any], info: dict[str, Any]
+    ) -> tuple[str, sax.SDict]:
+        if name not in models:
+            raise ValueError(f"No model for {name!r}. Available: {sorted(models)}.")
+        model = models[name]
+        accepted = _parameters(model) - {"wl"}
+        given = {**info, **{k: v for k, v in settings.items() if v is not None}}
+        kwargs = {k: v for k, v in given.items() if k in accepted}
+        key = ("leaf", name, _model_key(model), _hash(kwargs), grid)
+        return f"m{_hash(key)}", cache.get(key, lambda: model(wl=wl, **kwargs))
+
+    def block(name: str) -> tuple[str, sax.SDict]:
+        if name in blocks:
+            return blocks[name]
+        netlist = netlists[name]
+        instances = {}
+        parts: dict[str, Callable[[], sax.SDict]] = {}
+        for inst_name, inst in netlist["instances"].items():
+            child = inst["component"]
+            if child in netlists:
+                part, sdict = block(child)
+            else:
+                settings = inst.get("settings") or {}
+                part, sdict = leaf(child, settings, inst.get("info") or {})
+            parts[part] = _constant(sdict)
+            instances[inst_name] = {"component": part}
+
+        def evaluate() -> sax.SDict:
+            circuit, _ = sax.circuit(
+                {
+                    "instances": instances,
+                    "nets": netlist.get("nets", []),
+                    "ports": netlist["ports"],
+                },
+                models=parts,
+                backend=backend,
+            )
+            return circuit()
+
+        key = ("block", name, _hash(netlist), models_key, backend, grid)
+        blocks[name] = (f"m{_hash(key)}", cache.get(key, evaluate))
+        return blocks[name]
+
+    return block(component.name)[1]
@@ -0,0 +1,355 @@
+"""Geometry deduplication of equivalent cells.
+
+Different factories (or parameter sets that only differ in unused arguments)
+can produce identical geometry under different cell names, for example
+``SiN300nm_1550nm_TE_CSAC_Euler_bend(radius=40, p=1)`` and
+``bend_euler(radius=40, p=1)``. This module hashes every cell canonically
+(merged polygons per layer, child instances by their own canonical hash and
+transformation, ports), rewires the instances of duplicates to one canonical
+cell and reports what was saved.
+
+.. code::
+
+    report = dedup(c)  # in place
+    print(report)
+
+    gdspath, report = write_gds_dedup(c, "chip.gds")  # leaves c untouched
+"""
+
+from __future__ import annotations
+
+import hashlib
+import pathlib
+from dataclasses import dataclass, field
+
+import gdsfactory as gf
+import kfactory as kf
+from kfactory import kdb
+
+_PORT_META_PREFIX = "kfactory:ports"
+
+
+@dataclass
+class DedupReport:
+    """Savings of a deduplication pass."""
+
+    cells_before: int = 0
+    cells_removed: int = 0
+    polygons_removed: int = 0
+    vertices_removed: int = 0
+    aliases: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def cells_after(self) -> int:
+        """Number of cells left in the hierarchy."""
+        return self.cells_before - self.cells_removed
+
+    def __str__(self) -> str:
+        """Returns a one-line summary."""
+        return (
+            f"dedup: {self.cells_before} -> {self.cells_after} cells, "
+            f"{self.polygons_removed} polygons / {self.vertices_removed} vertices removed"
+        )
+
+
+def _layer_order(layout: kdb.Layout) -> list[tuple[int, int, int]]:
+    order = []
+    for layer_index in layout.layer_indexes():
+        info = layout.get_info(layer_index)
+        order.append((info.layer, info.datatype, layer_index))
+    return sorted(order)
+
+
+def _port_keys(
+    layout: kdb.Layout, kcl: kf.KCLayout, cell_index: int
+) -> list[str]:
+    """Returns name, transformation, width, layer and type of every port."""
+    keys = []
+    for port in kcl[cell_index].ports:
+        trans = port.base.trans or port.base.dcplx_trans
+        info = layout.get_info(port.layer)
+        keys.append(
+            f"{port.name}@{trans}:{port.width}:{info.layer}/{info.datatype}"
+            f":{port.port_type}"
+        )
+    return keys
+
+
+def _cell_hash(
+    layout: kdb.Layout,
+    cell: kdb.Cell,
+    layers: list[tuple[int, int, int]],
+    child_hashes: dict[int, str],
+    include_ports: bool,
+    include_labels: bool,
+    kcl: kf.KCLayout | None = None,
+) -> str:
+    h = hashlib.sha1()
+    for layer, datatype, layer_index in layers:
+        shapes = cell.shapes(layer_index)
+        if shapes.is_empty():
+            continue
+        polygons = sorted(str(p) for p in kdb.Region(shapes).merged().each())
+        h.update(f"L{layer}/{datatype}:".encode())
+        h.update(";".join(polygons).encode())
+        if include_labels:
+            texts = sorted(str(t) for t in kdb.Texts(shapes).each())
+            h.update(f"T{layer}/{datatype}:".encode())
+            h.update(";".join(texts).encode())
+
+    instances = []
+    for inst in cell.each_inst():
+        array = (
+            f"[{inst.na}x{inst.nb}:{inst.a},{inst.b}]"
+            if inst.is_regular_array()
+            else ""
+        )
+        instances.append(f"{child_hashes[inst.cell_index]}@{inst.cplx_trans}{array}")
+    h.update(b"I:")
+    h.update(";".join(sorted(instances)).encode())
+
+    if include_ports:
+        if kcl is not None:
+            ports = sorted(_port_keys(layout, kcl, cell.cell_index()))
+        else:
+            # layouts read from a GDS keep their ports in the meta info only
+            ports = sorted(
+                f"{m.name}={m.value}"
+                for m in cell.each_meta_info()
+                if m.name.startswith(_PORT_META_PREFIX)
+            )
+        h.update(b"P:")
+        h.update(";".join(ports).encode())
+    return h.hexdigest()
+
+
+def cell_hashes(
+    layout: kdb.Layout,
+    top_cell_index: int,
+    include_ports: bool = True,
+    include_labels: bool = False,
+    kcl: kf.KCLayout | None = None,
+) -> dict[int, str]:
+    """Returns the canonical geometry hash of every cell below (and including) a top cell.
+
+    Two cells get the same hash when their merged polygons per layer are
+    equal and they instantiate cells with equal hashes at the same
+    transformations.
+
+    Args:
+        layout: KLayout layout.
+        top_cell_index: index of the top cell.
+        include_ports: two cells with different ports are not considered equal.
+        include_labels: two cells with different text labels are not considered equal.
+        kcl: layout holding the ports of the cells, with the same cell
+            indexes as ``layout``. Without it, ports are read from the meta
+            info that is only written with a GDS.
+    """
+    top = layout.cell(top_cell_index)
+    tree = set(top.called_cells()) | {top_cell_index}
+    layers = _layer_order(layout)
+    hashes: dict[int, str] = {}
+    for cell_index in layout.each_cell_bottom_up():
+        if cell_index not in tree:
+            continue
+        hashes[cell_index] = _cell_hash(
+            layout,
+            layout.cell(cell_index),
+            layers,
+            hashes,
+            include_ports=include_ports,
+            include_labels=include_labels,
+            kcl=kcl,
+        )
+    return hashes
+
+
+def _groups(
+    layout: kdb.Layout, hashes: dict[int, str]
+) -> dict[int, list[int]]:
+    """Returns canonical cell index -> duplicate cell indexes."""
+    by_hash: dict[str, list[int]] = {}
+    for cell_index, h in hashes.items():
+        by_hash.setdefault(h, []).append(cell_index)
+    return {
+        min(indexes): sorted(set(indexes) - {min(indexes)})
+        for indexes in by_hash.values()
+        if len(indexes) > 1
+    }
+
+
+def find_duplicates(
+    component: gf.Component,
+    include_ports: bool = True,
+    include_labels: bool = False,
+) -> dict[str, list[str]]:
+    """Returns canonical cell name -> names of cells with identical geometry."""
+    layout = component.kcl.layout
+    hashes = cell_hashes(
+        layout,
+        component.cell_index(),
+        include_ports=include_ports,
+        include_labels=include_labels,
+        kcl=component.kcl,
+    )
+    return {
+        layout.cell(canonical).name: [layout.cell(d).name for d in duplicates]
+        for canonical, duplicates in _groups(layout, hashes).items()
+    }
+
+
+def _count_geometry(cell: kdb.Cell, layout: kdb.Layout) -> tuple[int, int]:
+    polygons = vertices = 0
+    for layer_index in layout.layer_indexes():
+        for shape in cell.shapes(layer_index).each():
+            polygon = None if shape.is_text() else shape.polygon
+            if polygon is not None:
+                polygons += 1
+                vertices += polygon.num_points()
+    return polygons, vertices
+
+
+def _owned(layout: kdb.Layout, top: int, tree: set[int]) -> set[int]:
+    """Returns the top cell and the cells of its tree only it references.
+
+    Cells also instantiated by cells outside the tree, such as factory-cached
+    cells shared with other components, are not owned, and neither is
+    anything below them.
+    """
+    owned = {top}
+    for cell_index in layout.each_cell_top_down():
+        if cell_index in tree and cell_index != top:
+            parents = layout.cell(cell_index).each_parent_cell()
+            if all(parent in owned for parent in parents):
+                owned.add(cell_index)
+    return owned
+
+
+def _rewire(
+    layout: kdb.Layout,
+    hashes: dict[int, str],
+    delete: bool,
+    kcl: kf.KCLayout | None = None,
+    owned: set[int] | None = None,
+) -> DedupReport:
+    """Rewires the instances of duplicates in the cells of owned.
+
+    Duplicates still referenced from other cells are kept. None rewires
+    every instance, for a private copy of the layout.
+    """
+    report = DedupReport(cells_before=len(hashes))
+    removed: list[int] = []
+    for canonical, duplicates in _groups(layout, hashes).items():
+        canonical_name = layout.cell(canonical).name
+        for duplicate in duplicates:
+            dup_cell = layout.cell(duplicate)
+            parent_insts = [
+                parent_inst
+                for parent_inst in dup_cell.each_parent_inst()
+                if owned is None or parent_inst.parent_cell_index() in owned
+            ]
+            for parent_inst in parent_insts:
+                parent = layout.cell(parent_inst.parent_cell_index())
+                locked = parent.locked
+                parent.locked = False
+                parent_inst.child_inst().cell_index = canonical
+                parent.locked = locked
+            if parent_insts:
+                report.aliases[dup_cell.name] = canonical_name
+            if dup_cell.parent_cells():
+                continue
+            polygons, vertices = _count_geometry(dup_cell, layout)
+            report.polygons_removed += polygons
+            report.vertices_removed += vertices
+            removed.append(duplicate)
+
+    if delete and removed:
+        if kcl is not None:
+            kcl.delete_cells(removed)
+        else:
+            for cell_index in removed:
+                layout.cell(cell_index).locked = False
+            layout.delete_cells(removed)
+        report.cells_removed = len(removed)
+    return report
+
+
+def dedup(
+    component: gf.Component,
+    delete: bool = True,
+    include_ports: bool = True,
+    include_labels: bool = False,
+) -> DedupReport:
+    """Rewires instances of identical cells to one canonical cell, in place.
+
+    The canonical cell of a group is the one created first. Cells that were
+    cached by their factory and get deleted are rebuilt on their next call.
+    Cells that other components also instantiate are left untouched.
+
+    Args:
+        component: top cell of the hierarchy to deduplicate.
+        delete: delete the duplicate cells once they are no longer referenced.
+        include_ports: only merge cells that also have the same ports.
+        include_labels: only merge cells that also have the same text labels.
+    """
+    layout = component.kcl.layout
+    hashes = cell_hashes(
+        layout,
+        component.cell_index(),
+        include_ports=include_ports,
+        include_labels=include_labels,
+        kcl=component.kcl,
+    )
+    hashes.pop(component.cell_index())
+    owned = _owned(layout, component.cell_index(), set(hashes))
+    return _rewire(layout, hashes, delete=delete, kcl=component.kcl, owned=owned)
+
+
+def write_gds_dedup(
+    component: gf.Component,
+    gdspath: str | pathlib.Path | None = None,
+    include_ports: bool = True,
+    include_labels: bool = False,
+) -> tuple[pathlib.Path, DedupReport]:
+    """Writes a deduplicated copy of a component without modifying it.
+
+    Args:
+        component: to write.
+        gdspath: output path. Defaults to ``<component name>.gds`` in the cwd.
+        include_ports: only merge cells that also have the same ports.
+        include_labels: only merge cells that also have the same text labels.
+    """
+    gdspath = pathlib.Path(gdspath or f"{component.name}.gds")
+    gdspath.parent.mkdir(parents=True, exist_ok=True)
+
+    layout = component.kcl.layout.dup()
+    top = layout.cell(component.cell_index())
+
+    # the duplicated layout keeps the cell indexes, but not the ports
+    hashes = cell_hashes(
+        layout,
+        top.cell_index(),
+        include_ports=include_ports,
+        include_labels=include_labels,
+        kcl=component.kcl,
+    )
+    hashes.pop(top.cell_index())
+    report = _rewire(layout, hashes, delete=True)
+
+    options = kdb.SaveLayoutOptions()
+    options.write_context_info = True
+    options.select_cell(top.cell_index())
+    layout.write(str(gdspath), options)
+    return gdspath, report
+
+
+if __name__ == "__main__":
+    from csac_sin_pdk.sin300.cband import PDK, cells
+
+    PDK.activate()
+    c = gf.Component()
+    c << cells.bend_euler(radius=40, p=1)
+    b = c << gf.components.bend_euler(radius=40, p=1)
+    b.dmovex(100)
+    print(find_duplicates(c))
+    print(dedup(c))
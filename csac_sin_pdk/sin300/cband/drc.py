@@ -0,0 +1,347 @@
+"""Tiled, multi-threaded design-rule checks for the SiN layers.
+
+Checks minimum width and spacing of WG (203, 0), HEATER (39, 0) and PAD
+(41, 0), PAD enclosure of HEATER and minimum bend radius on WG, with the rule
+values taken from :data:`~csac_sin_pdk.sin300.cband.tech.TECH`. These values
+are provisional until the foundry rule deck is available.
+
+The die is cut into square tiles. Each tile is checked on its own, with the
+geometry of a halo around it so that violations across the tile border are
+seen, and only violations centred in the tile are kept. Tiles are checked in a
+thread pool. Every tile is keyed by a hash of its input geometry and the
+rules, so a re-run after an edit only re-checks the tiles that changed.
+
+The bend radius is not measured on polygons: bend cells record their
+smallest radius of curvature in ``info["min_bend_radius"]`` (or
+``info["radius"]``), and every placement of a bend that is too tight is
+reported.
+
+.. code::
+
+    from csac_sin_pdk.sin300.cband import PDK
+    from csac_sin_pdk.sin300.cband.drc import DrcCache, run_drc
+
+    PDK.activate()
+    cache = DrcCache()
+    report = run_drc(c, cache=cache)
+    print(report)
+    report.write_json("chip_drc.json")
+    report.markers(c).write_gds("chip_drc.gds")
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import pathlib
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Literal
+
+import gdsfactory as gf
+from gdsfactory.typings import LayerSpec
+from kfactory import kdb
+
+from csac_sin_pdk.sin300.cband.tech import LAYER, TECH, Tech
+
+RuleKind = Literal["width", "space", "enclosure", "radius"]
+
+# edges meeting at 45 degrees or more are not checked against each other in
+# width checks, so the tips of 45 degree corners, as wide as their wire, pass
+_WIDTH_IGNORE_ANGLE = 45
+
+__all__ = ["DrcCache", "DrcReport", "DrcRule", "default_rules", "run_drc"]
+
+
+@dataclass(frozen=True)
+class DrcRule:
+    """One design rule.
+
+    Args:
+        name: name used in the report.
+        kind: width, space, enclosure (``layer`` encloses ``other``) or radius.
+        layer: layer the rule applies to.
+        value: minimum width, spacing, enclosure or bend radius in um.
+        other: inner layer of an enclosure rule.
+    """
+
+    name: str
+    kind: RuleKind
+    layer: str
+    value: float
+    other: str | None = None
+
+
+def default_rules(tech: Tech = TECH) -> list[DrcRule]:
+    """Returns the PDK design rules."""
+    return [
+        DrcRule("WG.W.1", "width", "WG", tech.min_width_wg),
+        DrcRule("WG.S.1", "space", "WG", tech.min_spacing_wg),
+        DrcRule("WG.R.1", "radius", "WG", tech.min_radius_wg),
+        DrcRule("HEATER.W.1", "width", "HEATER", tech.min_width_heater),
+        DrcRule("HEATER.S.1", "space", "HEATER", tech.min_spacing_heater),
+        DrcRule("PAD.W.1", "width", "PAD", tech.min_width_pad),
+        DrcRule("PAD.S.1", "space", "PAD", tech.min_spacing_pad),
+        DrcRule(
+            "PAD.EN.1", "enclosure", "PAD", tech.min_enclosure_pad_heater, "HEATER"
+        ),
+    ]
+
+
+class DrcCache:
+    """Violations of already checked tiles, keyed by tile geometry and rules.
+
+    Args:
+        path: optional JSON file the cache is loaded from and saved to.
+    """
+
+    def __init__(self, path: str | pathlib.Path | None = None) -> None:
+        """Load the cache file if it exists."""
+        self.path = pathlib.Path(path) if path else None
+        self.tiles: dict[str, dict[str, list[str]]] = {}
+        if self.path and self.path.exists():
+            self.tiles = json.loads(self.path.read_text())
+
+    def __len__(self) -> int:
+        """Number of cached tiles."""
+        return len(self.tiles)
+
+    def save(self) -> None:
+        """Writes the cache file."""
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self.tiles))
+
+
+@dataclass
+class DrcReport:
+    """Violations found by :func:`run_drc`.
+
+    Args:
+        cell: name of the checked cell.
+        rules: rules that were checked.
+        violations: edge pairs in dbu of every violated rule.
+        dbu: database unit in um.
+        tiles: number of tiles.
+        cached_tiles: tiles whose result came from the cache.
+    """
+
+    cell: str
+    rules: list[DrcRule]
+    violations: dict[str, kdb.EdgePairs] = field(default_factory=dict)
+    dbu: float = 1e-3
+    tiles: int = 0
+    cached_tiles: int = 0
+
+    @property
+    def num_violations(self) -> int:
+        """Total number of violations."""
+        return sum(e.count() for e in self.violations.values())
+
+    def __str__(self) -> str:
+        """Returns a one-line summary."""
+        return (
+            f"DRC {self.cell}: {self.num_violations} violations, "
+            f"{self.tiles} tiles ({self.cached_tiles} cached)"
+        )
+
+    def summary(self) -> dict[str, object]:
+        """Returns the report as JSON-serializable data."""
+        rules = {}
+        for rule in self.rules:
+            edge_pairs = self.violations.get(rule.name, kdb.EdgePairs())
+            boxes = [e.bbox().to_dtype(self.dbu) for e in edge_pairs.each()]
+            rules[rule.name] = {
+                **asdict(rule),
+                "violations": len(boxes),
+                "boxes": [[b.left, b.bottom, b.right, b.top] for b in boxes],
+            }
+        return {
+            "cell": self.cell,
+            "violations": self.num_violations,
+            "tiles": self.tiles,
+            "cached_tiles": self.cached_tiles,
+            "rules": rules,
+        }
+
+    def write_json(self, filepath: str | pathlib.Path) -> pathlib.Path:
+        """Writes the summary as JSON and returns its path."""
+        filepath = pathlib.Path(filepath)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        filepath.write_text(json.dumps(self.summary(), indent=2))
+        return filepath
+
+    def markers(
+        self,
+        component: gf.Component,
+        layer: LayerSpec = LAYER.DRC_MARKER,
+        enlarge: float = 0.5,
+    ) -> gf.Component:
+        """Returns a component with the checked cell and violation markers.
+
+        Args:
+            component: the checked component.
+            layer: marker layer.
+            enlarge: growth of the markers in um, so zero-area edge pairs show.
+        """
+        c = gf.Component()
+        c << component
+        e = round(enlarge / self.dbu)
+        for edge_pairs in self.violations.values():
+            for edge_pair in edge_pairs.each():
+                c.add_polygon(edge_pair.polygon(e).to_dtype(self.dbu), layer=layer)
+        return c
+
+
+def _tile_key(regions: Sequence[kdb.Region], rules: Sequence[DrcRule]) -> str:
+    h = hashlib.sha256(json.dumps([asdict(r) for r in rules]).encode())
+    for region in regions:
+        h.update(b"|")
+        for value in sorted(p.hash() for p in region.each()):
+            h.update(value.to_bytes(8, "little", signed=False))
+    return h.hexdigest()
+
+
+def _check_tile(
+    regions: dict[str, kdb.Region], rules: Sequence[DrcRule], dbu: float
+) -> dict[str, kdb.EdgePairs]:
+    violations = {}
+    for rule in rules:
+        d = round(rule.value / dbu)
+        region = regions[rule.layer]
+        if rule.kind == "width":
+            edge_pairs = region.width_check(
+                d, False, kdb.Metrics.Projection, _WIDTH_IGNORE_ANGLE
+            )
+        elif rule.kind == "space":
+            edge_pairs = region.space_check(d, False, kdb.Metrics.Projection, 80)
+        elif rule.kind == "enclosure":
+            edge_pairs = region.enclosing_check(
+                regions[rule.other], d, False, kdb.Metrics.Projection, 80
+            )
+        else:
+            raise ValueError(f"Unknown tiled rule kind {rule.kind!r}")
+        violations[rule.name] = edge_pairs
+    return violations
+
+
+def _radius_violations(
+    component: gf.Component, rule: DrcRule, layer_index: int
+) -> kdb.EdgePairs:
+    """Returns a degenerate edge pair at every placement of a too tight bend."""
+    kcl = component.kcl
+    layout = kcl.layout
+    tight = []
+    for ci in component.kdb_cell.called_cells():
+        cell = layout.cell(ci)
+        if cell.bbox(layer_index).empty():
+            continue
+        info = kcl[ci].info
+        radius = info.get("min_bend_radius", info.get("radius"))
+        if isinstance(radius, int | float) and radius < rule.value:
+            tight.append(ci)
+
+    edge_pairs = kdb.EdgePairs()
+    if not tight:
+        return edge_pairs
+    it = kdb.RecursiveInstanceIterator(layout, component.kdb_cell)
+    it.targets = tight
+    for item in it.each():
+        box = (item.trans() * item.inst_trans()) * item.inst_cell().bbox(layer_index)
+        edge_pairs.insert(kdb.Edge(box.p1, box.p2), kdb.Edge(box.p2, box.p1))
+    return edge_pairs
+
+
+def run_drc(
+    component: gf.Component,
+    rules: Iterable[DrcRule] | None = None,
+    tile_size: float = 1000.0,
+    max_workers: int | None = None,
+    cache: DrcCache | None = None,
+) -> DrcReport:
+    """Checks a component against the design rules.
+
+    Args:
+        component: component to check.
+        rules: rules to check. Defaults to :func:`default_rules`.
+        tile_size: tile side in um.
+        max_workers: threads checking tiles. Defaults to the CPU count.
+        cache: per-tile results to reuse and update.
+    """
+    rules = list(default_rules() if rules is None else rules)
+    kcl = component.kcl
+    dbu = kcl.dbu
+    layout = kcl.layout
+    layout.update()
+    tiled = [r for r in rules if r.kind != "radius"]
+    layers = sorted({r.layer for r in tiled} | {r.other for r in tiled if r.other})
+    layer_indexes = {name: gf.get_layer(name) for name in layers}
+
+    report = DrcReport(cell=component.name, rules=rules, dbu=dbu)
+    violations = {rule.name: kdb.EdgePairs() for rule in rules}
+    for rule in rules:
+        if rule.kind == "radius":
+            violations[rule.name] += _radius_violations(
+                component, rule, gf.get_layer(rule.layer)
+            )
+
+    bbox = component.kdb_cell.bbox()
+    if tiled and not bbox.empty():
+        size = round(tile_size / dbu)
+        halo = 2 * round(max(r.value for r in tiled) / dbu) + 1
+        nx = -(-bbox.width() // size)
+        ny = -(-bbox.height() // size)
+        tiles = []
+        for iy in range(ny):
+            for ix in range(nx):
+                x0 = bbox.left + ix * size
+                y0 = bbox.bottom + iy * size
+                tile = kdb.Box(x0, y0, x0 + size, y0 + size)
+                window = tile.enlarged(halo, halo)
+                regions = {}
+                for name, li in layer_indexes.items():
+                    region = kdb.Region(
+                        component.kdb_cell.begin_shapes_rec_touching(li, window)
+                    )
+                    regions[name] = (region & kdb.Region(window)).merged()
+                tiles.append((tile, regions, _tile_key(list(regions.values()), tiled)))
+        report.tiles = len(tiles)
+
+        cached = cache.tiles if cache is not None else {}
+        todo = [t for t in tiles if t[2] not in cached]
+        report.cached_tiles = len(tiles) - len(todo)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(lambda t: _check_tile(t[1], tiled, dbu), todo)
+            for (_, _, key), result in zip(todo, results):
+                cached[key] = {
+                    name: [str(e) for e in edge_pairs.each()]
+                    for name, edge_pairs in result.items()
+                }
+        if cache is not None:
+            cache.save()
+
+        # a violation belongs to the tile its center is in (half-open tiles)
+        for tile, _, key in tiles:
+            for name, edge_pairs in cached[key].items():
+                for s in edge_pairs:
+                    edge_pair = kdb.EdgePair.from_s(s)
+                    center = edge_pair.bbox().center()
+                    if (
+                        tile.left <= center.x < tile.right
+                        and tile.bottom <= center.y < tile.top
+                    ):
+                        violations[name].insert(edge_pair)
+
+    report.violations = {k: v for k, v in violations.items() if not v.is_empty()}
+    return report
+
+
+if __name__ == "__main__":
+    from csac_sin_pdk.sin300.cband import PDK
+
+    PDK.activate()
+    c = gf.get_component("ring_single")
+    cache = DrcCache()
+    print(run_drc(c, cache=cache))
+    print(run_drc(c, cache=cache))
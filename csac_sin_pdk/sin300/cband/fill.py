@@ -0,0 +1,303 @@
+"""Pattern density maps and tiled fill on the PADDING layer.
+
+:func:`density_map` rasterizes the merged coverage of some layers on a grid
+of square tiles with :meth:`kdb.Region.rasterize`, giving the covered
+fraction of every tile as a NumPy array in one call.
+
+:func:`add_fill` raises every tile below a target density with fill squares
+on PADDING (980, 0). Fill sites sit on a lattice aligned to the origin, and
+a site is free when no waveguide, heater or pad lies within the clearance
+of its square. Tiles are processed in a thread pool: each one rasterizes
+its blocked region at the fill lattice, picks the free sites it needs and
+returns them as row runs, which are placed as instance arrays of one fill
+cell.
+
+.. code::
+
+    from csac_sin_pdk.sin300.cband import PDK
+    from csac_sin_pdk.sin300.cband.fill import add_fill, density_map
+
+    PDK.activate()
+    print(density_map(c))
+    after = add_fill(c, target=0.3)
+    print(after.at(1000, 2000), after.summary())
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import gdsfactory as gf
+import numpy as np
+from gdsfactory.typings import LayerSpec
+from kfactory import kdb
+
+from csac_sin_pdk.sin300.cband.tech import LAYER
+
+__all__ = ["DensityMap", "add_fill", "density_map", "fill_square"]
+
+# low-discrepancy order in which the rows of a tile receive fill
+_GOLDEN = (np.sqrt(5) - 1) / 2
+
+
+@dataclass
+class DensityMap:
+    """Covered fraction of every tile of a component.
+
+    Args:
+        density: (rows, columns) covered fraction, row 0 at the bottom.
+        origin: lower-left corner of tile (0, 0) in um.
+        tile_size: tile side in um.
+        layers: layers whose merged coverage is counted.
+    """
+
+    density: np.ndarray
+    origin: tuple[float, float]
+    tile_size: float
+    layers: tuple[str, ...]
+
+    def __str__(self) -> str:
+        """Returns a one-line summary."""
+        s = self.summary()
+        return (
+            f"density of {'+'.join(self.layers)} on {s['tiles']} tiles: "
+            f"min {s['min']:.3f}, mean {s['mean']:.3f}, max {s['max']:.3f}"
+        )
+
+    def tile(self, x: float, y: float) -> tuple[int, int]:
+        """Returns the (row, column) of the tile holding a point in um.
+
+        Raises:
+            ValueError: if the point is outside the map.
+        """
+        column = int(np.floor((x - self.origin[0]) / self.tile_size))
+        row = int(np.floor((y - self.origin[1]) / self.tile_size))
+        rows, columns = self.density.shape
+        if not (0 <= row < rows and 0 <= column < columns):
+            raise ValueError(f"Point ({x}, {y}) is outside the density map.")
+        return row, column
+
+    def at(self, x: float, y: float) -> float:
+        """Returns the density of the tile holding a point in um."""
+        return float(self.density[self.tile(x, y)])
+
+    def tile_box(self, row: int, column: int) -> tuple[float, float, float, float]:
+        """Returns (xmin, ymin, xmax, ymax) of a tile in um."""
+        x0 = self.origin[0] + column * self.tile_size
+        y0 = self.origin[1] + row * self.tile_size
+        return (x0, y0, x0 + self.tile_size, y0 + self.tile_size)
+
+    def below(self, target: float) -> np.ndarray:
+        """Returns the (row, column) of every tile with a density below target."""
+        return np.argwhere(self.density < target)
+
+    def summary(self) -> dict[str, float | int]:
+        """Returns the number of tiles and their min, mean and max density."""
+        d = self.density
+        empty = d.size == 0
+        return {
+            "tiles": int(d.size),
+            "min": 0.0 if empty else float(d.min()),
+            "mean": 0.0 if empty else float(d.mean()),
+            "max": 0.0 if empty else float(d.max()),
+        }
+
+
+def _merged(component: gf.Component, layers: Sequence[LayerSpec]) -> kdb.Region:
+    region = kdb.Region()
+    for layer in layers:
+        region.insert(component.begin_shapes_rec(gf.get_layer(layer)))
+    return region.merged()
+
+
+def _grid(component: gf.Component, size: int) -> tuple[kdb.Point, int, int]:
+    """Returns the origin and number of columns and rows of a grid of pitch size."""
+    bbox = component.kdb_cell.bbox()
+    x0 = bbox.left // size * size
+    y0 = bbox.bottom // size * size
+    nx = max(1, -(-(bbox.right - x0) // size))
+    ny = max(1, -(-(bbox.top - y0) // size))
+    return kdb.Point(x0, y0), nx, ny
+
+
+def density_map(
+    component: gf.Component,
+    layers: Sequence[str] = ("WG", "PAD"),
+    tile_size: float = 100.0,
+) -> DensityMap:
+    """Returns the covered fraction of every tile of a component.
+
+    Tiles are aligned to multiples of tile_size, so maps of the same layout
+    before and after an edit line up.
+
+    Args:
+        component: component to measure.
+        layers: layers whose merged coverage is counted.
+        tile_size: tile side in um.
+    """
+    dbu = component.kcl.dbu
+    size = round(tile_size / dbu)
+    if size <= 0:
+        raise ValueError(f"tile_size={tile_size} must be positive.")
+    origin, nx, ny = _grid(component, size)
+    areas = _merged(component, layers).rasterize(origin, kdb.Vector(size, size), nx, ny)
+    return DensityMap(
+        density=np.asarray(areas, dtype=float).reshape(ny, nx) / size**2,
+        origin=(origin.x * dbu, origin.y * dbu),
+        tile_size=size * dbu,
+        layers=tuple(layers),
+    )
+
+
+@gf.cell
+def fill_square(size: float = 2.0, layer: LayerSpec = LAYER.PADDING) -> gf.Component:
+    """Returns a fill square with its lower-left corner at the origin.
+
+    Args:
+        size: side in um.
+        layer: fill layer.
+    """
+    c = gf.Component()
+    c.add_polygon([(0, 0), (size, 0), (size, size), (0, size)], layer=layer)
+    return c
+
+
+def _tile_runs(
+    blocked: kdb.Region,
+    origin: kdb.Point,
+    pitch: int,
+    size: int,
+    sites: int,
+    needed: int,
+) -> list[tuple[int, int, int]]:
+    """Returns (row, first column, count) runs of free fill sites of one tile.
+
+    Rows are filled whole, in a low-discrepancy order, until enough sites
+    are taken, so the fill spreads over the tile.
+    """
+    offset = (pitch - size) // 2
+    areas = blocked.rasterize(
+        origin + kdb.Vector(offset, offset),
+        kdb.Vector(pitch, pitch),
+        kdb.Vector(size, size),
+        sites,
+        sites,
+    )
+    free = np.asarray(areas).reshape(sites, sites) == 0
+    runs = []
+    for row in np.argsort((np.arange(sites) * _GOLDEN) % 1, kind="stable"):
+        edges = np.diff(np.r_[0, free[row].astype(np.int8), 0])
+        starts = np.flatnonzero(edges == 1)
+        stops = np.flatnonzero(edges == -1)
+        for start, stop in zip(starts, stops):
+            count = int(min(stop - start, needed))
+            runs.append((int(row), int(start), count))
+            needed -= count
+            if needed == 0:
+                return runs
+    return runs
+
+
+def add_fill(
+    component: gf.Component,
+    target: float = 0.2,
+    layers: Sequence[str] = ("WG", "PAD"),
+    keepout: Sequence[str] = ("WG", "PAD", "HEATER"),
+    layer: LayerSpec = LAYER.PADDING,
+    fill_size: float = 2.0,
+    fill_pitch: float = 4.0,
+    clearance: float = 3.0,
+    tile_size: float = 100.0,
+    max_workers: int | None = None,
+) -> DensityMap:
+    """Adds fill squares to every tile whose density is below a target.
+
+    The density of a tile counts ``layers`` and the fill layer. A tile is
+    filled up to the target, or with all its free sites if that is not
+    enough.
+
+    Args:
+        component: component to add the fill into.
+        target: density to reach in every tile.
+        layers: layers whose coverage counts towards the density.
+        keepout: layers the fill keeps its clearance from.
+        layer: fill layer.
+        fill_size: side of a fill square in um.
+        fill_pitch: distance between fill sites in um.
+        clearance: minimum distance from fill to keepout shapes in um.
+        tile_size: tile side in um, rounded to a multiple of fill_pitch.
+        max_workers: threads processing tiles. Defaults to the CPU count.
+
+    Returns:
+        the density map after filling.
+    """
+    if not 0 <= target <= 1:
+        raise ValueError(f"target={target} must be between 0 and 1.")
+    if fill_size > fill_pitch:
+        raise ValueError(
+            f"fill_size={fill_size} is larger than fill_pitch={fill_pitch}."
+        )
+    dbu = component.kcl.dbu
+    pitch = round(fill_pitch / dbu)
+    size = round(fill_size / dbu)
+    sites = max(1, round(tile_size / fill_pitch))
+    tile = sites * pitch
+    counted = [*layers, gf.get_layer(layer).name]
+    before = density_map(component, counted, tile * dbu)
+    deficit = np.ceil((target - before.density) * tile**2 / size**2).astype(int)
+    todo = [(int(r), int(c)) for r, c in np.argwhere(deficit > 0)]
+    if not todo:
+        return before
+
+    origin = kdb.Point(round(before.origin[0] / dbu), round(before.origin[1] / dbu))
+    grow = round(clearance / dbu)
+    keepout_indexes = [gf.get_layer(name) for name in keepout]
+    jobs = []
+    for row, column in todo:
+        tile_origin = origin + kdb.Vector(column * tile, row * tile)
+        window = kdb.Box(tile_origin, tile_origin + kdb.Vector(tile, tile))
+        query = window.enlarged(grow, grow)
+        blocked = kdb.Region()
+        for li in keepout_indexes:
+            blocked.insert(component.kdb_cell.begin_shapes_rec_touching(li, query))
+        blocked = blocked.sized(grow)
+        jobs.append((tile_origin, blocked, int(deficit[row, column])))
+
+    def runs_of(job: tuple[kdb.Point, kdb.Region, int]) -> list[tuple[int, int, int]]:
+        tile_origin, blocked, needed = job
+        return _tile_runs(blocked, tile_origin, pitch, size, sites, needed)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        runs = list(pool.map(runs_of, jobs))
+
+    cell_index = fill_square(size=size * dbu, layer=layer).cell_index()
+    offset = (pitch - size) // 2
+    for (tile_origin, _, _), tile_runs in zip(jobs, runs):
+        for row, column, count in tile_runs:
+            corner = tile_origin + kdb.Vector(
+                column * pitch + offset, row * pitch + offset
+            )
+            component.kdb_cell.insert(
+                kdb.CellInstArray(
+                    cell_index,
+                    kdb.Trans(corner.x, corner.y),
+                    kdb.Vector(pitch, 0),
+                    kdb.Vector(0, pitch),
+                    count,
+                    1,
+                )
+            )
+    return density_map(component, counted, tile * dbu)
+
+
+if __name__ == "__main__":
+    from csac_sin_pdk.sin300.cband import PDK
+
+    PDK.activate()
+    c = gf.Component()
+    c << gf.get_component("ring_single")
+    print(density_map(c, tile_size=20))
+    print(add_fill(c, target=0.3, tile_size=20))
+    c.show()
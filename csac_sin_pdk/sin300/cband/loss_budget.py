@@ -0,0 +1,345 @@
+"""Layout-derived insertion-loss budgets between grating couplers.
+
+A fast estimate without circuit simulation. The budget walks the recursive
+netlist of a component. Every leaf instance contributes:
+
+- propagation loss: waveguide length per cross-section, read from the
+  ``route_info_<xs>_length`` entries of the cell ``info`` (straights, bends,
+  S-bends and routes write them), times the dB/cm of that cross-section in
+  ``TECH.loss_dB_cm``.
+- device loss: ``loss_dB`` of the device model (MMIs), or the ``loss`` of
+  the grating coupler model for cells with a fiber (``vertical_*``) port.
+  Models are looked up by the function that built the cell.
+
+The device loss applies between the port pairs that the model couples
+anywhere in 1.5 to 1.6 um, for example MMI input to output but not output to
+output. There is no path between the other pairs. Cells without a model, or
+whose model has other ports, get the loss between all their ports.
+
+Each cell is reduced to a matrix of the lowest loss in dB between its
+ports. The matrix comes from :func:`scipy.sparse.csgraph.shortest_path` over
+a graph whose edges are the matrices of its children and zero-loss
+connections, so all port pairs are solved in one call. Fiber ports of
+grating couplers are carried up the hierarchy as terminals. The matrix of
+each unique cell is cached, so a die with many copies of one loss
+structure reduces it once.
+
+.. code::
+
+    from csac_sin_pdk.sin300.cband import PDK
+    from csac_sin_pdk.sin300.cband.loss_budget import loss_budget
+
+    PDK.activate()
+    budget = loss_budget(c)
+    for gc1, gc2, loss_dB in budget.pairs():
+        print(f"{gc1} -> {gc2}: {loss_dB:.2f} dB")
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from functools import partial
+from typing import Any
+
+import gdsfactory as gf
+import numpy as np
+import sax
+from gdsfactory.get_netlist import get_instance_name_from_alias
+from kfactory.kcell import ProtoTKCell
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from csac_sin_pdk.sin300.cband import models as _models
+from csac_sin_pdk.sin300.cband.netlist import NetlistCache, get_netlist
+from csac_sin_pdk.sin300.cband.tech import TECH
+
+__all__ = ["LossBudget", "clear_loss_cache", "loss_budget"]
+
+_ROUTE_INFO = "route_info_"
+_FIBER_PORT = "vertical"
+_GRATING_LOSS_DB = float(_models.grating_coupler_elliptical.keywords["loss"])
+# models couple a port pair if |S| exceeds this anywhere in the band
+_WAVELENGTHS = np.linspace(1.5, 1.6, 11)
+_MIN_COUPLING = 1e-6
+
+
+@dataclass
+class LossBudget:
+    """Lowest loss in dB between the ports and fiber terminals of a cell.
+
+    Args:
+        ports: port names, then terminals as ``instance.port`` paths.
+        terminals: number of trailing entries of ``ports`` that are terminals.
+        loss_dB: (n, n) loss from port i to port j, inf where there is no path.
+    """
+
+    ports: list[str]
+    terminals: int
+    loss_dB: np.ndarray
+
+    @property
+    def grating_couplers(self) -> list[str]:
+        """Fiber terminals of all grating couplers."""
+        return self.ports[len(self.ports) - self.terminals :]
+
+    def pairs(self, max_loss_dB: float = np.inf) -> list[tuple[str, str, float]]:
+        """Returns (terminal, terminal, loss) of every connected grating coupler pair.
+
+        Args:
+            max_loss_dB: only pairs with less loss are returned.
+        """
+        n = len(self.ports) - self.terminals
+        sub = self.loss_dB[n:, n:]
+        i, j = np.nonzero(np.triu(np.isfinite(sub) & (sub < max_loss_dB), k=1))
+        names = self.grating_couplers
+        return [(names[a], names[b], float(sub[a, b])) for a, b in zip(i, j)]
+
+    def __str__(self) -> str:
+        """Returns a one-line summary."""
+        pairs = self.pairs()
+        if not pairs:
+            return f"{self.terminals} grating couplers, no connected pairs"
+        losses = [p[2] for p in pairs]
+        return (
+            f"{self.terminals} grating couplers, {len(pairs)} pairs: "
+            f"{min(losses):.2f} to {max(losses):.2f} dB"
+        )
+
+
+def _hash(value: Any) -> str:
+    text = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _model_loss(model: Callable[..., Any], key: str) -> float | None:
+    """Returns the default loss argument ``key`` of a model, or None."""
+    func = model
+    while isinstance(func, partial):
+        if key in func.keywords:
+            return float(func.keywords[key])
+        func = func.func
+    parameter = inspect.signature(func).parameters.get(key)
+    if parameter is None or parameter.default is inspect.Parameter.empty:
+        return None
+    return float(parameter.default)
+
+
+def _model(
+    cell: ProtoTKCell | None, name: str, models: Mapping[str, Callable[..., Any]]
+) -> Callable[..., Any] | None:
+    """Returns the model of a leaf cell from its function name, or None."""
+    for key in (cell.function_name if cell is not None else None, name):
+        if key and key in models:
+            return models[key]
+    return None
+
+
+class _LossCache:
+    def __init__(self, max_entries: int = 4096) -> None:
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, LossBudget] = OrderedDict()
+
+    def get(self, key: str, evaluate: Callable[[], LossBudget]) -> LossBudget:
+        budget = self.entries.get(key)
+        if budget is not None:
+            self.entries.move_to_end(key)
+            return budget
+        budget = self.entries[key] = evaluate()
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return budget
+
+
+_cache = _LossCache()
+_couplings: dict[Any, tuple[set[str], set[tuple[str, str]]] | None] = {}
+
+
+def clear_loss_cache() -> None:
+    """Drops all cached cell loss matrices."""
+    _cache.entries.clear()
+    _couplings.clear()
+
+
+def _model_couplings(
+    model: Callable[..., Any],
+) -> tuple[set[str], set[tuple[str, str]]] | None:
+    """Returns the ports and coupled port pairs of a model, or None.
+
+    None if the model cannot be evaluated with its default arguments.
+    """
+    if model not in _couplings:
+        try:
+            sdict = sax.sdict(model(wl=_WAVELENGTHS))
+        except Exception:
+            _couplings[model] = None
+        else:
+            _couplings[model] = (
+                {port for pair in sdict for port in pair},
+                {
+                    pair
+                    for pair, s in sdict.items()
+                    if np.abs(np.asarray(s)).max() > _MIN_COUPLING
+                },
+            )
+    return _couplings[model]
+
+
+def _leaf(
+    name: str,
+    ports: list[str],
+    settings: dict[str, Any],
+    info: dict[str, Any],
+    rates: Mapping[str, float],
+    model: Callable[..., Any] | None,
+) -> LossBudget:
+    """Returns the loss between the coupled ports of a leaf device."""
+    loss = 0.0
+    for key, value in info.items():
+        if key.startswith(_ROUTE_INFO) and key.endswith("_length"):
+            xs = key[len(_ROUTE_INFO) : -len("_length")]
+            if xs in ("", "taper") or xs.endswith("_taper"):
+                continue
+            if xs not in rates:
+                raise ValueError(
+                    f"{name!r} has {value} um of {xs!r} without a propagation "
+                    f"loss. Known cross-sections: {sorted(rates)}."
+                )
+            loss += value * 1e-4 * rates[xs]
+    fiber = [p for p in ports if p.startswith(_FIBER_PORT)]
+    # grating coupler models take the coupling loss as ``loss``
+    key = "loss" if fiber else "loss_dB"
+    device = _model_loss(model, key) if model is not None else None
+    if key in settings:
+        loss += float(settings[key])
+    elif device is not None:
+        loss += device
+    elif fiber:
+        loss += _GRATING_LOSS_DB
+
+    ports = [p for p in ports if p not in fiber] + fiber
+    matrix = np.full((len(ports), len(ports)), loss)
+    couplings = _model_couplings(model) if model is not None else None
+    if couplings is not None and couplings[0] == set(ports):
+        coupled = np.array([[(a, b) in couplings[1] for b in ports] for a in ports])
+        matrix[~coupled] = np.inf
+    np.fill_diagonal(matrix, 0.0)
+    return LossBudget(ports=ports, terminals=len(fiber), loss_dB=matrix)
+
+
+def loss_budget(
+    component: ProtoTKCell,
+    rates: Mapping[str, float] | None = None,
+    models: Mapping[str, Callable[..., Any]] | None = None,
+    netlist_cache: NetlistCache | None = None,
+) -> LossBudget:
+    """Returns the loss budget between the ports and grating couplers of a component.
+
+    Args:
+        component: component to estimate.
+        rates: propagation loss in dB/cm per cross-section. Defaults to
+            ``TECH.loss_dB_cm``.
+        models: device models. Defaults to the active PDK models.
+        netlist_cache: netlist cache. Defaults to the shared netlist cache.
+
+    Raises:
+        ValueError: if a cell has waveguide of a cross-section without a rate.
+    """
+    rates = TECH.loss_dB_cm if rates is None else rates
+    models = gf.get_active_pdk().models if models is None else models
+    netlists = get_netlist(component, recursive=True, cache=netlist_cache)
+    # str() of a partial includes its keywords, so changed model losses miss
+    settings_key = _hash([dict(rates), dict(models)])
+
+    if component.name not in netlists:
+        ports = [p.name for p in component.ports]
+        return _leaf(
+            component.function_name or component.name,
+            ports,
+            component.settings.model_dump(),
+            component.info.model_dump(),
+            rates,
+            _model(component, component.name, models),
+        )
+
+    kcl = component.kcl
+
+    def cell(name: str) -> LossBudget:
+        netlist = netlists[name]
+        key = _hash([name, netlist, settings_key])
+        return _cache.get(key, lambda: reduce(name, netlist))
+
+    def reduce(name: str, netlist: dict[str, Any]) -> LossBudget:
+        parent = gf.Component(base=kcl[name].base)
+        inst_cells = {
+            get_instance_name_from_alias(ref): ref.cell for ref in parent.insts
+        }
+        blocks: dict[str, LossBudget] = {}
+        for inst_name, inst in netlist["instances"].items():
+            child = inst["component"]
+            if child in netlists:
+                blocks[inst_name] = cell(child)
+            else:
+                child_cell = inst_cells.get(inst_name)
+                blocks[inst_name] = _leaf(
+                    child,
+                    [p.name for p in child_cell.ports] if child_cell else [],
+                    inst.get("settings") or {},
+                    inst.get("info") or {},
+                    rates,
+                    _model(child_cell, child, models),
+                )
+
+        # two nodes per instance port, light entering (node) and leaving the
+        # instance (node + n). Edges run from entering to leaving ports inside
+        # instances and from leaving to entering ports along nets, so a path
+        # never turns back inside an instance, such as MMI output to output.
+        offsets = np.cumsum([0, *(len(b.ports) for b in blocks.values())])
+        n = offsets[-1]
+        index = {
+            f"{inst_name},{port}": offset + i
+            for (inst_name, block), offset in zip(blocks.items(), offsets)
+            for i, port in enumerate(block.ports)
+        }
+        rows, cols, data = [], [], []
+        for block, offset in zip(blocks.values(), offsets):
+            k = len(block.ports)
+            i, j = np.nonzero(np.isfinite(block.loss_dB) & ~np.eye(k, dtype=bool))
+            rows.append(i + offset)
+            cols.append(j + offset + n)
+            data.append(block.loss_dB[i, j])
+        nets = [
+            (index[n["p1"]], index[n["p2"]])
+            for n in netlist.get("nets", [])
+            if n["p1"] in index and n["p2"] in index
+        ]
+        if nets:
+            a, b = np.array(nets).T
+            rows += [a + n, b + n]
+            cols += [b, a]
+            data += [np.zeros(len(a)), np.zeros(len(a))]
+        # explicit zeros stay edges of the graph
+        graph = sparse.csr_matrix(
+            (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(2 * n, 2 * n),
+        )
+
+        ports = [p for p, ref in netlist["ports"].items() if ref in index]
+        nodes = [index[netlist["ports"][p]] for p in ports]
+        terminals = 0
+        for (inst_name, block), offset in zip(blocks.items(), offsets):
+            start = len(block.ports) - block.terminals
+            for i, port in enumerate(block.ports[start:], start):
+                ports.append(f"{inst_name}.{port}")
+                nodes.append(offset + i)
+                terminals += 1
+        dist = csgraph.shortest_path(graph, method="D", indices=nodes)
+        dist = dist[:, [node + n for node in nodes]]
+        np.fill_diagonal(dist, 0.0)
+        return LossBudget(ports=ports, terminals=terminals, loss_dB=dist)
+
+    return cell(component.name)
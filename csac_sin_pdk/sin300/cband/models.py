@@ -23,7 +23,7 @@ Float = float | FloatArray
 straight_strip = partial(
     sm.straight,
     length=10.0,
-    loss=0.0,
+    loss_dB_cm=0.0,
     wl0=1.55,
     neff=2.38,
     ng=4.30,
@@ -32,7 +32,7 @@ straight_strip = partial(
 straight_rib = partial(
     sm.straight,
     length=10.0,
-    loss=0.0,
+    loss_dB_cm=0.0,
     wl0=1.55,
     neff=2.38,
     ng=4.30,
@@ -46,7 +46,14 @@ def straight(
     loss: float = 0.0,
     cross_section: str = "strip",
 ) -> sax.SDict:
-    """Straight waveguide model."""
+    """Straight waveguide model.
+
+    Args:
+        wl: wavelength in um.
+        length: length in um.
+        loss: propagation loss in dB/cm.
+        cross_section: strip or rib.
+    """
     wl = jnp.asarray(wl)  # type: ignore
     fs = {
         "strip": straight_strip,
@@ -56,7 +63,7 @@ def straight(
     return f(
         wl=wl,  # type: ignore
         length=length,
-        loss=loss,
+        loss_dB_cm=loss,
     )
 
 
@@ -207,6 +214,11 @@ def mmi2x2(
     )
 
 
+# fixed PDK cells
+SiN300nm_1550nm_TE_STRIP_2x1_MMI = mmi1x2
+SiN300nm_1550nm_TE_STRIP_2x2_MMI = mmi2x2
+
+
 ##############################
 # Evanescent couplers
 ##############################
@@ -0,0 +1,237 @@
+"""Memoised hierarchical netlist extraction.
+
+``Component.get_netlist(recursive=True)`` walks the whole hierarchy on every
+call and visits a subcell once per reference. On a full die, netlist and
+simulate loops spend most of their time re-extracting cells that did not
+change. :class:`NetlistCache` extracts each unique cell once and keeps its
+netlist keyed by cell identity (layout and cell index) and a signature.
+
+The signature of a cell hashes its own level: name, ports, settings, info,
+and the placement of every instance. It also hashes the signatures of its
+children, so it changes exactly when the cell or anything below it changed.
+The own-level part of a locked cell (every ``gf.cell`` result) cannot
+change and is computed once. For unlocked cells it is recomputed on each
+call, which is cheaper than extracting them again. After an edit, only the
+edited cell and its parents are extracted again.
+
+.. code::
+
+    from csac_sin_pdk.sin300.cband import PDK
+    from csac_sin_pdk.sin300.cband.netlist import get_netlist
+
+    PDK.activate()
+    netlists = get_netlist(chip, recursive=True)  # extracts every cell once
+    netlists = get_netlist(chip, recursive=True)  # served from the cache
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+import gdsfactory as gf
+from gdsfactory.get_netlist import get_instance_name_from_alias
+from gdsfactory.get_netlist import get_netlist as _get_netlist
+from kfactory.kcell import ProtoTKCell
+
+__all__ = ["NetlistCache", "clear_netlist_cache", "get_netlist"]
+
+CellKey = tuple[int, int]
+
+
+def _qualname(value: Any) -> str:
+    return f"{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', value)}"
+
+
+class NetlistCache:
+    """Netlists of cells, re-extracted only when a cell or its children change.
+
+    Args:
+        get_netlist_func: function extracting the netlist of one cell.
+        max_entries: least recently used netlists beyond this are dropped.
+    """
+
+    def __init__(
+        self,
+        get_netlist_func: Callable[..., dict[str, Any]] = _get_netlist,
+        max_entries: int = 65536,
+    ) -> None:
+        """Create an empty cache."""
+        self.get_netlist_func = get_netlist_func
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._netlists: OrderedDict[tuple[CellKey, str, str], dict[str, Any]] = (
+            OrderedDict()
+        )
+        # own-level signatures of locked cells, keyed by identity and name
+        self._locked: dict[tuple[CellKey, str], str] = {}
+
+    def __len__(self) -> int:
+        """Number of cached netlists."""
+        return len(self._netlists)
+
+    def clear(self) -> None:
+        """Drops all entries and resets the counters."""
+        self._netlists.clear()
+        self._locked.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _own_signature(self, cell: ProtoTKCell) -> str:
+        key = ((id(cell.kcl), cell.cell_index()), cell.name)
+        if cell.locked and key in self._locked:
+            return self._locked[key]
+        h = hashlib.sha256(cell.name.encode())
+        for port in cell.ports:
+            h.update(
+                f"|{port.name} {port.trans} {port.width} {port.layer_info} "
+                f"{port.port_type}".encode()
+            )
+        h.update(cell.settings.model_dump_json().encode())
+        h.update(cell.info.model_dump_json().encode())
+        instances = sorted(
+            f"{inst.to_s()} {inst.properties()}" for inst in cell.kdb_cell.each_inst()
+        )
+        h.update("\n".join(instances).encode())
+        for vinst in getattr(cell, "vinsts", ()):
+            h.update(f"|{vinst.cell.name} {vinst.trans}".encode())
+        signature = h.hexdigest()
+        if cell.locked:
+            self._locked[key] = signature
+        return signature
+
+    def signatures(self, component: ProtoTKCell) -> dict[int, str]:
+        """Returns the signature of a component and of every cell below it.
+
+        Args:
+            component: top cell.
+
+        Returns:
+            signature by cell index.
+        """
+        kcl = component.kcl
+        layout = kcl.layout
+        cells = [*component.kdb_cell.called_cells(), component.cell_index()]
+        # a child is always fewer hierarchy levels deep than its parents
+        cells.sort(key=lambda ci: layout.cell(ci).hierarchy_levels())
+        signatures: dict[int, str] = {}
+        for ci in cells:
+            cell = kcl[ci]
+            h = hashlib.sha256(self._own_signature(cell).encode())
+            for child in sorted(set(cell.kdb_cell.each_child_cell())):
+                h.update(signatures[child].encode())
+            signatures[ci] = h.hexdigest()
+        return signatures
+
+    def _settings_key(self, kwargs: dict[str, Any]) -> str:
+        items = sorted(
+            (k, _qualname(v) if callable(v) else repr(v)) for k, v in kwargs.items()
+        )
+        return repr((_qualname(self.get_netlist_func), items))
+
+    def _netlist(
+        self, cell: ProtoTKCell, signature: str, settings: str, **kwargs: Any
+    ) -> dict[str, Any]:
+        key = ((id(cell.kcl), cell.cell_index()), signature, settings)
+        netlist = self._netlists.get(key)
+        if netlist is not None:
+            self._netlists.move_to_end(key)
+            self.hits += 1
+            return netlist
+        self.misses += 1
+        netlist = self.get_netlist_func(gf.Component(base=cell.base), **kwargs)
+        self._netlists[key] = netlist
+        while len(self._netlists) > self.max_entries:
+            self._netlists.popitem(last=False)
+        return netlist
+
+    def get_netlist(self, component: ProtoTKCell, **kwargs: Any) -> dict[str, Any]:
+        """Returns the netlist of one component.
+
+        Args:
+            component: to extract the netlist from.
+            kwargs: passed to the netlist function.
+        """
+        signature = self.signatures(component)[component.cell_index()]
+        netlist = self._netlist(
+            component, signature, self._settings_key(kwargs), **kwargs
+        )
+        return copy.deepcopy(netlist)
+
+    def get_netlist_recursive(
+        self,
+        component: ProtoTKCell,
+        component_suffix: str = "",
+        get_instance_name: Callable[..., str] = get_instance_name_from_alias,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        """Returns the netlists of a component and of all cells below it.
+
+        Matches ``gdsfactory.get_netlist.get_netlist_recursive`` but visits
+        every unique cell once.
+
+        Args:
+            component: to extract the netlists from.
+            component_suffix: suffix appended to each cell name.
+            get_instance_name: function returning the name of an instance.
+            kwargs: passed to the netlist function.
+        """
+        kcl = component.kcl
+        signatures = self.signatures(component)
+        settings = self._settings_key(kwargs)
+        has_references = {
+            ci: bool(kcl[ci].kdb_cell.child_instances()) or bool(kcl[ci].vinsts)
+            for ci in signatures
+        }
+
+        netlists: dict[str, Any] = {}
+        for ci, signature in signatures.items():
+            if not has_references[ci]:
+                continue
+            cell = kcl[ci]
+            netlist = copy.deepcopy(
+                self._netlist(cell, signature, settings, **kwargs)
+            )
+            for ref in gf.Component(base=cell.base).insts:
+                rcell = ref.cell
+                if not has_references.get(rcell.cell_index(), False):
+                    continue
+                netlist["instances"][get_instance_name(ref)] = {
+                    "component": f"{rcell.name}{component_suffix}",
+                    "settings": rcell.settings.model_dump(),
+                    "info": rcell.info.model_dump(),
+                }
+            netlists[f"{cell.name}{component_suffix}"] = netlist
+        return netlists
+
+
+_cache = NetlistCache()
+
+
+def clear_netlist_cache() -> None:
+    """Drops all entries of the shared netlist cache."""
+    _cache.clear()
+
+
+def get_netlist(
+    component: ProtoTKCell,
+    recursive: bool = False,
+    cache: NetlistCache | None = None,
+    **kwargs: Any,
+) -> dict[str, Any]:
+    """Returns the netlist of a component like ``Component.get_netlist``.
+
+    Args:
+        component: to extract the netlist from.
+        recursive: if True, returns the netlists of all cells below it too.
+        cache: cache to use. Defaults to a cache shared by all calls.
+        kwargs: passed to the netlist function.
+    """
+    cache = _cache if cache is None else cache
+    if recursive:
+        return cache.get_netlist_recursive(component, **kwargs)
+    return cache.get_netlist(component, **kwargs)
@@ -0,0 +1,331 @@
+"""Rectangle packing for large DOE floorplans.
+
+Copies of the same cell are grouped into blocks placed as instance arrays,
+and the blocks are packed with a skyline (bottom-left) or a shelf heuristic.
+Both heuristics work on NumPy arrays of sizes and return lower-left
+positions, so they can also be used on plain bounding boxes.
+
+.. code::
+
+    from csac_sin_pdk.sin300.cband.packing import pack_rectangles
+
+    xy = pack_rectangles(sizes, width=10_000, spacing=20)
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Literal
+
+import gdsfactory as gf
+import numpy as np
+from gdsfactory.typings import ComponentSpec, LayerSpec
+from kfactory import kdb
+
+from csac_sin_pdk.sin300.cband.tech import TECH
+
+PackMethod = Literal["skyline", "shelf", "auto"]
+
+_SKYLINE_MAX = 2000
+
+
+def _skyline(sizes: np.ndarray, width: float) -> np.ndarray:
+    """Bottom-left skyline packing of rectangles sorted by the caller."""
+    eps = 1e-9
+    xy = np.zeros_like(sizes)
+    # skyline segments: start x and height, the last one is a sentinel at `width`
+    xs = np.array([0.0, width])
+    ys = np.array([0.0, np.inf])
+    for i, (w, h) in enumerate(sizes):
+        starts = xs[:-1]
+        ends = starts + w
+        fits = ends <= width + eps
+        if not fits.any():
+            raise ValueError(f"rectangle {i} of width {w} is wider than {width}")
+        # height under each candidate is the max over the segments it covers
+        j_end = np.searchsorted(xs, ends - eps, side="left").clip(max=len(xs) - 1)
+        idx = np.empty(2 * len(starts), dtype=np.intp)
+        idx[0::2] = np.arange(len(starts))
+        idx[1::2] = j_end
+        heights = np.maximum.reduceat(ys, idx)[0::2]
+        heights[~fits] = np.inf
+        k = int(np.argmin(heights))
+        x, y = starts[k], heights[k]
+        xy[i] = x, y
+
+        x_end = x + w
+        left = xs < x - eps
+        right = xs >= x_end - eps
+        new_xs = [xs[left], [x]]
+        new_ys = [ys[left], [y + h]]
+        if not np.isclose(xs[right][0], x_end, rtol=0, atol=eps):
+            new_xs.append([x_end])
+            new_ys.append([ys[np.searchsorted(xs, x_end, side="right") - 1]])
+        new_xs.append(xs[right])
+        new_ys.append(ys[right])
+        xs = np.concatenate(new_xs)
+        ys = np.concatenate(new_ys)
+        same = np.r_[False, ys[1:] == ys[:-1]]
+        xs, ys = xs[~same], ys[~same]
+    return xy
+
+
+def _shelf(sizes: np.ndarray, width: float) -> np.ndarray:
+    """Next-fit shelf packing of rectangles sorted by decreasing height."""
+    xy = np.zeros_like(sizes)
+    cum = np.concatenate([[0.0], np.cumsum(sizes[:, 0])])
+    n = len(sizes)
+    start = 0
+    y = 0.0
+    while start < n:
+        stop = int(np.searchsorted(cum, cum[start] + width + 1e-9, side="right")) - 1
+        if stop <= start:
+            raise ValueError(
+                f"rectangle {start} of width {sizes[start, 0]} is wider than {width}"
+            )
+        xy[start:stop, 0] = cum[start:stop] - cum[start]
+        xy[start:stop, 1] = y
+        y += sizes[start:stop, 1].max()
+        start = stop
+    return xy
+
+
+def pack_rectangles(
+    sizes: np.ndarray | Sequence[tuple[float, float]],
+    width: float,
+    height: float | None = None,
+    spacing: float = 0.0,
+    method: PackMethod = "auto",
+) -> np.ndarray:
+    """Returns the lower-left corner of every rectangle packed into a strip.
+
+    Rectangles are sorted by decreasing height (then width) before packing
+    and the positions are returned in the input order.
+
+    Args:
+        sizes: (n, 2) array of rectangle widths and heights in um.
+        width: strip width in um.
+        height: maximum strip height in um. None leaves it unbounded.
+        spacing: minimum clearance between rectangles in um.
+        method: ``skyline`` places each rectangle at the lowest, then leftmost,
+            position of the skyline. ``shelf`` fills rows left to right and is
+            fully vectorized. ``auto`` uses skyline up to 2000 rectangles.
+
+    Raises:
+        ValueError: if a rectangle is wider than the strip or the packing is
+            taller than ``height``.
+    """
+    sizes = np.asarray(sizes, dtype=float).reshape(-1, 2)
+    if len(sizes) == 0:
+        return np.zeros((0, 2))
+    if method == "auto":
+        method = "skyline" if len(sizes) <= _SKYLINE_MAX else "shelf"
+    if method not in ("skyline", "shelf"):
+        raise ValueError(f"method={method!r} must be 'skyline', 'shelf' or 'auto'")
+
+    # pad every rectangle by the spacing so that neighbours keep their clearance
+    padded = sizes + spacing
+    order = np.lexsort((-padded[:, 0], -padded[:, 1]))
+    packer = _skyline if method == "skyline" else _shelf
+    xy_sorted = packer(padded[order], width + spacing)
+
+    xy = np.empty_like(xy_sorted)
+    xy[order] = xy_sorted
+    if height is not None:
+        top = (xy[:, 1] + sizes[:, 1]).max()
+        if top > height + 1e-9:
+            raise ValueError(
+                f"packing needs a height of {top:.1f} um, only {height:.1f} um available"
+            )
+    return xy
+
+
+@dataclass
+class Block:
+    """Copies of one cell arranged as an instance array.
+
+    ``rows`` full rows of ``columns`` copies, plus ``remainder`` copies in one
+    extra row on top.
+    """
+
+    component: gf.Component
+    copies: int
+    columns: int
+    rows: int
+    remainder: int
+    pitch_x: float
+    pitch_y: float
+
+    @property
+    def size(self) -> tuple[float, float]:
+        """Width and height of the block in um, without trailing spacing."""
+        rows = self.rows + (self.remainder > 0)
+        return (
+            (self.columns - 1) * self.pitch_x + self.component.dxsize,
+            (rows - 1) * self.pitch_y + self.component.dysize,
+        )
+
+
+def make_block(
+    component: gf.Component, copies: int, width: float, spacing: float
+) -> Block:
+    """Returns a block arranging ``copies`` of a component close to a square.
+
+    Args:
+        component: cell to repeat.
+        copies: number of copies.
+        width: maximum block width in um.
+        spacing: clearance between copies in um.
+    """
+    pitch_x = component.dxsize + spacing
+    pitch_y = component.dysize + spacing
+    max_columns = max(1, int((width + spacing) // pitch_x))
+    columns = int(np.ceil(np.sqrt(copies * pitch_y / pitch_x)))
+    columns = int(np.clip(columns, 1, min(copies, max_columns)))
+    rows, remainder = divmod(copies, columns)
+    return Block(component, copies, columns, rows, remainder, pitch_x, pitch_y)
+
+
+def floorplan_bbox(
+    component: gf.Component, layer: LayerSpec = "floorplan"
+) -> tuple[float, float, float, float]:
+    """Returns (xmin, ymin, xmax, ymax) of the polygons of a layer in um.
+
+    Raises:
+        ValueError: if the component has nothing on the layer.
+    """
+    layer_index = gf.get_layer(layer)
+    region = kdb.Region(component.begin_shapes_rec(layer_index))
+    if region.is_empty():
+        raise ValueError(f"{component.name!r} has no shapes on layer {layer!r}")
+    box = region.bbox().to_dtype(component.kcl.dbu)
+    return box.left, box.bottom, box.right, box.top
+
+
+def place_packed(
+    c: gf.Component,
+    components: Sequence[gf.Component],
+    copies: Sequence[int],
+    width: float,
+    height: float | None = None,
+    origin: tuple[float, float] = (0.0, 0.0),
+    spacing: float = TECH.spacing_doe,
+    method: PackMethod = "auto",
+) -> list[Block]:
+    """Packs copies of components into ``c`` as instance arrays.
+
+    Args:
+        c: component to place into.
+        components: cells to place.
+        copies: number of copies of each cell.
+        width: available width in um.
+        height: available height in um. None leaves it unbounded.
+        origin: lower-left corner of the available area in um.
+        spacing: clearance between cells in um.
+        method: packing heuristic, see :func:`pack_rectangles`.
+
+    Returns:
+        The blocks in the order of ``components``.
+    """
+    if len(components) != len(copies):
+        raise ValueError(
+            f"got {len(components)} components but {len(copies)} copy counts"
+        )
+    blocks = [
+        make_block(component, n, width=width, spacing=spacing)
+        for component, n in zip(components, copies)
+        if n > 0
+    ]
+    xy = pack_rectangles(
+        [b.size for b in blocks], width=width, height=height, spacing=spacing, method=method
+    )
+    x0, y0 = origin
+    for block, (x, y) in zip(blocks, xy):
+        component = block.component
+        dx = x0 + x - component.dxmin
+        dy = y0 + y - component.dymin
+        if block.rows:
+            ref = c.add_ref(
+                component,
+                columns=block.columns,
+                rows=block.rows,
+                column_pitch=block.pitch_x,
+                row_pitch=block.pitch_y,
+            )
+            ref.dmove((dx, dy))
+        if block.remainder:
+            ref = c.add_ref(
+                component,
+                columns=block.remainder,
+                rows=1,
+                column_pitch=block.pitch_x,
+                row_pitch=block.pitch_y,
+            )
+            ref.dmove((dx, dy + block.rows * block.pitch_y))
+    return blocks
+
+
+@gf.cell
+def pack_components(
+    components: Sequence[ComponentSpec],
+    copies: int | Sequence[int] = 1,
+    floorplan: ComponentSpec | None = None,
+    layer_floorplan: LayerSpec = "floorplan",
+    width: float = 10_000.0,
+    height: float | None = None,
+    spacing: float = TECH.spacing_doe,
+    method: PackMethod = "auto",
+) -> gf.Component:
+    """Returns heterogeneous cells packed as instance arrays.
+
+    Args:
+        components: cells to pack.
+        copies: number of copies, one for all cells or one per cell.
+        floorplan: die whose ``layer_floorplan`` bounding box is the packing
+            area. The die is placed too. Overrides width and height.
+        layer_floorplan: layer describing the available area.
+        width: available width in um when there is no floorplan.
+        height: available height in um when there is no floorplan.
+        spacing: clearance between cells and to the floorplan edge in um.
+        method: packing heuristic, see :func:`pack_rectangles`.
+    """
+    c = gf.Component()
+    cells = [gf.get_component(spec) for spec in components]
+    counts = [copies] * len(cells) if isinstance(copies, int) else list(copies)
+
+    origin = (0.0, 0.0)
+    if floorplan is not None:
+        die = gf.get_component(floorplan)
+        c << die
+        xmin, ymin, xmax, ymax = floorplan_bbox(die, layer_floorplan)
+        origin = (xmin + spacing, ymin + spacing)
+        width = xmax - xmin - 2 * spacing
+        height = ymax - ymin - 2 * spacing
+
+    blocks = place_packed(
+        c,
+        cells,
+        counts,
+        width=width,
+        height=height,
+        origin=origin,
+        spacing=spacing,
+        method=method,
+    )
+    c.info["num_cells"] = sum(b.copies for b in blocks)
+    c.info["num_arrays"] = sum((b.rows > 0) + (b.remainder > 0) for b in blocks)
+    return c
+
+
+if __name__ == "__main__":
+    import time
+
+    from csac_sin_pdk.sin300.cband import PDK
+
+    PDK.activate()
+    rng = np.random.default_rng(0)
+    sizes = rng.uniform(10, 300, size=(50_000, 2))
+    t0 = time.perf_counter()
+    xy = pack_rectangles(sizes, width=50_000, spacing=TECH.spacing_doe)
+    print(f"shelf: 50k rectangles in {time.perf_counter() - t0:.3f} s")
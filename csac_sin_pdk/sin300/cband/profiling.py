@@ -0,0 +1,358 @@
+"""Opt-in build profiler for PDK cells and routing strategies.
+
+Wraps every cell factory and routing strategy of the active PDK and records,
+per call, the wall time, whether the call was served from the cell cache,
+the vertex count and child-instance count of the returned cell and the
+Python memory delta.
+
+.. code::
+
+    from csac_sin_pdk.sin300.cband import PDK
+    from csac_sin_pdk.sin300.cband.profiling import profile
+
+    PDK.activate()
+    with profile() as prof:
+        c = gf.get_component("ring_double")
+
+    prof.print_summary(sort_by="self_time")
+    prof.write_chrome_trace("build.json")  # open in https://ui.perfetto.dev
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from functools import wraps
+from typing import Any, Literal
+
+import gdsfactory as gf
+from gdsfactory.pdk import Pdk
+
+CallKind = Literal["cell", "route"]
+SortKey = Literal[
+    "name",
+    "calls",
+    "misses",
+    "total_time",
+    "self_time",
+    "mean_time",
+    "max_time",
+    "vertices",
+    "instances",
+    "memory",
+]
+
+
+@dataclass
+class CallRecord:
+    """One profiled call of a cell factory or routing strategy."""
+
+    name: str
+    kind: CallKind
+    start: float
+    duration: float
+    self_time: float
+    depth: int
+    thread_id: int
+    cache_hit: bool | None = None
+    vertices: int = 0
+    instances: int = 0
+    memory_delta: int = 0
+    cell_name: str | None = None
+
+
+@dataclass
+class SummaryRow:
+    """Aggregated statistics of all calls to one factory."""
+
+    name: str
+    kind: CallKind
+    calls: int = 0
+    hits: int = 0
+    misses: int = 0
+    total_time: float = 0.0
+    self_time: float = 0.0
+    max_time: float = 0.0
+    vertices: int = 0
+    instances: int = 0
+    memory: int = 0
+
+    @property
+    def mean_time(self) -> float:
+        """Mean wall time per call in seconds."""
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+@dataclass
+class _Frame:
+    child_time: float = 0.0
+
+
+def count_vertices(component: gf.Component) -> int:
+    """Returns the number of polygon vertices owned by the cell itself.
+
+    Child instances are not traversed, so the count reflects the work done by
+    this factory only.
+    """
+    kdb_cell = component.kdb_cell
+    n = 0
+    for layer_index in component.kcl.layer_indexes():
+        shapes = kdb_cell.shapes(layer_index)
+        if shapes.is_empty():
+            continue
+        for shape in shapes.each():
+            if shape.is_text():
+                continue
+            polygon = shape.polygon
+            if polygon is not None:
+                n += polygon.num_points()
+    return n
+
+
+@dataclass
+class Profiler:
+    """Collects :class:`CallRecord` for wrapped cell factories and routes.
+
+    Args:
+        trace_memory: measure the Python heap delta with :mod:`tracemalloc`.
+            Allocations made by KLayout in C++ are not visible to it.
+        count_geometry: count vertices and child instances of each cell.
+    """
+
+    trace_memory: bool = False
+    count_geometry: bool = True
+    records: list[CallRecord] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        """Initialize the per-thread call stack."""
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+
+    def _stack(self) -> list[_Frame]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _memory(self) -> int:
+        return tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+
+    def _call(
+        self, name: str, kind: CallKind, func: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        stack = self._stack()
+        frame = _Frame()
+        stack.append(frame)
+        kcl = gf.kcl
+        n_cells = kcl.layout.cells()
+        component = args[0] if kind == "route" and args else kwargs.get("component")
+        n_insts = len(component.insts) if kind == "route" and component is not None else 0
+        mem0 = self._memory()
+        t0 = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            duration = time.perf_counter() - t0
+            stack.pop()
+            if stack:
+                stack[-1].child_time += duration
+
+        record = CallRecord(
+            name=name,
+            kind=kind,
+            start=t0 - self._t0,
+            duration=duration,
+            self_time=duration - frame.child_time,
+            depth=len(stack),
+            thread_id=threading.get_ident(),
+            memory_delta=self._memory() - mem0,
+        )
+        if kind == "cell" and isinstance(result, gf.Component):
+            record.cell_name = result.name
+            record.cache_hit = result.cell_index() < n_cells
+            if self.count_geometry and not record.cache_hit:
+                record.vertices = count_vertices(result)
+                record.instances = result.kdb_cell.child_instances()
+        elif kind == "route" and component is not None:
+            record.instances = len(component.insts) - n_insts
+
+        with self._lock:
+            self.records.append(record)
+        return result
+
+    def wrap(
+        self, name: str, func: Callable[..., Any], kind: CallKind = "cell"
+    ) -> Callable[..., Any]:
+        """Returns ``func`` wrapped so that each call is recorded under ``name``."""
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return self._call(name, kind, func, *args, **kwargs)
+
+        wrapper.__wrapped_by_profiler__ = True  # type: ignore[attr-defined]
+        return wrapper
+
+    def summary(
+        self, sort_by: SortKey = "total_time", reverse: bool | None = None
+    ) -> list[SummaryRow]:
+        """Returns one aggregated row per factory.
+
+        Args:
+            sort_by: column to sort by.
+            reverse: descending order. Defaults to True except for ``name``.
+        """
+        rows: dict[tuple[str, str], SummaryRow] = {}
+        for r in self.records:
+            row = rows.setdefault((r.kind, r.name), SummaryRow(name=r.name, kind=r.kind))
+            row.calls += 1
+            row.hits += r.cache_hit is True
+            row.misses += r.cache_hit is False
+            row.total_time += r.duration
+            row.self_time += r.self_time
+            row.max_time = max(row.max_time, r.duration)
+            row.vertices += r.vertices if not r.cache_hit else 0
+            row.instances += r.instances if not r.cache_hit else 0
+            row.memory += r.memory_delta
+        if reverse is None:
+            reverse = sort_by != "name"
+        return sorted(rows.values(), key=lambda row: getattr(row, sort_by), reverse=reverse)
+
+    def format_summary(
+        self, sort_by: SortKey = "total_time", limit: int | None = None
+    ) -> str:
+        """Returns the summary as a fixed-width text table."""
+        header = (
+            f"{'name':<40} {'kind':<5} {'calls':>6} {'hits':>6} {'misses':>6} "
+            f"{'total[ms]':>10} {'self[ms]':>10} {'mean[ms]':>9} {'max[ms]':>9} "
+            f"{'vertices':>9} {'insts':>6} {'mem[kB]':>9}"
+        )
+        lines = [header, "-" * len(header)]
+        for row in self.summary(sort_by=sort_by)[:limit]:
+            lines.append(
+                f"{row.name[:40]:<40} {row.kind:<5} {row.calls:>6} {row.hits:>6} "
+                f"{row.misses:>6} {row.total_time * 1e3:>10.2f} "
+                f"{row.self_time * 1e3:>10.2f} {row.mean_time * 1e3:>9.3f} "
+                f"{row.max_time * 1e3:>9.3f} {row.vertices:>9} {row.instances:>6} "
+                f"{row.memory / 1024:>9.1f}"
+            )
+        return "\n".join(lines)
+
+    def print_summary(
+        self, sort_by: SortKey = "total_time", limit: int | None = 30
+    ) -> None:
+        """Prints the summary table."""
+        print(self.format_summary(sort_by=sort_by, limit=limit))
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """Returns the records in Chrome trace event format (also read by Perfetto)."""
+        pid = os.getpid()
+        events: list[dict[str, Any]] = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": "csac_sin_pdk build"},
+            }
+        ]
+        for r in self.records:
+            args = {
+                k: v
+                for k, v in asdict(r).items()
+                if k not in {"name", "kind", "start", "duration", "thread_id", "depth"}
+            }
+            events.append(
+                {
+                    "name": r.name,
+                    "cat": r.kind,
+                    "ph": "X",
+                    "ts": r.start * 1e6,
+                    "dur": r.duration * 1e6,
+                    "pid": pid,
+                    "tid": r.thread_id,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, filepath: str | pathlib.Path) -> pathlib.Path:
+        """Writes the Chrome trace JSON and returns its path."""
+        filepath = pathlib.Path(filepath)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        filepath.write_text(json.dumps(self.to_chrome_trace()))
+        return filepath
+
+    def clear(self) -> None:
+        """Drops all records."""
+        with self._lock:
+            self.records.clear()
+        self._t0 = time.perf_counter()
+
+
+@contextmanager
+def profile(
+    pdk: Pdk | None = None,
+    profiler: Profiler | None = None,
+    cells: bool = True,
+    routing_strategies: bool = True,
+    trace_memory: bool = False,
+) -> Iterator[Profiler]:
+    """Instruments the cells and routing strategies of a PDK for the duration of the block.
+
+    Cells requested by name through ``gf.get_component`` (which is how cells
+    reference each other and how routes instantiate straights and bends) are
+    recorded. Direct calls to the python functions bypass the PDK and are not.
+
+    Args:
+        pdk: PDK to instrument. Defaults to the active PDK.
+        profiler: existing profiler to append records to.
+        cells: instrument ``pdk.cells``.
+        routing_strategies: instrument ``pdk.routing_strategies``.
+        trace_memory: record Python heap deltas with :mod:`tracemalloc`.
+    """
+    pdk = pdk or gf.get_active_pdk()
+    profiler = profiler or Profiler(trace_memory=trace_memory)
+    started_tracemalloc = False
+    if profiler.trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started_tracemalloc = True
+
+    patched: list[tuple[dict[str, Any], str, Any]] = []
+    targets: list[tuple[dict[str, Any] | None, CallKind]] = []
+    if cells:
+        targets.append((pdk.cells, "cell"))
+    if routing_strategies:
+        targets.append((pdk.routing_strategies, "route"))
+
+    for mapping, kind in targets:
+        if not mapping:
+            continue
+        for name, func in list(mapping.items()):
+            if getattr(func, "__wrapped_by_profiler__", False):
+                continue
+            patched.append((mapping, name, func))
+            mapping[name] = profiler.wrap(name, func, kind=kind)
+    try:
+        yield profiler
+    finally:
+        for mapping, name, func in patched:
+            mapping[name] = func
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    from csac_sin_pdk.sin300.cband import PDK
+
+    PDK.activate()
+    with profile(trace_memory=True) as prof:
+        gf.get_component("ring_double")
+        gf.get_component("ring_double")
+        gf.get_component("sim_adiab_taper")
+    prof.print_summary(sort_by="self_time")
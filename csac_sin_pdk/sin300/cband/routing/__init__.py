@@ -0,0 +1,53 @@
+"""Routing engines for the PDK routing strategies."""
+
+from csac_sin_pdk.sin300.cband.routing.astar import (
+    GridPyramid,
+    add_bundle_astar_multires,
+    clear_pyramids,
+    find_route_multires,
+    get_pyramid,
+)
+from csac_sin_pdk.sin300.cband.routing.cache import (
+    RouteCache,
+    clear_route_cache,
+    route_cache,
+)
+from csac_sin_pdk.sin300.cband.routing.fanout import (
+    add_fanout_metal,
+    assign_pads,
+    fanout_tracks,
+)
+from csac_sin_pdk.sin300.cband.routing.obstacles import (
+    ObstacleIndex,
+    RoutingContext,
+    clear_obstacle_indexes,
+    get_obstacle_index,
+    routing_context,
+)
+from csac_sin_pdk.sin300.cband.routing.scheduler import (
+    Schedule,
+    partition_bundles,
+    route_bundles,
+)
+
+__all__ = [
+    "GridPyramid",
+    "ObstacleIndex",
+    "RouteCache",
+    "RoutingContext",
+    "Schedule",
+    "add_bundle_astar_multires",
+    "add_fanout_metal",
+    "assign_pads",
+    "clear_obstacle_indexes",
+    "clear_pyramids",
+    "clear_route_cache",
+    "fanout_tracks",
+    "find_route_multires",
+    "get_obstacle_index",
+    "get_pyramid",
+    "partition_bundles",
+    "route_bundles",
+    "route_cache",
+    "routing_context",
+]
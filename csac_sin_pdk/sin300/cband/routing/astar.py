@@ -0,0 +1,704 @@
+"""Coarse-to-fine A* bundle routing on a cached grid pyramid.
+
+The obstacles of a die are rasterized once into an occupancy grid and
+max-pooled into coarser levels. A route is first searched on the coarsest
+level, then refined level by level inside a corridor around the previous
+path, so the fine search only ever sees a thin band of the die. The final
+level models bends as macro moves of the bend size, which guarantees that
+consecutive corners are far enough apart for the PDK bend.
+
+The pyramid of a die is cached between bundles and rasterized from the
+persistent :class:`~csac_sin_pdk.sin300.cband.routing.obstacles.ObstacleIndex`
+of the die. Only the windows the index logged as changed since the last
+bundle are re-rasterized, so routing many bundles on the same die does not
+re-read the whole layout each time.
+
+.. code::
+
+    from csac_sin_pdk.sin300.cband import PDK
+
+    PDK.activate()
+    route = PDK.routing_strategies["route_astar_multires"]
+    route(c, ports1, ports2)
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from functools import partial
+
+import numpy as np
+from doroutes import pcells, util
+from doroutes.fanin import add_fan_in
+from doroutes.routing import add_route_from_corners
+from doroutes.types import (
+    LayerLike,
+    PortLike,
+    validate_orientation,
+    validate_position_with_orientation,
+)
+from kfactory import kdb
+from kfactory.kcell import ProtoTKCell
+from kfactory.typings import KCellSpec
+from scipy import ndimage, sparse
+from scipy.sparse import csgraph
+
+from csac_sin_pdk.sin300.cband.routing.obstacles import (
+    ObstacleIndex,
+    get_obstacle_index,
+)
+
+__all__ = [
+    "BundleJob",
+    "GridPyramid",
+    "add_bundle_astar_multires",
+    "clear_pyramids",
+    "draw_bundle",
+    "find_route_multires",
+    "get_pyramid",
+    "prepare_bundle",
+]
+
+# east, north, west, south: same order as the doroutes orientation chars
+_DIRECTIONS = "enws"
+_STEPS = np.array([(1, 0), (0, 1), (-1, 0), (0, -1)])
+_MAX_PYRAMIDS = 8
+
+Endpoint = tuple[int, int, str]
+
+
+@dataclass
+class GridPyramid:
+    """Occupancy rasters of a die at successively coarser grid units.
+
+    Cell ``(ix, iy)`` of level ``k`` covers
+    ``[x0 + ix * u_k, x0 + (ix + 1) * u_k)`` with ``u_k = unit * 2**k``, and is
+    True when any obstacle polygon overlaps it. Levels are max-pooled, so a
+    free coarse cell is free at every finer level.
+
+    Args:
+        origin: lower-left corner of cell (0, 0) in dbu.
+        unit: cell size of level 0 in dbu.
+        shape: (ny, nx) of level 0.
+        layers: layer indexes rasterized as obstacles.
+        num_levels: number of levels including level 0.
+    """
+
+    origin: tuple[int, int]
+    unit: int
+    shape: tuple[int, int]
+    layers: tuple[int, ...]
+    num_levels: int = 1
+    levels: list[np.ndarray] = field(default_factory=list)
+    generation: int = -1
+    revision: int = -1
+
+    def __post_init__(self) -> None:
+        """Allocate empty levels."""
+        if not self.levels:
+            ny, nx = self.shape
+            for k in range(self.num_levels):
+                f = 1 << k
+                self.levels.append(np.zeros((-(-ny // f), -(-nx // f)), dtype=bool))
+
+    @property
+    def box(self) -> kdb.Box:
+        """Extent of the pyramid in dbu."""
+        x0, y0 = self.origin
+        ny, nx = self.shape
+        return kdb.Box(x0, y0, x0 + nx * self.unit, y0 + ny * self.unit)
+
+    def unit_at(self, level: int) -> int:
+        """Cell size of a level in dbu."""
+        return self.unit << level
+
+    def cell(self, x: float, y: float, level: int = 0) -> tuple[int, int]:
+        """Returns (ix, iy) of the cell containing a point given in dbu."""
+        u = self.unit_at(level)
+        ny, nx = self.levels[level].shape
+        ix = int((x - self.origin[0]) // u)
+        iy = int((y - self.origin[1]) // u)
+        return min(max(ix, 0), nx - 1), min(max(iy, 0), ny - 1)
+
+    def center(self, ix: int, iy: int, level: int = 0) -> tuple[int, int]:
+        """Returns the center of a cell in dbu."""
+        u = self.unit_at(level)
+        return int(self.origin[0] + ix * u + u // 2), int(self.origin[1] + iy * u + u // 2)
+
+    def cells(self, box: kdb.Box, level: int = 0) -> tuple[slice, slice]:
+        """Returns the (y, x) slices of the cells overlapping a box."""
+        u = self.unit_at(level)
+        ny, nx = self.levels[level].shape
+        x0, y0 = self.origin
+        ix0 = max((box.left - x0) // u, 0)
+        iy0 = max((box.bottom - y0) // u, 0)
+        ix1 = min(-((x0 - box.right) // u), nx)
+        iy1 = min(-((y0 - box.top) // u), ny)
+        return slice(iy0, max(iy1, iy0)), slice(ix0, max(ix1, ix0))
+
+    def window(self, box: kdb.Box) -> kdb.Box:
+        """Returns a box grown to whole cells of the coarsest level and clipped to the pyramid.
+
+        Refreshing such a window keeps the max-pooling of every level exact.
+        """
+        f = 1 << (self.num_levels - 1)
+        ny, nx = self.shape
+        ys, xs = self.cells(box)
+        iy0, iy1 = ys.start // f * f, min(-(-ys.stop // f) * f, ny)
+        ix0, ix1 = xs.start // f * f, min(-(-xs.stop // f) * f, nx)
+        x0, y0 = self.origin
+        u = self.unit
+        return kdb.Box(x0 + ix0 * u, y0 + iy0 * u, x0 + ix1 * u, y0 + iy1 * u)
+
+    def rasterize(self, region: kdb.Region, box: kdb.Box | None = None) -> None:
+        """Sets the cells overlapped by a region and updates the coarser levels.
+
+        Args:
+            region: obstacles in dbu.
+            box: window to refresh, as returned by :meth:`window`. Its cells
+                are cleared before rasterizing the region, so the region must
+                hold all obstacles in it.
+        """
+        base = self.levels[0]
+        window = self.box if box is None else box
+        ys, xs = self.cells(window)
+        if ys.stop <= ys.start or xs.stop <= xs.start:
+            return
+
+        u = self.unit
+        x0 = self.origin[0] + xs.start * u
+        y0 = self.origin[1] + ys.start * u
+        ny, nx = ys.stop - ys.start, xs.stop - xs.start
+
+        boxes = [
+            (b.left, b.bottom, b.right, b.top)
+            for polygon in (region & window).decompose_trapezoids_to_region().each()
+            for b in (polygon.bbox(),)
+        ]
+        acc = np.zeros((ny + 1, nx + 1), dtype=np.int32)
+        if boxes:
+            b = np.array(boxes, dtype=np.int64)
+            ix0 = np.clip((b[:, 0] - x0) // u, 0, nx)
+            iy0 = np.clip((b[:, 1] - y0) // u, 0, ny)
+            ix1 = np.clip(-((x0 - b[:, 2]) // u), 0, nx)
+            iy1 = np.clip(-((y0 - b[:, 3]) // u), 0, ny)
+            keep = (ix1 > ix0) & (iy1 > iy0)
+            ix0, iy0, ix1, iy1 = ix0[keep], iy0[keep], ix1[keep], iy1[keep]
+            # 2D difference array: +1 at the lower-left corner of every box
+            np.add.at(acc, (iy0, ix0), 1)
+            np.add.at(acc, (iy0, ix1), -1)
+            np.add.at(acc, (iy1, ix0), -1)
+            np.add.at(acc, (iy1, ix1), 1)
+        base[ys, xs] = acc.cumsum(0).cumsum(1)[:ny, :nx] > 0
+
+        for k in range(1, self.num_levels):
+            ys = slice(ys.start // 2, -(-ys.stop // 2))
+            xs = slice(xs.start // 2, -(-xs.stop // 2))
+            self.levels[k][ys, xs] = _pool(
+                self.levels[k - 1][2 * ys.start : 2 * ys.stop, 2 * xs.start : 2 * xs.stop]
+            )
+
+    def update(self, index: ObstacleIndex) -> None:
+        """Brings the pyramid up to date with an obstacle index.
+
+        Re-rasterizes only the windows the index changed since the last
+        update, or everything if the index was rebuilt in between.
+        """
+        changes = None
+        if index.generation == self.generation:
+            changes = index.changes_since(self.revision)
+        if changes is None:
+            self.rasterize(index.region())
+        else:
+            for box in changes:
+                window = self.window(box)
+                self.rasterize(index.region(window), window)
+        self.generation = index.generation
+        self.revision = index.revision
+
+
+def _pool(a: np.ndarray) -> np.ndarray:
+    ny, nx = a.shape
+    padded = np.zeros((ny + ny % 2, nx + nx % 2), dtype=bool)
+    padded[:ny, :nx] = a
+    return padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2).any(axis=(1, 3))
+
+
+_pyramids: OrderedDict[tuple[object, ...], GridPyramid] = OrderedDict()
+
+
+def clear_pyramids() -> None:
+    """Drops all cached grid pyramids."""
+    _pyramids.clear()
+
+
+def get_pyramid(
+    component: ProtoTKCell,
+    layers: Iterable[LayerLike],
+    grid_unit: int,
+    margin: int = 0,
+    max_coarse_cells: int = 1 << 14,
+) -> GridPyramid:
+    """Returns the cached grid pyramid of a component, rebuilding it if stale.
+
+    The pyramid is updated from the obstacle index of the component, which
+    picks up routes added since the last call incrementally. It is only
+    rebuilt when it does not cover the component anymore.
+
+    Args:
+        component: die to route in.
+        layers: obstacle layers.
+        grid_unit: cell size of the finest level in dbu.
+        margin: routing space around the component bounding box in dbu.
+        max_coarse_cells: add levels until the coarsest has at most this many cells.
+    """
+    index = get_obstacle_index(component, layers)
+    key = (id(component.kcl), component.cell_index(), index.layers, grid_unit)
+    bbox = component.kdb_cell.bbox().enlarged(margin, margin)
+
+    pyramid = _pyramids.get(key)
+    if (
+        pyramid is not None
+        and pyramid.box.contains(bbox.p1)
+        and pyramid.box.contains(bbox.p2)
+    ):
+        _pyramids.move_to_end(key)
+        pyramid.update(index)
+        return pyramid
+
+    nx = max(-(-bbox.width() // grid_unit), 1)
+    ny = max(-(-bbox.height() // grid_unit), 1)
+    num_levels = 1
+    while (ny >> (num_levels - 1)) * (nx >> (num_levels - 1)) > max_coarse_cells:
+        num_levels += 1
+    pyramid = GridPyramid(
+        origin=(bbox.left, bbox.bottom),
+        unit=grid_unit,
+        shape=(ny, nx),
+        layers=index.layers,
+        num_levels=num_levels,
+    )
+    pyramid.update(index)
+    _pyramids[key] = pyramid
+    while len(_pyramids) > _MAX_PYRAMIDS:
+        _pyramids.popitem(last=False)
+    return pyramid
+
+
+def _search(
+    free: np.ndarray,
+    start: tuple[int, int, int],
+    goal: tuple[int, int, int],
+    bend_cells: int,
+    bend_cost: float,
+    must_bend: bool = False,
+) -> list[tuple[int, int, int]] | None:
+    """Returns the cheapest (ix, iy, direction) path through free cells.
+
+    States are (cell, direction) pairs. A straight move advances one cell. With
+    ``bend_cells`` > 0 a turn is a macro move from ``p`` to
+    ``p + bend_cells * (d1 + d2)`` that needs the whole square in between to be
+    free; with ``bend_cells`` == 0 it is a turn in place. With ``must_bend``
+    the states are duplicated into a second layer entered by the first bend
+    and the goal is only accepted in that layer.
+    """
+    ny, nx = free.shape
+    cells = np.flatnonzero(free)
+    if len(cells) == 0:
+        return None
+    ids = np.full(ny * nx, -1, dtype=np.int64)
+    ids[cells] = np.arange(len(cells))
+    iy, ix = np.divmod(cells, nx)
+    n = 4 * len(cells)
+    src: list[np.ndarray] = []
+    dst: list[np.ndarray] = []
+    weight: list[np.ndarray] = []
+
+    def add_edges(
+        d1: int, d2: int, qx: np.ndarray, qy: np.ndarray, ok: np.ndarray, w: float
+    ) -> None:
+        ok = ok & (qx >= 0) & (qx < nx) & (qy >= 0) & (qy < ny)
+        q = np.where(ok, qy * nx + qx, 0)
+        ok &= ids[q] >= 0
+        a = ids[cells[ok]] * 4 + d1
+        b = ids[q[ok]] * 4 + d2
+        w = np.full(len(a), w)
+        if not must_bend:
+            src.append(a)
+            dst.append(b)
+            weight.append(w)
+            return
+        # straight moves stay in their layer, bends always end in layer 1
+        bend = d1 != d2
+        src.extend([a, a + n])
+        dst.extend([b + n if bend else b, b + n])
+        weight.extend([w, w])
+
+    every = np.ones(len(cells), dtype=bool)
+    for d, (dx, dy) in enumerate(_STEPS):
+        add_edges(d, d, ix + dx, iy + dy, every, 1.0)
+
+    if bend_cells:
+        blocked = np.zeros((ny + 1, nx + 1), dtype=np.int32)
+        blocked[1:, 1:] = (~free).cumsum(0).cumsum(1)
+    for d1 in range(4):
+        for d2 in ((d1 + 1) % 4, (d1 + 3) % 4):
+            if not bend_cells:
+                add_edges(d1, d2, ix, iy, every, bend_cost)
+                continue
+            dx = bend_cells * (_STEPS[d1][0] + _STEPS[d2][0])
+            dy = bend_cells * (_STEPS[d1][1] + _STEPS[d2][1])
+            qx, qy = ix + dx, iy + dy
+            x0 = np.clip(np.minimum(ix, qx), 0, nx)
+            x1 = np.clip(np.maximum(ix, qx) + 1, 0, nx)
+            y0 = np.clip(np.minimum(iy, qy), 0, ny)
+            y1 = np.clip(np.maximum(iy, qy) + 1, 0, ny)
+            n_blocked = blocked[y1, x1] - blocked[y0, x1] - blocked[y1, x0] + blocked[y0, x0]
+            add_edges(d1, d2, qx, qy, n_blocked == 0, 2 * bend_cells + bend_cost)
+
+    size = 2 * n if must_bend else n
+    graph = sparse.csr_matrix(
+        (np.concatenate(weight), (np.concatenate(src), np.concatenate(dst))),
+        shape=(size, size),
+    )
+    (sx, sy, sd), (gx, gy, gd) = start, goal
+    s = ids[sy * nx + sx]
+    g = ids[gy * nx + gx]
+    if s < 0 or g < 0:
+        return None
+    s, g = int(s * 4 + sd), int(g * 4 + gd) + (n if must_bend else 0)
+    dist, pred = csgraph.dijkstra(graph, indices=s, return_predecessors=True)
+    if not np.isfinite(dist[g]):
+        return None
+
+    path = []
+    node = g
+    while node >= 0:
+        c, d = divmod(node % n, 4)
+        y, x = divmod(int(cells[c]), nx)
+        path.append((x, y, d))
+        node = int(pred[node]) if node != s else -1
+    return path[::-1]
+
+
+def _carve(
+    free: np.ndarray,
+    pyramid: GridPyramid,
+    level: int,
+    offset: tuple[int, int],
+    point: Endpoint,
+    length: int,
+    half_width: int,
+) -> None:
+    """Frees the cells in front of an endpoint so a route can leave the port."""
+    x, y, o = point
+    dx, dy = (int(v) for v in _STEPS[_DIRECTIONS.index(o)])
+    box = kdb.Box(
+        x - half_width * abs(dy) + min(dx, 0) * length,
+        y - half_width * abs(dx) + min(dy, 0) * length,
+        x + half_width * abs(dy) + max(dx, 0) * length + 1,
+        y + half_width * abs(dx) + max(dy, 0) * length + 1,
+    )
+    ys, xs = pyramid.cells(box, level)
+    oy, ox = offset
+    free[
+        max(ys.start - oy, 0) : max(ys.stop - oy, 0),
+        max(xs.start - ox, 0) : max(xs.stop - ox, 0),
+    ] = True
+
+
+def find_route_multires(
+    pyramid: GridPyramid,
+    start: Endpoint,
+    stop: Endpoint,
+    width: int,
+    radius: int,
+    clearance: int = 0,
+    corridor: int = 2,
+    bend_penalty: float = 1.0,
+) -> list[tuple[int, int]]:
+    """Returns the corners of a route from start to stop in dbu.
+
+    Args:
+        pyramid: occupancy of the die.
+        start: (x, y, direction) leaving the start port.
+        stop: (x, y, direction) arriving at the stop port.
+        width: width of the route (of the whole bundle) in dbu.
+        radius: size of the route's 90 degree bend in dbu.
+        clearance: extra distance to keep from obstacles in dbu.
+        corridor: cells of the coarser level kept around its path when
+            refining, on top of the room needed for the bends.
+        bend_penalty: extra cost of a bend, in units of the bend size.
+
+    Raises:
+        ValueError: if no route exists.
+    """
+    half_width = width // 2
+    if "o" in (start[2], stop[2]):
+        raise ValueError("start and stop need an orientation")
+    d_start = _DIRECTIONS.index(start[2])
+    d_stop = _DIRECTIONS.index(stop[2])
+
+    mask: np.ndarray | None = None
+    offset = (0, 0)
+    path: list[tuple[int, int, int]] | None = None
+    level = pyramid.num_levels - 1
+    while level >= 0:
+        u = pyramid.unit_at(level)
+        full = pyramid.levels[level]
+        if mask is None:
+            ys, xs = slice(0, full.shape[0]), slice(0, full.shape[1])
+        else:
+            rows = np.flatnonzero(mask.any(axis=1))
+            cols = np.flatnonzero(mask.any(axis=0))
+            ys = slice(offset[0] + rows[0], offset[0] + rows[-1] + 1)
+            xs = slice(offset[1] + cols[0], offset[1] + cols[-1] + 1)
+            mask = mask[rows[0] : rows[-1] + 1, cols[0] : cols[-1] + 1]
+
+        if level == 0:
+            grow = -(-(half_width + clearance) // u) + 1
+            bend_cells = -(-(2 * radius + u) // (2 * u))
+        else:
+            grow = 0
+            bend_cells = 0
+        y0, x0 = max(ys.start - grow, 0), max(xs.start - grow, 0)
+        occupied = full[y0 : ys.stop + grow, x0 : xs.stop + grow]
+        if grow:
+            occupied = ndimage.maximum_filter(occupied, size=2 * grow + 1)
+        free = ~occupied[ys.start - y0 : ys.stop - y0, xs.start - x0 : xs.stop - x0]
+        window = (ys.start, xs.start)
+        escape = half_width + clearance + 2 * u
+        _carve(free, pyramid, level, window, start, escape, half_width)
+        stop_out = (stop[0], stop[1], _DIRECTIONS[(d_stop + 2) % 4])
+        _carve(free, pyramid, level, window, stop_out, escape, half_width)
+        if mask is not None:
+            free &= mask
+
+        sx, sy = pyramid.cell(start[0], start[1], level)
+        gx, gy = pyramid.cell(stop[0], stop[1], level)
+        # ports in the same row but offset by less than a cell cannot be
+        # joined by a straight
+        axis = 1 if _DIRECTIONS[d_start] in "ew" else 0
+        same_row = (sx, sy)[axis] == (gx, gy)[axis]
+        path = _search(
+            free,
+            (sx - xs.start, sy - ys.start, d_start),
+            (gx - xs.start, gy - ys.start, d_stop),
+            bend_cells=bend_cells,
+            bend_cost=bend_penalty * max(radius / u, 1.0),
+            must_bend=level == 0 and same_row and start[axis] != stop[axis],
+        )
+        if path is None:
+            if mask is not None:
+                # the corridor was too narrow: search this level everywhere
+                mask = None
+                continue
+            if level == 0:
+                raise ValueError(
+                    f"No route found from {start} to {stop} on a {u} dbu grid."
+                )
+            level -= 1
+            continue
+        if level == 0:
+            break
+
+        # corridor around the path for the next level
+        on_path = np.zeros(free.shape, dtype=bool)
+        for x, y, _ in path:
+            on_path[y, x] = True
+        # wide enough for the bends of the finer levels on either side
+        grow = corridor + -(-(width + 2 * radius) // u)
+        on_path = ndimage.maximum_filter(on_path, size=2 * grow + 1)
+        mask = on_path.repeat(2, axis=0).repeat(2, axis=1)
+        offset = (2 * ys.start, 2 * xs.start)
+        finer = pyramid.levels[level - 1].shape
+        mask = mask[: finer[0] - offset[0], : finer[1] - offset[1]]
+        level -= 1
+
+    assert path is not None
+    corners: list[list[int]] = []
+    for (x, y, d1), (_, _, d2) in zip(path[:-1], path[1:]):
+        if d1 != d2:
+            cx = int(x + xs.start + bend_cells * _STEPS[d1][0])
+            cy = int(y + ys.start + bend_cells * _STEPS[d1][1])
+            corners.append(list(pyramid.center(cx, cy)))
+    if not corners:
+        axis = 1 if _DIRECTIONS[d_start] in "ew" else 0
+        if start[axis] != stop[axis]:
+            raise ValueError(
+                f"start {start} and stop {stop} are offset by less than a grid unit."
+            )
+        return []
+
+    # snap the first and last legs onto the port axes
+    axis = 1 if _DIRECTIONS[d_start] in "ew" else 0
+    corners[0][axis] = start[axis]
+    axis = 1 if _DIRECTIONS[d_stop] in "ew" else 0
+    corners[-1][axis] = stop[axis]
+    return [(x, y) for x, y in corners]
+
+
+def _endpoints(
+    component: ProtoTKCell,
+    ports1: Sequence[PortLike],
+    ports2: Sequence[PortLike],
+    spacing: float,
+    bend: KCellSpec,
+    straight: KCellSpec,
+) -> tuple[Endpoint, Endpoint, KCellSpec, KCellSpec]:
+    """Adds the fan-ins of a bundle and returns its start, stop, bend and straight."""
+    if len(ports1) != len(ports2):
+        raise ValueError("Number of start ports is different than number of end ports")
+    if not ports1:
+        raise ValueError("No input/output ports given")
+    os1 = {validate_position_with_orientation(p)[2] for p in ports1}
+    os2 = {validate_position_with_orientation(p)[2] for p in ports2}
+    if len(os1) != 1 or len(os2) != 1:
+        raise ValueError(f"Port orientations are not all equal. Got: {os1} and {os2}.")
+    o1 = validate_orientation(os1.pop())
+    o2 = validate_orientation(os2.pop())
+
+    if len(ports1) == 1:
+        start = validate_position_with_orientation(ports1[0])
+        stop = validate_position_with_orientation(ports2[0], invert_orientation=True)
+        return start, stop, bend, straight
+
+    spacing_dbu = round(spacing * util.get_inv_dbu(component.kcl))
+    starts = add_fan_in(
+        c=component, inputs=ports1, straight=straight, bend=bend, spacing_dbu=spacing_dbu
+    )
+    stops = add_fan_in(
+        c=component, inputs=ports2, straight=straight, bend=bend, spacing_dbu=spacing_dbu
+    )
+    x1, y1 = np.mean(starts, 0)
+    x2, y2 = np.mean(stops, 0)
+    start = (int(x1), int(y1), o1)
+    stop = (int(x2), int(y2), util.invert_orientation(o2))
+    n = len(ports1)
+    bend = partial(pcells.bends, bend, straight, n, spacing)
+    straight = partial(pcells.straights, straight, n, spacing)
+    return start, stop, bend, straight
+
+
+@dataclass
+class BundleJob:
+    """A fanned-in bundle, routed as one wide waveguide.
+
+    Args:
+        start: (x, y, direction) leaving the start fan-in.
+        stop: (x, y, direction) arriving at the stop fan-in.
+        bend: bend-spec of the whole bundle.
+        straight: straight-spec of the whole bundle.
+        width: width of the bundle in dbu.
+        radius: size of the bundle's 90 degree bend in dbu.
+        corners: corners of the route once found.
+    """
+
+    start: Endpoint
+    stop: Endpoint
+    bend: KCellSpec
+    straight: KCellSpec
+    width: int
+    radius: int
+    corners: list[tuple[int, int]] | None = None
+
+
+def prepare_bundle(
+    component: ProtoTKCell,
+    ports1: Sequence[PortLike],
+    ports2: Sequence[PortLike],
+    spacing: float,
+    bend: KCellSpec,
+    straight: KCellSpec,
+) -> BundleJob:
+    """Adds the fan-ins of a bundle and returns the job to route it."""
+    kcl = component.kcl
+    start, stop, bend, straight = _endpoints(
+        component, ports1, ports2, spacing, bend, straight
+    )
+    return BundleJob(
+        start=start,
+        stop=stop,
+        bend=bend,
+        straight=straight,
+        width=round(util.extract_waveguide_width(kcl, straight)),
+        radius=round(util.extract_bend_radius(kcl, bend)),
+    )
+
+
+def draw_bundle(component: ProtoTKCell, job: BundleJob) -> None:
+    """Draws a routed job with the doroutes corner router."""
+    if job.corners is None:
+        raise ValueError("The bundle has not been routed yet.")
+    add_route_from_corners(
+        c=component,
+        start=job.start[:2],
+        stop=job.stop[:2],
+        corners=job.corners,
+        straight=job.straight,
+        bend=job.bend,
+    )
+
+
+def add_bundle_astar_multires(
+    component: ProtoTKCell,
+    ports1: list[PortLike],
+    ports2: list[PortLike],
+    spacing: float,
+    bend: KCellSpec,
+    straight: KCellSpec,
+    layers: Iterable[LayerLike],
+    grid_unit: int = 2500,
+    clearance: float = 0.0,
+    corridor: int = 2,
+    bend_penalty: float = 1.0,
+    max_coarse_cells: int = 1 << 14,
+) -> list[None]:
+    """Adds a bundle route found with coarse-to-fine A*.
+
+    Same interface as :func:`doroutes.bundles.add_bundle_astar`. Bundles are
+    fanned in with doroutes, routed as one wide waveguide through the grid
+    pyramid of ``component`` and drawn with doroutes' corner router.
+
+    Args:
+        component: the component to add the route into.
+        ports1: the start ports.
+        ports2: the end ports.
+        spacing: the spacing between the waveguides in the bundle in um.
+        bend: the bend-spec to create bends with.
+        straight: the straight-spec to create straights with.
+        layers: the layers to avoid.
+        grid_unit: cell size of the finest grid in dbu.
+        clearance: extra distance to keep from obstacles in um.
+        corridor: coarse cells kept on each side of a coarse path when
+            refining, on top of the room needed for the bends.
+        bend_penalty: extra cost of a bend, in units of the bend size.
+        max_coarse_cells: the coarsest grid has at most this many cells.
+    """
+    layers = list(layers)
+    kcl = component.kcl
+    inv_dbu = util.get_inv_dbu(kcl)
+    radius = round(util.extract_bend_radius(kcl, bend))
+    job = prepare_bundle(component, ports1, ports2, spacing, bend, straight)
+    # the fan-ins are in the pyramid, so the route cannot cross them
+    pyramid = get_pyramid(
+        component,
+        layers,
+        grid_unit=grid_unit,
+        margin=4 * radius,
+        max_coarse_cells=max_coarse_cells,
+    )
+    job.corners = find_route_multires(
+        pyramid,
+        job.start,
+        job.stop,
+        width=job.width,
+        radius=job.radius,
+        clearance=round(clearance * inv_dbu),
+        corridor=corridor,
+        bend_penalty=bend_penalty,
+    )
+    draw_bundle(component, job)
+    return [None for _ in ports1]
@@ -0,0 +1,144 @@
+"""Routing benchmark on synthetic dies.
+
+A synthetic die is a jittered grid of square devices on the WG layer. Every
+bundle connects the east face of a device to the west face of its right
+neighbour at random heights, so each route needs bends and has to find its
+way between the devices of a die that grows with the number of bundles.
+
+.. code::
+
+    python -m csac_sin_pdk.sin300.cband.routing.benchmark --bundles 10 100 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import time
+from dataclasses import dataclass
+
+import gdsfactory as gf
+import numpy as np
+from kfactory import kdb
+
+
+@dataclass
+class BenchmarkResult:
+    """Timing of one strategy on one die."""
+
+    strategy: str
+    bundles: int
+    routed: int
+    seconds: float
+    error: str = ""
+
+    def __str__(self) -> str:
+        """Returns a one-line summary."""
+        per_bundle = self.seconds / max(self.routed, 1) * 1e3
+        return (
+            f"{self.strategy:<24} {self.bundles:>6} bundles {self.routed:>6} routed "
+            f"{self.seconds:>9.2f} s {per_bundle:>9.1f} ms/bundle {self.error}"
+        )
+
+
+def synthetic_die(
+    num_bundles: int,
+    wgs_per_bundle: int = 1,
+    device_size: float = 100.0,
+    pitch: float = 400.0,
+    port_pitch: float = 5.0,
+    jitter: float = 50.0,
+    seed: int = 0,
+) -> tuple[gf.Component, list[tuple[list[gf.Port], list[gf.Port]]]]:
+    """Returns a die and the (ports1, ports2) of every bundle to route.
+
+    Args:
+        num_bundles: number of bundles.
+        wgs_per_bundle: waveguides per bundle.
+        device_size: side of the square devices in um.
+        pitch: device pitch in um.
+        port_pitch: spacing of the ports of a bundle in um.
+        jitter: maximum random displacement of the devices in um.
+        seed: seed of the random device positions and port heights.
+    """
+    rng = np.random.default_rng(seed)
+    columns = math.ceil(math.sqrt(num_bundles)) + 1
+    rows = math.ceil(num_bundles / (columns - 1))
+    # copy the port of a PDK straight so the ports resolve to the PDK's WG layer
+    template = gf.get_component("straight").ports["o1"]
+    bundle_width = (wgs_per_bundle - 1) * port_pitch
+    if bundle_width > device_size:
+        raise ValueError(f"{wgs_per_bundle} ports do not fit on a {device_size} um device")
+
+    c = gf.Component()
+    offsets = rng.uniform(-jitter, jitter, size=(rows, columns, 2))
+    corners = np.stack(
+        np.meshgrid(np.arange(columns) * pitch, np.arange(rows) * pitch), axis=-1
+    ) + offsets
+    for x, y in corners.reshape(-1, 2):
+        s = device_size
+        c.add_polygon([(x, y), (x + s, y), (x + s, y + s), (x, y + s)], layer="WG")
+
+    def port(name: str, x: float, y: float, orientation: float) -> gf.Port:
+        p = template.copy()
+        p.name = name
+        p.dcplx_trans = kdb.DCplxTrans(1, orientation, False, round(x, 3), round(y, 3))
+        return p
+
+    def ports(row: int, column: int, east: bool, name: str) -> list[gf.Port]:
+        x, y = corners[row, column]
+        x += device_size if east else 0
+        y += rng.uniform(0, device_size - bundle_width)
+        return [
+            port(f"{name}_{i}", x, y + i * port_pitch, 0 if east else 180)
+            for i in range(wgs_per_bundle)
+        ]
+
+    sources = [(r, col) for r in range(rows) for col in range(columns - 1)]
+    bundles = [
+        (ports(row, column, True, f"a{i}"), ports(row, column + 1, False, f"b{i}"))
+        for i, (row, column) in enumerate(sources[:num_bundles])
+    ]
+    return c, bundles
+
+
+def run(
+    strategy: str, num_bundles: int, wgs_per_bundle: int = 1, seed: int = 0
+) -> BenchmarkResult:
+    """Routes all bundles of a synthetic die with a PDK routing strategy."""
+    c, bundles = synthetic_die(num_bundles, wgs_per_bundle=wgs_per_bundle, seed=seed)
+    route = gf.get_active_pdk().routing_strategies[strategy]
+    routed = 0
+    error = ""
+    t0 = time.perf_counter()
+    for ports1, ports2 in bundles:
+        try:
+            route(c, ports1, ports2)
+        except (ValueError, RuntimeError) as e:
+            error = f"{type(e).__name__}: {str(e).splitlines()[0][:60]}"
+            continue
+        routed += 1
+    return BenchmarkResult(strategy, len(bundles), routed, time.perf_counter() - t0, error)
+
+
+def main() -> None:
+    """Runs the benchmark from the command line."""
+    from csac_sin_pdk.sin300.cband import PDK
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bundles", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--wgs-per-bundle", type=int, default=1)
+    parser.add_argument(
+        "--strategies", nargs="+", default=["route_astar_multires", "route_astar"]
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    PDK.activate()
+    for n in args.bundles:
+        for strategy in args.strategies:
+            print(run(strategy, n, wgs_per_bundle=args.wgs_per_bundle, seed=args.seed))
+
+
+if __name__ == "__main__":
+    main()
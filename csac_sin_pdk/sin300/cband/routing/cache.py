@@ -0,0 +1,302 @@
+"""Route cache keyed by port geometry and obstacle fingerprint.
+
+Rebuilding a chip after tweaking an unrelated block re-routes every bundle,
+although most of them would come out exactly the same. The route cache
+remembers, for each routing strategy call, the instances the call placed.
+The key holds the strategy name and settings (cross-section included) and
+the position, orientation, width, layer and type of every port. Each entry
+also stores a fingerprint of the obstacles in the window the route
+occupies. A later call with the same key replays the stored instances when
+the obstacles in that window are unchanged, instead of running A* or the
+Manhattan router again.
+
+Replayed instances reference the route cells of the live layout, so the
+cache lives as long as the layout (for example a notebook or a build
+server that rebuilds the chip in the same process).
+
+.. code::
+
+    from csac_sin_pdk.sin300.cband import PDK
+    from csac_sin_pdk.sin300.cband.routing import route_cache
+
+    PDK.activate()
+    with route_cache() as cache:
+        c = build_chip()
+    with route_cache() as cache:
+        c = build_chip()  # unchanged bundles are replayed
+    print(cache.hits, cache.misses)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import partial, wraps
+from typing import Any
+
+import gdsfactory as gf
+import kfactory as kf
+from doroutes import util
+from doroutes.types import LayerLike, PortLike, validate_position_with_orientation
+from gdsfactory.pdk import Pdk
+from kfactory import kdb
+from kfactory.kcell import ProtoTKCell
+from kfactory.routing.generic import ManhattanRoute
+
+from csac_sin_pdk.sin300.cband.routing.obstacles import (
+    ObstacleIndex,
+    get_obstacle_index,
+    instance_key,
+)
+
+__all__ = ["RouteCache", "clear_route_cache", "fingerprint", "route_cache"]
+
+
+@dataclass
+class _Entry:
+    window: kdb.Box
+    fingerprint: str
+    #: (cell index, cell name, placement) of every placed instance
+    instances: list[tuple[int, str, kdb.CellInstArray]]
+    result: Any
+    #: for ManhattanRoute results: positions of each route's instances
+    route_instances: list[list[int]] | None = None
+
+
+def _canonical(value: Any) -> Any:
+    """Returns a JSON-friendly version of a strategy setting."""
+    if isinstance(value, partial):
+        return {
+            "function": _canonical(value.func),
+            "args": _canonical(list(value.args)),
+            "kwargs": _canonical(value.keywords),
+        }
+    if callable(value) and hasattr(value, "__qualname__"):
+        return f"{value.__module__}.{value.__qualname__}"
+    return gf.serialization.clean_value_json(value)
+
+
+def _port_key(port: PortLike) -> tuple[Any, ...]:
+    x, y, o = validate_position_with_orientation(port)
+    return (
+        x,
+        y,
+        o,
+        getattr(port, "width", None),
+        str(getattr(port, "layer_info", getattr(port, "layer", None))),
+        getattr(port, "port_type", None),
+    )
+
+
+def fingerprint(index: ObstacleIndex, window: kdb.Box) -> str:
+    """Returns a hash of the obstacles of an index inside a window."""
+    region = (index.region(window) & kdb.Region(window)).merged()
+    polygons = sorted(str(p) for p in region.each())
+    return hashlib.sha256("\n".join(polygons).encode()).hexdigest()
+
+
+class RouteCache:
+    """Replays routes whose ports, settings and surrounding obstacles are unchanged.
+
+    Args:
+        layers: obstacle layers fingerprinted around each route.
+        halo: distance in um around a route whose obstacles are fingerprinted.
+        max_entries: least recently used entries beyond this are dropped.
+    """
+
+    def __init__(
+        self,
+        layers: Iterable[LayerLike] = ("WG", "PAD"),
+        halo: float = 10.0,
+        max_entries: int = 4096,
+    ) -> None:
+        """Create an empty cache."""
+        self.layers = tuple(layers)
+        self.halo = halo
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Number of cached routes."""
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Drops all entries and resets the counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def key(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        ports1: Sequence[PortLike],
+        ports2: Sequence[PortLike],
+        args: Sequence[Any],
+        kwargs: dict[str, Any],
+    ) -> str:
+        """Returns the cache key of a routing strategy call."""
+        payload = {
+            "strategy": name,
+            "function": _canonical(func),
+            "args": _canonical(list(args)),
+            "kwargs": _canonical(kwargs),
+            "ports1": [_port_key(p) for p in ports1],
+            "ports2": [_port_key(p) for p in ports2],
+        }
+        text = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _replay(
+        self, component: ProtoTKCell, index: ObstacleIndex, entry: _Entry
+    ) -> list[kdb.Instance] | None:
+        layout = component.kcl.layout
+        for cell_index, cell_name, _ in entry.instances:
+            if not layout.is_valid_cell_index(cell_index):
+                return None
+            if layout.cell(cell_index).name != cell_name:
+                return None
+        if fingerprint(index, entry.window) != entry.fingerprint:
+            return None
+        cell = component.kdb_cell
+        return [cell.insert(array) for _, _, array in entry.instances]
+
+    def _result(
+        self, component: ProtoTKCell, entry: _Entry, placed: list[kdb.Instance]
+    ) -> Any:
+        if entry.route_instances is None:
+            return list(entry.result) if isinstance(entry.result, list) else entry.result
+        return [
+            route.model_copy(
+                update={
+                    "instances": [
+                        kf.Instance(component.kcl, placed[i]) for i in positions
+                    ]
+                }
+            )
+            for route, positions in zip(entry.result, entry.route_instances)
+        ]
+
+    def _store(
+        self,
+        key: str,
+        component: ProtoTKCell,
+        index: ObstacleIndex,
+        new: list[kdb.Instance],
+        result: Any,
+    ) -> None:
+        window = kdb.Box()
+        for inst in new:
+            window += inst.bbox()
+        halo = round(self.halo * util.get_inv_dbu(component.kcl))
+        window = window.enlarged(halo, halo)
+        layout = component.kcl.layout
+        instances = [
+            (inst.cell_index, layout.cell(inst.cell_index).name, inst.cell_inst.dup())
+            for inst in new
+        ]
+        route_instances = None
+        if (
+            isinstance(result, list)
+            and result
+            and all(isinstance(r, ManhattanRoute) for r in result)
+        ):
+            positions = {instance_key(inst): i for i, inst in enumerate(new)}
+            try:
+                route_instances = [
+                    [positions[instance_key(inst.instance)] for inst in route.instances]
+                    for route in result
+                ]
+            except KeyError:
+                # the route reports instances it did not place: do not cache it
+                return
+        self._entries[key] = _Entry(
+            window=window,
+            fingerprint=fingerprint(index, window),
+            instances=instances,
+            result=result,
+            route_instances=route_instances,
+        )
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def wrap(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Returns a routing strategy that replays cached routes."""
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            args_ = list(args)
+            component = args_.pop(0) if args_ else kwargs.pop("component")
+            ports1 = args_.pop(0) if args_ else kwargs.pop("ports1")
+            ports2 = args_.pop(0) if args_ else kwargs.pop("ports2")
+            key = self.key(name, func, ports1, ports2, args_, kwargs)
+            index = get_obstacle_index(component, self.layers)
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                placed = self._replay(component, index, entry)
+                if placed is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    index.insert(placed)
+                    return self._result(component, entry, placed)
+
+            self.misses += 1
+            generation = index.generation
+            result = func(component, ports1, ports2, *args_, **kwargs)
+            new = index.new_instances()
+            if new and index.generation == generation:
+                # fingerprint the window before the route is in the index
+                self._store(key, component, index, new, result)
+            index.insert(new)
+            return result
+
+        wrapper.__wrapped_by_route_cache__ = True  # type: ignore[attr-defined]
+        return wrapper
+
+
+_cache = RouteCache()
+
+
+def clear_route_cache() -> None:
+    """Drops all entries of the shared route cache."""
+    _cache.clear()
+
+
+@contextmanager
+def route_cache(
+    pdk: Pdk | None = None,
+    cache: RouteCache | None = None,
+    strategies: Iterable[str] | None = None,
+) -> Iterator[RouteCache]:
+    """Replays cached routes in the routing strategies of a PDK for the duration of the block.
+
+    Args:
+        pdk: PDK whose routing strategies are wrapped. Defaults to the active PDK.
+        cache: cache to use. Defaults to a cache shared by all blocks, so
+            that a chip rebuilt in a later block reuses the routes of an
+            earlier one.
+        strategies: names of the strategies to cache. Defaults to all of them.
+    """
+    pdk = pdk or gf.get_active_pdk()
+    cache = _cache if cache is None else cache
+    patched: list[tuple[str, Callable[..., Any]]] = []
+    mapping = pdk.routing_strategies or {}
+    names = list(mapping) if strategies is None else list(strategies)
+    for name in names:
+        func = mapping[name]
+        if getattr(func, "__wrapped_by_route_cache__", False):
+            continue
+        patched.append((name, func))
+        mapping[name] = cache.wrap(name, func)
+    try:
+        yield cache
+    finally:
+        for name, func in patched:
+            mapping[name] = func
@@ -0,0 +1,192 @@
+"""Bulk electrical fan-out from heater ports to a row of pads.
+
+All heater ports face the same direction and the pads lie in front of them.
+In a frame where the ports face north, every wire goes up from its port to
+a horizontal track, across to its pad and up into it:
+
+.. code::
+
+        pad     pad     pad
+         |       |       |
+         |   +---+       |      track 1
+    +----+---|-----------+      track 0 (shared by non-overlapping wires)
+    |    |   |
+    h0   h1  h2    (heater ports)
+
+Ports are assigned to pads with :func:`scipy.optimize.linear_sum_assignment`
+on the lateral distance, then re-paired in order over the chosen pads. The
+order-preserving pairing is never longer and cannot cross. Wires that go
+right take tracks so that the leftmost of overlapping wires runs highest,
+and the mirror image holds for wires that go left. All paths are therefore
+non-crossing and are found in one vectorized pass. They are drawn with the
+PDK metal straights and corners through doroutes' corner router.
+
+.. code::
+
+    from csac_sin_pdk.sin300.cband import PDK
+
+    PDK.activate()
+    route = PDK.routing_strategies["route_fanout_metal_corner"]
+    pads = route(c, heater_ports, pad_ports)
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import numpy as np
+from doroutes import util
+from doroutes.routing import add_route_from_corners
+from doroutes.types import PortLike, validate_position_with_orientation
+from kfactory.kcell import ProtoTKCell
+from kfactory.typings import KCellSpec
+from scipy.optimize import linear_sum_assignment
+
+__all__ = ["add_fanout_metal", "assign_pads", "fanout_tracks"]
+
+# quarter turns that bring a port orientation to north
+_TO_NORTH = {"n": 0, "e": 1, "s": 2, "w": 3}
+
+
+def _rotate(xy: np.ndarray, quarter_turns: int) -> np.ndarray:
+    """Rotates points counterclockwise by multiples of 90 degrees."""
+    x, y = xy[..., 0], xy[..., 1]
+    for _ in range(quarter_turns % 4):
+        x, y = -y, x
+    return np.stack([x, y], axis=-1)
+
+
+def assign_pads(x_ports: np.ndarray, x_pads: np.ndarray) -> np.ndarray:
+    """Returns the pad of every port, preserving the order of both.
+
+    Args:
+        x_ports: lateral position of the ports.
+        x_pads: lateral position of the pads, at least as many as ports.
+    """
+    if len(x_pads) < len(x_ports):
+        raise ValueError(
+            f"{len(x_ports)} ports need at least as many pads, got {len(x_pads)}."
+        )
+    cost = np.abs(x_ports[:, None] - x_pads[None, :])
+    rows, cols = linear_sum_assignment(cost)
+    chosen = cols[np.argsort(x_pads[cols], kind="stable")]
+    pads = np.empty(len(x_ports), dtype=np.int64)
+    pads[np.argsort(x_ports, kind="stable")] = chosen
+    return pads
+
+
+def fanout_tracks(x_start: np.ndarray, x_stop: np.ndarray, pitch: int) -> np.ndarray:
+    """Returns the track index of every wire of an order-preserving fan-out.
+
+    Wires going right are processed from the right: a wire takes the track
+    above every wire further right whose start it would cross. Wires going
+    left are processed from the left. Straight wires need no track.
+
+    Args:
+        x_start: lateral position of the wire starts, sorted.
+        x_stop: lateral position of the wire stops, in the same order.
+        pitch: minimum center distance of two wires.
+    """
+    n = len(x_start)
+    tracks = np.zeros(n, dtype=np.int64)
+    right = np.flatnonzero(x_stop > x_start)
+    left = np.flatnonzero(x_stop < x_start)
+    for i in right[::-1]:
+        blocking = right[(right > i) & (x_start[right] < x_stop[i] + pitch)]
+        if len(blocking):
+            tracks[i] = tracks[blocking].max() + 1
+    for i in left:
+        blocking = left[(left < i) & (x_start[left] > x_stop[i] - pitch)]
+        if len(blocking):
+            tracks[i] = tracks[blocking].max() + 1
+    return tracks
+
+
+def add_fanout_metal(
+    component: ProtoTKCell,
+    ports1: Sequence[PortLike],
+    ports2: Sequence[PortLike],
+    bend: KCellSpec,
+    straight: KCellSpec,
+    spacing: float = 10.0,
+    start_straight_length: float = 10.0,
+    end_straight_length: float = 10.0,
+) -> list[PortLike]:
+    """Adds non-crossing metal wires from every port to an assigned pad.
+
+    Args:
+        component: the component to add the wires into.
+        ports1: heater ports, all facing the pads.
+        ports2: pad ports facing the heaters, at least as many as ports1.
+        bend: the bend-spec to create corners with.
+        straight: the straight-spec to create straights with.
+        spacing: minimum gap between two wires in um.
+        start_straight_length: straight length out of the heater ports in um.
+        end_straight_length: straight length into the pads in um.
+
+    Returns:
+        the pad port assigned to every port of ports1.
+    """
+    if not ports1:
+        raise ValueError("No ports given")
+    kcl = component.kcl
+    inv_dbu = util.get_inv_dbu(kcl)
+    width = round(util.extract_waveguide_width(kcl, straight))
+    radius = round(util.extract_bend_radius(kcl, bend))
+    pitch = width + round(spacing * inv_dbu)
+
+    starts = [validate_position_with_orientation(p) for p in ports1]
+    stops = [validate_position_with_orientation(p) for p in ports2]
+    orientations = {o for _, _, o in starts}
+    if len(orientations) != 1:
+        raise ValueError(f"Port orientations are not all equal. Got: {orientations}.")
+    o = orientations.pop()
+    if o not in _TO_NORTH:
+        raise ValueError("Ports need an orientation.")
+    facing = {util.invert_orientation(o)}
+    if {s[2] for s in stops} != facing:
+        raise ValueError(f"Pad ports must all face the ports ({facing.pop()!r}).")
+
+    turns = _TO_NORTH[o]
+    p = _rotate(np.array([s[:2] for s in starts], dtype=np.int64), turns)
+    q = _rotate(np.array([s[:2] for s in stops], dtype=np.int64), turns)
+    order = np.argsort(p[:, 0], kind="stable")
+    if np.any(np.diff(p[order, 0]) < pitch):
+        raise ValueError(f"Ports are closer than the wire pitch of {pitch / inv_dbu} um.")
+    if np.any(np.diff(np.sort(q[:, 0])) < pitch):
+        raise ValueError(f"Pads are closer than the wire pitch of {pitch / inv_dbu} um.")
+
+    pads = assign_pads(p[:, 0], q[:, 0])
+    x0, x1 = p[order, 0], q[pads[order], 0]
+    dx = np.abs(x1 - x0)
+    if np.any((dx > 0) & (dx < 2 * radius)):
+        raise ValueError(
+            "A port is offset from its pad by less than two bend sizes; "
+            "use a smaller corner such as wire_corner."
+        )
+    tracks = fanout_tracks(x0, x1, pitch)
+    bottom = p[:, 1].max() + round(start_straight_length * inv_dbu) + radius
+    top = bottom + tracks.max() * pitch + radius + round(end_straight_length * inv_dbu)
+    if top > q[pads, 1].min():
+        raise ValueError(
+            f"The pads are too close: the fan-out needs {tracks.max() + 1} tracks "
+            f"and {(top - p[:, 1].max()) / inv_dbu} um in front of the ports."
+        )
+
+    y_tracks = bottom + tracks * pitch
+    for k, i in enumerate(order):
+        start = tuple(int(v) for v in _rotate(p[i], -turns))
+        stop = tuple(int(v) for v in _rotate(q[pads[i]], -turns))
+        corners = []
+        if x1[k] != x0[k]:
+            legs = np.array([(x0[k], y_tracks[k]), (x1[k], y_tracks[k])])
+            corners = _rotate(legs, -turns).tolist()
+        add_route_from_corners(
+            c=component,
+            start=start,
+            stop=stop,
+            corners=[(int(x), int(y)) for x, y in corners],
+            straight=straight,
+            bend=bend,
+        )
+    return [ports2[j] for j in pads]
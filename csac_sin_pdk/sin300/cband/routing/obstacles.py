@@ -0,0 +1,283 @@
+"""Persistent obstacle index shared across routing calls.
+
+An :class:`ObstacleIndex` holds a flat copy of the obstacle layers of a die in
+a private KLayout cell, whose box tree answers window queries without going
+back to the hierarchy of the die. Routes added to the die are picked up
+incrementally: only instances that were not seen before are flattened and
+inserted, and the windows they changed are logged so that derived views
+(like the grid pyramid of the multi-resolution A*) can update just those
+windows.
+
+.. code::
+
+    from csac_sin_pdk.sin300.cband import PDK
+    from csac_sin_pdk.sin300.cband.routing import routing_context
+
+    PDK.activate()
+    with routing_context(check_collisions=True) as ctx:
+        for ports1, ports2 in bundles:
+            PDK.routing_strategies["route_bundle"](c, ports1, ports2)
+"""
+
+from __future__ import annotations
+
+from collections import Counter, OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any
+
+import gdsfactory as gf
+from doroutes.types import LayerLike, validate_layer
+from gdsfactory.pdk import Pdk
+from kfactory import kdb
+from kfactory.kcell import ProtoTKCell
+
+__all__ = [
+    "ObstacleIndex",
+    "RoutingContext",
+    "clear_obstacle_indexes",
+    "get_obstacle_index",
+    "instance_key",
+    "routing_context",
+]
+
+_MAX_INDEXES = 8
+_MAX_CHANGES = 4096
+
+
+class ObstacleIndex:
+    """Flattened, incrementally updated obstacles of a component.
+
+    Args:
+        component: die whose obstacles are indexed.
+        layers: layer indexes of the obstacles.
+    """
+
+    def __init__(self, component: ProtoTKCell, layers: Iterable[int]) -> None:
+        """Build the index from the current content of the component."""
+        self.component = component
+        self.layers = tuple(layers)
+        #: bumped on every full rebuild; windows are only valid within one
+        self.generation = 0
+        #: bumped on every incremental insertion
+        self.revision = 0
+        self._changes: list[tuple[int, kdb.Box]] = []
+        self._build()
+
+    def _build(self) -> None:
+        cell = self.component.kdb_cell
+        self._layout = kdb.Layout()
+        self._layout.dbu = self.component.kcl.dbu
+        self._top = self._layout.create_cell("obstacles")
+        self._targets = {li: self._layout.layer() for li in self.layers}
+        for li, target in self._targets.items():
+            self._top.shapes(target).insert(cell.begin_shapes_rec(li))
+        self._seen = Counter(instance_key(inst) for inst in cell.each_inst())
+        self._num_shapes = self._shape_counts()
+        self._changes.clear()
+        self.generation += 1
+
+    def _shape_counts(self) -> tuple[int, ...]:
+        cell = self.component.kdb_cell
+        return tuple(cell.shapes(li).size() for li in self.layers)
+
+    def new_instances(self) -> list[kdb.Instance]:
+        """Returns the instances added to the component since the last insertion.
+
+        Instances are compared by cell and placement, so any other change
+        (deleted or moved instances, shapes drawn directly into the
+        component) rebuilds the index and returns an empty list, since the
+        rebuilt index already holds everything.
+        """
+        cell = self.component.kdb_cell
+        if self._shape_counts() != self._num_shapes:
+            self._build()
+            return []
+        # identical instances are counted, so a route drawn twice is new
+        counts: Counter[tuple[int, int]] = Counter()
+        new = []
+        for inst in cell.each_inst():
+            key = instance_key(inst)
+            counts[key] += 1
+            if counts[key] > self._seen[key]:
+                new.append(inst)
+        if not self._seen <= counts:
+            self._build()
+            return []
+        return new
+
+    def insert(self, instances: Iterable[kdb.Instance]) -> None:
+        """Flattens instances into the index and logs the windows they cover."""
+        instances = list(instances)
+        if not instances:
+            return
+        self.revision += 1
+        for inst in instances:
+            for li, target in self._targets.items():
+                shapes = self._top.shapes(target)
+                for trans in inst.cell_inst.each_cplx_trans():
+                    shapes.insert(inst.cell.begin_shapes_rec(li), trans)
+            self._seen[instance_key(inst)] += 1
+            self._changes.append((self.revision, inst.bbox()))
+        del self._changes[:-_MAX_CHANGES]
+
+    def sync(self) -> None:
+        """Inserts the instances added to the component since the last call."""
+        self.insert(self.new_instances())
+
+    def changes_since(self, revision: int) -> list[kdb.Box] | None:
+        """Returns the merged windows changed after a revision.
+
+        Returns None if the log no longer reaches back to that revision.
+        """
+        if revision == self.revision:
+            return []
+        if not self._changes or self._changes[0][0] > revision + 1:
+            return None
+        boxes = kdb.Region([box for r, box in self._changes if r > revision])
+        return [polygon.bbox() for polygon in boxes.merged().each()]
+
+    def region(self, box: kdb.Box | None = None) -> kdb.Region:
+        """Returns the obstacles on all layers, optionally only those touching a box."""
+        region = kdb.Region()
+        for target in self._targets.values():
+            if box is None:
+                region.insert(self._top.begin_shapes_rec(target))
+            else:
+                region.insert(self._top.begin_shapes_rec_touching(target, box))
+        return region
+
+    def overlaps(self, instances: Iterable[kdb.Instance]) -> kdb.Region:
+        """Returns where instances overlap obstacles of the same layer in the index."""
+        overlaps = kdb.Region()
+        instances = list(instances)
+        for li, target in self._targets.items():
+            added = kdb.Region()
+            for inst in instances:
+                for trans in inst.cell_inst.each_cplx_trans():
+                    added.insert(inst.cell.begin_shapes_rec(li), trans)
+            if added.is_empty():
+                continue
+            existing = kdb.Region(
+                self._top.begin_shapes_rec_overlapping(target, added.bbox())
+            )
+            overlaps += added & existing
+        return overlaps
+
+
+def instance_key(inst: kdb.Instance) -> tuple[int, int]:
+    """Returns a key identifying an instance by its cell and placement."""
+    return inst.cell_index, inst.cell_inst.hash()
+
+
+_indexes: OrderedDict[tuple[object, ...], ObstacleIndex] = OrderedDict()
+
+
+def clear_obstacle_indexes() -> None:
+    """Drops all cached obstacle indexes."""
+    _indexes.clear()
+
+
+def get_obstacle_index(
+    component: ProtoTKCell, layers: Iterable[LayerLike]
+) -> ObstacleIndex:
+    """Returns the cached, synced obstacle index of a component.
+
+    Args:
+        component: die to route in.
+        layers: obstacle layers.
+    """
+    kcl = component.kcl
+    layer_indexes = tuple(kcl.layer(*validate_layer(kcl, layer)) for layer in layers)
+    key = (id(kcl), component.cell_index(), layer_indexes)
+    index = _indexes.get(key)
+    if index is None or index.component.kdb_cell._destroyed():
+        index = ObstacleIndex(component, layer_indexes)
+        _indexes[key] = index
+        while len(_indexes) > _MAX_INDEXES:
+            _indexes.popitem(last=False)
+    else:
+        _indexes.move_to_end(key)
+        index.sync()
+    return index
+
+
+@dataclass
+class RoutingContext:
+    """Obstacle indexes kept up to date by the routing strategies of a PDK.
+
+    Args:
+        layers: obstacle layers indexed for every routed component.
+        check_collisions: raise if a route overlaps an earlier obstacle of the
+            same layer.
+    """
+
+    layers: tuple[LayerLike, ...] = ("WG", "PAD")
+    check_collisions: bool = False
+    routes: int = 0
+
+    def index(self, component: ProtoTKCell) -> ObstacleIndex:
+        """Returns the obstacle index of a component."""
+        return get_obstacle_index(component, self.layers)
+
+    def wrap(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Returns a routing strategy that inserts its routes into the index."""
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            component = args[0] if args else kwargs["component"]
+            index = self.index(component)
+            result = func(*args, **kwargs)
+            new = index.new_instances()
+            if self.check_collisions and new:
+                overlaps = index.overlaps(new)
+                if not overlaps.is_empty():
+                    index.insert(new)
+                    raise ValueError(
+                        f"{name} route overlaps existing obstacles at "
+                        f"{overlaps.bbox().to_dtype(component.kcl.dbu)}"
+                    )
+            index.insert(new)
+            self.routes += 1
+            return result
+
+        wrapper.__wrapped_by_routing_context__ = True  # type: ignore[attr-defined]
+        return wrapper
+
+
+@contextmanager
+def routing_context(
+    pdk: Pdk | None = None,
+    layers: Iterable[LayerLike] = ("WG", "PAD"),
+    check_collisions: bool = False,
+) -> Iterator[RoutingContext]:
+    """Keeps obstacle indexes of routed components up to date for the duration of the block.
+
+    Every routing strategy of the PDK inserts the route it just placed into
+    the obstacle index of its component, so the next strategy call (and the
+    grid pyramid of the multi-resolution A*) starts from an index that is
+    already current instead of re-reading the die.
+
+    Args:
+        pdk: PDK whose routing strategies are wrapped. Defaults to the active PDK.
+        layers: obstacle layers to index.
+        check_collisions: raise ValueError when a route overlaps an obstacle
+            of the same layer placed before it.
+    """
+    pdk = pdk or gf.get_active_pdk()
+    context = RoutingContext(layers=tuple(layers), check_collisions=check_collisions)
+    patched: list[tuple[str, Callable[..., Any]]] = []
+    strategies = pdk.routing_strategies or {}
+    for name, func in list(strategies.items()):
+        if getattr(func, "__wrapped_by_routing_context__", False):
+            continue
+        patched.append((name, func))
+        strategies[name] = context.wrap(name, func)
+    try:
+        yield context
+    finally:
+        for name, func in patched:
+            strategies[name] = func
+
@@ -0,0 +1,235 @@
+"""Concurrent routing of independent bundles.
+
+Bundles are partitioned into independent groups: two bundles share a group
+when the bounding boxes of their ports, grown by a margin, overlap (directly
+or through other bundles). The groups are routed in waves. Wave ``k`` holds
+the ``k``-th bundle of every group, and the searches of a wave run in a
+thread pool on the same snapshot of the die. Their routes are then drawn
+one by one in bundle order. A route that overlaps an obstacle drawn earlier
+in the wave is undone and rerouted sequentially once the wave is in, so the
+result only depends on the bundles and never on thread timing.
+
+Only the multi-resolution A* strategies split into a search and a drawing
+step. Other strategies are called sequentially in wave order.
+
+.. code::
+
+    from csac_sin_pdk.sin300.cband import PDK
+    from csac_sin_pdk.sin300.cband.routing import route_bundles
+
+    PDK.activate()
+    schedule = route_bundles(c, bundles, strategy="route_astar_multires")
+    print(len(schedule.groups), schedule.rerouted)
+"""
+
+from __future__ import annotations
+
+import inspect
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any
+
+import gdsfactory as gf
+import numpy as np
+from doroutes import util
+from doroutes.types import PortLike, validate_position_with_orientation
+from gdsfactory.pdk import Pdk
+from kfactory.kcell import ProtoTKCell
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from csac_sin_pdk.sin300.cband.routing.astar import (
+    BundleJob,
+    GridPyramid,
+    add_bundle_astar_multires,
+    draw_bundle,
+    find_route_multires,
+    get_pyramid,
+    prepare_bundle,
+)
+from csac_sin_pdk.sin300.cband.routing.obstacles import get_obstacle_index
+
+__all__ = ["Schedule", "partition_bundles", "route_bundles"]
+
+Bundle = tuple[Sequence[PortLike], Sequence[PortLike]]
+
+_CHUNK = 1024
+
+
+@dataclass
+class Schedule:
+    """How a set of bundles was routed.
+
+    Args:
+        groups: bundle indexes of every independent group, in bundle order.
+        rerouted: bundles whose parallel route collided and was redone.
+        results: return value of the routing strategy for every bundle.
+    """
+
+    groups: list[list[int]]
+    rerouted: list[int] = field(default_factory=list)
+    results: list[Any] = field(default_factory=list)
+
+    @property
+    def waves(self) -> list[list[int]]:
+        """Bundles routed together: the k-th bundle of every group."""
+        depth = max((len(group) for group in self.groups), default=0)
+        return [[g[k] for g in self.groups if k < len(g)] for k in range(depth)]
+
+
+def partition_bundles(bundles: Sequence[Bundle], margin: int) -> list[list[int]]:
+    """Returns groups of bundles whose grown port bounding boxes overlap.
+
+    Args:
+        bundles: (ports1, ports2) of every bundle.
+        margin: growth of the port bounding boxes in dbu.
+    """
+    n = len(bundles)
+    if n == 0:
+        return []
+    boxes = np.empty((n, 4), dtype=np.int64)
+    for i, (ports1, ports2) in enumerate(bundles):
+        xy = np.array(
+            [validate_position_with_orientation(p)[:2] for p in [*ports1, *ports2]]
+        )
+        boxes[i, :2] = xy.min(axis=0) - margin
+        boxes[i, 2:] = xy.max(axis=0) + margin
+
+    rows: list[np.ndarray] = []
+    cols: list[np.ndarray] = []
+    for i0 in range(0, n, _CHUNK):
+        b = boxes[i0 : i0 + _CHUNK, None]
+        hit = (
+            (b[..., 0] <= boxes[None, :, 2])
+            & (boxes[None, :, 0] <= b[..., 2])
+            & (b[..., 1] <= boxes[None, :, 3])
+            & (boxes[None, :, 1] <= b[..., 3])
+        )
+        i, j = np.nonzero(hit)
+        rows.append(i + i0)
+        cols.append(j)
+    i, j = np.concatenate(rows), np.concatenate(cols)
+    graph = sparse.csr_matrix((np.ones(len(i), dtype=np.int8), (i, j)), shape=(n, n))
+    _, labels = csgraph.connected_components(graph, directed=False)
+
+    groups: dict[int, list[int]] = {}
+    for index, label in enumerate(labels):
+        groups.setdefault(int(label), []).append(index)
+    return sorted(groups.values())
+
+
+def _multires_settings(func: Callable[..., Any]) -> dict[str, Any] | None:
+    """Returns the keyword arguments of a multi-resolution A* strategy, else None."""
+    while hasattr(func, "__wrapped__"):
+        func = func.__wrapped__
+    if not isinstance(func, partial):
+        return None
+    inner = func.func
+    while hasattr(inner, "__wrapped__"):
+        inner = inner.__wrapped__
+    if inner is not add_bundle_astar_multires or func.args:
+        return None
+    return dict(func.keywords)
+
+
+def route_bundles(
+    component: ProtoTKCell,
+    bundles: Sequence[Bundle],
+    strategy: str = "route_astar_multires",
+    max_workers: int | None = None,
+    margin: float = 100.0,
+    pdk: Pdk | None = None,
+    **kwargs: Any,
+) -> Schedule:
+    """Routes many bundles, searching independent ones concurrently.
+
+    Args:
+        component: the component to add the routes into.
+        bundles: (ports1, ports2) of every bundle.
+        strategy: name of a routing strategy of the PDK.
+        max_workers: threads searching routes. Defaults to the CPU count.
+        margin: growth of the port bounding boxes in um when partitioning.
+            Routes that leave their grown box may collide with another
+            group, which is then resolved by rerouting.
+        pdk: PDK with the routing strategy. Defaults to the active PDK.
+        kwargs: passed to the routing strategy.
+    """
+    pdk = pdk or gf.get_active_pdk()
+    strategies = pdk.routing_strategies or {}
+    if strategy not in strategies:
+        raise ValueError(f"Unknown routing strategy {strategy!r}.")
+    func = strategies[strategy]
+    inv_dbu = util.get_inv_dbu(component.kcl)
+    groups = partition_bundles(bundles, margin=round(margin * inv_dbu))
+    schedule = Schedule(groups=groups, results=[None] * len(bundles))
+
+    settings = _multires_settings(func)
+    if settings is None:
+        for wave in schedule.waves:
+            for i in wave:
+                schedule.results[i] = func(component, *bundles[i], **kwargs)
+        return schedule
+
+    bound = inspect.signature(add_bundle_astar_multires).bind_partial(
+        **{**settings, **kwargs}
+    )
+    bound.apply_defaults()
+    s = bound.arguments
+    layers = list(s["layers"])
+    radius = round(util.extract_bend_radius(component.kcl, s["bend"]))
+
+    def pyramid() -> GridPyramid:
+        return get_pyramid(
+            component,
+            layers,
+            grid_unit=s["grid_unit"],
+            margin=4 * radius,
+            max_coarse_cells=s["max_coarse_cells"],
+        )
+
+    def search(grid: GridPyramid, job: BundleJob) -> list[tuple[int, int]]:
+        return find_route_multires(
+            grid,
+            job.start,
+            job.stop,
+            width=job.width,
+            radius=job.radius,
+            clearance=round(s["clearance"] * inv_dbu),
+            corridor=s["corridor"],
+            bend_penalty=s["bend_penalty"],
+        )
+
+    index = get_obstacle_index(component, layers)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for wave in schedule.waves:
+            jobs = [
+                prepare_bundle(
+                    component, *bundles[i], s["spacing"], s["bend"], s["straight"]
+                )
+                for i in wave
+            ]
+            # the fan-ins of the wave are obstacles for all of its routes
+            grid = pyramid()
+            conflicts = []
+            for i, job, corners in zip(
+                wave, jobs, pool.map(partial(search, grid), jobs)
+            ):
+                job.corners = corners
+                draw_bundle(component, job)
+                new = index.new_instances()
+                if index.overlaps(new).is_empty():
+                    index.insert(new)
+                    continue
+                for inst in new:
+                    inst.delete()
+                conflicts.append((i, job))
+
+            for i, job in conflicts:
+                job.corners = search(pyramid(), job)
+                draw_bundle(component, job)
+                schedule.rerouted.append(i)
+            for i in wave:
+                schedule.results[i] = [None for _ in bundles[i][0]]
+    return schedule
@@ -0,0 +1,344 @@
+"""Concurrent batch submission of simulations with a resumable job journal.
+
+:class:`BatchManager` submits many simulations concurrently from an asyncio
+loop, with the blocking client calls running in a thread pool. It polls
+their status without blocking and downloads each result as soon as it
+finishes. Every state change is appended to a JSON-lines journal. A new
+manager on the same journal resumes where the last one stopped: submitted
+jobs are not submitted again and downloaded results are not downloaded
+again. A failed poll or download is journaled and retried on the next poll,
+until too many fail in a row and the job is marked as an error.
+Collectors assemble the results of a group of jobs once all of them are
+downloaded.
+
+Backends wrap a simulation service. :class:`Tidy3DBackend` uses the Tidy3D
+web API. :class:`MockBackend` solves jobs locally with a Python function,
+so batches can be tested offline.
+
+.. code::
+
+    from csac_sin_pdk.sin300.cband.simulation_tools.batch import (
+        BatchManager,
+        Tidy3DBackend,
+    )
+
+    batch = BatchManager(Tidy3DBackend(), "batch/journal.jsonl")
+    for name, sim in modeler.sim_dict.items():
+        batch.add(name, sim, folder_name="coupler")
+    jobs = batch.run()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import pathlib
+import threading
+import time
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Protocol
+
+import numpy as np
+
+__all__ = ["BatchManager", "Job", "MockBackend", "Tidy3DBackend"]
+
+PathType = pathlib.Path | str
+
+SUCCESS = "success"
+FAILED = ("error", "diverged", "deleted")
+# local states, before submission and after download
+PENDING = "pending"
+DOWNLOADED = "downloaded"
+
+
+class Backend(Protocol):
+    """Simulation service used by :class:`BatchManager`."""
+
+    suffix: str
+
+    def submit(self, name: str, payload: Any, folder_name: str) -> str:
+        """Submits a simulation and returns its task id."""
+
+    def status(self, task_id: str) -> str:
+        """Returns the status of a task."""
+
+    def download(self, task_id: str, path: pathlib.Path) -> None:
+        """Writes the result of a finished task to path."""
+
+
+@dataclass
+class Job:
+    """Simulation of a batch.
+
+    Args:
+        name: unique name in the batch, also the task name.
+        folder_name: folder of the task on the service.
+        status: pending, a status of the service, or downloaded.
+        task_id: task id, once submitted.
+        path: result file, once downloaded.
+        error: error message of a failed job, or of the last failed poll.
+        poll_errors: polls or downloads that failed in a row.
+    """
+
+    name: str
+    folder_name: str = "default"
+    status: str = PENDING
+    task_id: str | None = None
+    path: str | None = None
+    error: str | None = None
+    poll_errors: int = 0
+
+    @property
+    def done(self) -> bool:
+        """True if the job was downloaded or failed."""
+        return self.status == DOWNLOADED or self.status in FAILED
+
+
+class BatchManager:
+    """Submits, polls and downloads a batch of simulations.
+
+    Args:
+        backend: simulation service.
+        journal: JSON-lines file recording the state of every job.
+        results_dir: directory of downloaded results. Defaults to the
+            directory of the journal.
+        max_workers: concurrent client calls.
+        poll_interval: seconds between two status polls.
+        max_poll_errors: polls or downloads of a job that may fail in a row
+            before the job is marked as an error.
+    """
+
+    def __init__(
+        self,
+        backend: Backend,
+        journal: PathType,
+        results_dir: PathType | None = None,
+        max_workers: int = 8,
+        poll_interval: float = 5.0,
+        max_poll_errors: int = 5,
+    ) -> None:
+        """Create a manager, replaying the journal if it exists."""
+        self.backend = backend
+        self.journal = pathlib.Path(journal)
+        self.journal.parent.mkdir(parents=True, exist_ok=True)
+        self.results_dir = pathlib.Path(results_dir or self.journal.parent)
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.max_poll_errors = max_poll_errors
+        self.jobs: dict[str, Job] = {}
+        self._payloads: dict[str, Any] = {}
+        self._collectors: list[
+            tuple[list[str], Callable[[dict[str, pathlib.Path]], Any]]
+        ] = []
+        self._lock = threading.Lock()
+        if self.journal.exists():
+            for line in self.journal.read_text().splitlines():
+                if line.strip():
+                    record = json.loads(line)
+                    self.jobs[record["name"]] = Job(**record)
+
+    def _record(self, job: Job) -> None:
+        with self._lock, self.journal.open("a") as f:
+            f.write(json.dumps(asdict(job)) + "\n")
+
+    def add(self, name: str, payload: Any, folder_name: str = "default") -> Job:
+        """Adds a simulation, unless the journal already has a job of that name.
+
+        Args:
+            name: unique name in the batch.
+            payload: simulation, as accepted by the backend.
+            folder_name: folder of the task on the service.
+        """
+        self._payloads[name] = payload
+        if name not in self.jobs:
+            self.jobs[name] = Job(name=name, folder_name=folder_name)
+            self._record(self.jobs[name])
+        return self.jobs[name]
+
+    def collect(
+        self,
+        names: Sequence[str],
+        function: Callable[[dict[str, pathlib.Path]], Any],
+    ) -> None:
+        """Calls function with the result paths of jobs once all are downloaded.
+
+        Collectors are not journaled, add them again when resuming a batch.
+
+        Args:
+            names: jobs of the group.
+            function: called with the result path of every job, by name.
+        """
+        missing = [name for name in names if name not in self.jobs]
+        if missing:
+            raise ValueError(f"Jobs {missing} were not added to the batch.")
+        self._collectors.append((list(names), function))
+
+    def _collect(self) -> None:
+        remaining = []
+        for names, function in self._collectors:
+            jobs = [self.jobs[name] for name in names]
+            if all(job.status == DOWNLOADED for job in jobs):
+                function({job.name: pathlib.Path(job.path) for job in jobs})
+            else:
+                remaining.append((names, function))
+        self._collectors = remaining
+
+    def _submit(self, job: Job) -> None:
+        try:
+            job.task_id = self.backend.submit(
+                job.name, self._payloads[job.name], job.folder_name
+            )
+            job.status = "submitted"
+        except Exception as e:
+            job.status, job.error = "error", repr(e)
+        self._record(job)
+
+    def _poll(self, job: Job) -> None:
+        try:
+            status = self.backend.status(job.task_id)
+            # failed downloads keep counting while the status stays success
+            poll_errors = job.poll_errors if status == SUCCESS else 0
+            if (status, poll_errors) != (job.status, job.poll_errors):
+                job.status, job.poll_errors = status, poll_errors
+                self._record(job)
+            if status == SUCCESS:
+                path = self.results_dir / f"{job.name}{self.backend.suffix}"
+                self.backend.download(job.task_id, path)
+                job.status, job.path, job.error = DOWNLOADED, str(path), None
+                job.poll_errors = 0
+                self._record(job)
+        except Exception as e:
+            # the job keeps its status, so the next poll retries it
+            job.error = repr(e)
+            job.poll_errors += 1
+            if job.poll_errors >= self.max_poll_errors:
+                job.status = "error"
+            self._record(job)
+
+    async def submit(self) -> None:
+        """Submits every pending job concurrently."""
+        loop = asyncio.get_running_loop()
+        pending = [job for job in self.jobs.values() if job.status == PENDING]
+        missing = [job.name for job in pending if job.name not in self._payloads]
+        if missing:
+            raise ValueError(f"Pending jobs {missing} have no payload, add them again.")
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            await asyncio.gather(
+                *(loop.run_in_executor(pool, self._submit, job) for job in pending)
+            )
+
+    async def poll(self) -> None:
+        """Polls every running job once and downloads the finished ones."""
+        loop = asyncio.get_running_loop()
+        running = [
+            job for job in self.jobs.values() if job.task_id and not job.done
+        ]
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            await asyncio.gather(
+                *(loop.run_in_executor(pool, self._poll, job) for job in running)
+            )
+
+    async def run_async(self, timeout: float | None = None) -> dict[str, Job]:
+        """Submits the pending jobs and polls until every job is done.
+
+        Collectors run as soon as their jobs are downloaded.
+
+        Args:
+            timeout: seconds after which polling stops. The journal keeps the
+                unfinished jobs for a later run.
+        """
+        start = time.monotonic()
+        await self.submit()
+        while not all(job.done for job in self.jobs.values()):
+            await self.poll()
+            self._collect()
+            if all(job.done for job in self.jobs.values()):
+                break
+            if timeout is not None and time.monotonic() - start > timeout:
+                break
+            await asyncio.sleep(self.poll_interval)
+        self._collect()
+        return self.jobs
+
+    def run(self, timeout: float | None = None) -> dict[str, Job]:
+        """Blocking version of :meth:`run_async`."""
+        return asyncio.run(self.run_async(timeout=timeout))
+
+
+class Tidy3DBackend:
+    """Tidy3D web API. Results are tidy3d simulation data files."""
+
+    suffix = ".hdf5"
+
+    def submit(self, name: str, payload: Any, folder_name: str) -> str:
+        """Uploads and starts a tidy3d simulation."""
+        from tidy3d import web
+
+        task_id = web.upload(payload, task_name=name, folder_name=folder_name)
+        web.start(task_id)
+        return task_id
+
+    def status(self, task_id: str) -> str:
+        """Returns the status of a tidy3d task."""
+        from tidy3d import web
+
+        return web.get_info(task_id).status
+
+    def download(self, task_id: str, path: pathlib.Path) -> None:
+        """Downloads the simulation data of a tidy3d task."""
+        from tidy3d import web
+
+        web.download(task_id, path=str(path))
+
+
+class MockBackend:
+    """Local backend solving each payload with a function in a thread pool.
+
+    Args:
+        solve: returns the result arrays of a payload. Defaults to the
+            payload itself, which must then map names to arrays.
+        delay: seconds each task waits before solving.
+        max_workers: tasks solved at the same time.
+    """
+
+    suffix = ".npz"
+
+    def __init__(
+        self,
+        solve: Callable[[Any], Mapping[str, np.ndarray]] | None = None,
+        delay: float = 0.0,
+        max_workers: int = 4,
+    ) -> None:
+        """Create a backend without tasks."""
+        self.solve = solve or dict
+        self.delay = delay
+        self.submitted = 0
+        self.downloaded = 0
+        self._pool = ThreadPoolExecutor(max_workers)
+        self._tasks: dict[str, Future] = {}
+
+    def _run(self, payload: Any) -> Mapping[str, np.ndarray]:
+        time.sleep(self.delay)
+        return self.solve(payload)
+
+    def submit(self, name: str, payload: Any, folder_name: str) -> str:
+        """Queues a payload and returns its task id."""
+        task_id = f"mock-{folder_name}-{name}-{len(self._tasks)}"
+        self._tasks[task_id] = self._pool.submit(self._run, payload)
+        self.submitted += 1
+        return task_id
+
+    def status(self, task_id: str) -> str:
+        """Returns queued, running, success or error."""
+        future = self._tasks[task_id]
+        if not future.done():
+            return "running" if future.running() else "queued"
+        return "error" if future.exception() else SUCCESS
+
+    def download(self, task_id: str, path: pathlib.Path) -> None:
+        """Writes the result arrays of a task as npz."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, **self._tasks[task_id].result())
+        self.downloaded += 1
@@ -0,0 +1,302 @@
+"""Cost estimates of FDTD simulations before they are submitted.
+
+:func:`estimate_cost` sizes the domain of one component the way
+``CSAC_t3d_write_params`` builds it. The domain is the component bounding
+box, grown by ``extend_ports + pad_xy_inner`` on the sides with ports and
+by ``pad_xy_inner`` elsewhere, plus PML layers, with a height of
+``sim_size_z``. ``pad_xy_outer`` only extends the material beyond the
+domain, so it does not count. Like the tidy3d auto-grid, the grid is
+rectilinear: along each axis, the spans covered by the layer stack shapes
+get ``min_steps_per_wvl`` cells per shortest wavelength in the core index,
+and the rest of the axis the same in the background index. Time steps
+follow from the Courant limit on the finest step and ``run_time``. A
+modeler runs one simulation per port and mode, and each symmetry plane
+halves its cells. As in ``CSAC_t3d_write_params``, the planes default to
+the ones :func:`detect_symmetry` finds.
+
+Runtime and credits scale with cell updates (cells x time steps). The
+throughput and credit rates are rough constants, to be calibrated against
+finished runs. :func:`estimate_sweep` adds up a sweep and flags outliers.
+
+.. code::
+
+    from csac_sin_pdk.sin300.cband import PDK
+    from csac_sin_pdk.sin300.cband.simulation_tools.cost import estimate_sweep
+
+    PDK.activate()
+    sweep = estimate_sweep(cells.coupler, [{"length": 10}, {"length": 400}])
+    print(sweep)
+    for cost in sweep.outliers:
+        print(cost)
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Any, Literal
+
+import gdsfactory as gf
+import numpy as np
+from gdsfactory.pdk import get_layer_stack
+from gdsfactory.technology import LayerStack
+
+from csac_sin_pdk.sin300.cband.simulation_tools.symmetry import detect_symmetry
+
+__all__ = ["SimulationCost", "SweepCost", "estimate_cost", "estimate_sweep"]
+
+C_0 = 299792458.0  # m/s
+COURANT = 0.99
+NUM_PML_LAYERS = 12
+# six field components and their update coefficients in single precision
+BYTES_PER_CELL = 48
+# cell updates per second of one simulation
+CELL_UPDATES_PER_S = 2e9
+CREDITS_PER_1E12_CELL_UPDATES = 1.0
+
+
+@dataclass
+class SimulationCost:
+    """Estimated cost of the simulations of one component.
+
+    Args:
+        name: component name.
+        size: domain size (x, y, z) in um, PML included.
+        grid_step: finest grid step in um.
+        cells: grid cells of one simulation, after symmetry.
+        time_steps: time steps of one simulation.
+        simulations: simulations run, one per port and mode.
+        memory_GB: memory of one simulation in GB.
+        runtime_s: runtime of all simulations in s.
+        credits: credits of all simulations.
+    """
+
+    name: str
+    size: tuple[float, float, float]
+    grid_step: float
+    cells: int
+    time_steps: int
+    simulations: int
+    memory_GB: float
+    runtime_s: float
+    credits: float
+
+    def __str__(self) -> str:
+        """Returns a one-line summary."""
+        x, y, z = self.size
+        return (
+            f"{self.name}: {x:.1f} x {y:.1f} x {z:.1f} um, {self.cells:.3g} cells, "
+            f"{self.time_steps} steps, {self.simulations} sims, "
+            f"{self.memory_GB:.2f} GB, {self.runtime_s:.0f} s, "
+            f"{self.credits:.2f} credits"
+        )
+
+
+@dataclass
+class SweepCost:
+    """Estimated cost of a sweep.
+
+    Args:
+        costs: cost of every combination.
+        outliers: costs above the outlier threshold or the memory limit.
+    """
+
+    costs: list[SimulationCost]
+    outliers: list[SimulationCost]
+
+    @property
+    def runtime_s(self) -> float:
+        """Runtime of all simulations in s."""
+        return sum(cost.runtime_s for cost in self.costs)
+
+    @property
+    def credits(self) -> float:
+        """Credits of all simulations."""
+        return sum(cost.credits for cost in self.costs)
+
+    @property
+    def memory_GB(self) -> float:
+        """Memory of the largest simulation in GB."""
+        return max((cost.memory_GB for cost in self.costs), default=0.0)
+
+    def __str__(self) -> str:
+        """Returns a one-line summary."""
+        return (
+            f"{len(self.costs)} combinations: {self.runtime_s / 3600:.2f} h, "
+            f"{self.credits:.2f} credits, up to {self.memory_GB:.2f} GB, "
+            f"{len(self.outliers)} outliers"
+        )
+
+
+def _covered(intervals: list[tuple[float, float]], lo: float, hi: float) -> float:
+    """Returns the length of [lo, hi] covered by a union of intervals."""
+    covered, end = 0.0, lo
+    for start, stop in sorted(intervals):
+        start, stop = max(start, end), min(stop, hi)
+        if stop > start:
+            covered += stop - start
+            end = stop
+    return covered
+
+
+def estimate_cost(
+    component: gf.Component,
+    extend_ports: float = 0.5,
+    pad_xy_inner: float = 2.0,
+    pad_xy_outer: float = 2.0,
+    wavelength: float = 1.55,
+    bandwidth: float = 0.2,
+    num_freqs: int = 21,
+    min_steps_per_wvl: int = 30,
+    sim_size_z: float = 4.0,
+    run_time: float = 1e-12,
+    n_core: float = 2.0,
+    n_background: float = 1.44,
+    num_modes: int = 1,
+    symmetry: Sequence[int] | Literal["auto"] = "auto",
+    polarization: str | None = "te",
+    pml: bool = True,
+    layer_stack: LayerStack | None = None,
+) -> SimulationCost:
+    """Returns the estimated cost of simulating the S-parameters of a component.
+
+    Args:
+        component: component to simulate.
+        extend_ports: port extension in um.
+        pad_xy_inner: padding between the component and the domain edge in um.
+        pad_xy_outer: padding of the material beyond the domain in um.
+            It does not add cells.
+        wavelength: centre wavelength in um.
+        bandwidth: wavelength span in um.
+        num_freqs: frequencies of the port monitors.
+        min_steps_per_wvl: grid cells per wavelength in a material.
+        sim_size_z: domain height in um, centred on the layer stack shapes.
+        run_time: simulated time in s.
+        n_core: refractive index of the layer stack shapes.
+        n_background: refractive index around them.
+        num_modes: modes per port.
+        symmetry: tidy3d symmetry, each non-zero plane halves the cells.
+            "auto" detects it from the geometry, ports and modes.
+        polarization: te or tm mode polarization, for the "auto" symmetry.
+        pml: whether the domain is surrounded by PML layers.
+        layer_stack: layers extruded into the simulation. Defaults to the
+            active PDK layer stack.
+    """
+    if min_steps_per_wvl <= 0 or min(n_core, n_background) <= 0:
+        raise ValueError("min_steps_per_wvl and the indices must be positive.")
+    layer_stack = layer_stack or get_layer_stack()
+    if symmetry == "auto":
+        symmetry = detect_symmetry(
+            component, layer_stack, polarization=polarization, num_modes=num_modes
+        ).symmetry
+    xmin, ymin, xmax, ymax = (
+        component.dxmin,
+        component.dymin,
+        component.dxmax,
+        component.dymax,
+    )
+    grown = extend_ports + pad_xy_inner
+    sides = {round(p.orientation) % 360 for p in component.ports}
+    xmin -= grown if 180 in sides else pad_xy_inner
+    xmax += grown if 0 in sides else pad_xy_inner
+    ymin -= grown if 270 in sides else pad_xy_inner
+    ymax += grown if 90 in sides else pad_xy_inner
+
+    dbu = component.kcl.dbu
+    x_spans, y_spans, z_spans = [], [], []
+    for level in layer_stack.layers.values():
+        region = level.layer.get_shapes(component).merged()
+        if region.is_empty():
+            continue
+        z_spans.append((level.zmin, level.zmin + level.thickness))
+        for polygon in region.each():
+            box = polygon.bbox()
+            x_spans.append((box.left * dbu, box.right * dbu))
+            y_spans.append((box.bottom * dbu, box.top * dbu))
+    # shapes extended through the port sides
+    for port in component.ports:
+        angle = round(port.orientation) % 360
+        half = port.width / 2
+        if angle in (0, 180):
+            x_spans.append((port.x, xmax) if angle == 0 else (xmin, port.x))
+            y_spans.append((port.y - half, port.y + half))
+        else:
+            x_spans.append((port.x - half, port.x + half))
+            y_spans.append((port.y, ymax) if angle == 90 else (ymin, port.y))
+    if z_spans:
+        zc = (min(z for z, _ in z_spans) + max(z for _, z in z_spans)) / 2
+    else:
+        zc = 0.0
+    zmin, zmax = zc - sim_size_z / 2, zc + sim_size_z / 2
+
+    shortest = wavelength - bandwidth / 2
+    fine = shortest / (n_core * min_steps_per_wvl)
+    coarse = shortest / (n_background * min_steps_per_wvl)
+    pml_size = 2 * NUM_PML_LAYERS * coarse if pml else 0.0
+    counts = []
+    size = []
+    for spans, lo, hi in (
+        (x_spans, xmin, xmax),
+        (y_spans, ymin, ymax),
+        (z_spans, zmin, zmax),
+    ):
+        covered = _covered(spans, lo, hi)
+        steps = covered / fine + (hi - lo - covered + pml_size) / coarse
+        counts.append(max(1, int(np.ceil(steps))))
+        size.append(hi - lo + pml_size)
+    cells = int(np.prod(counts, dtype=float) / 2 ** sum(s != 0 for s in symmetry))
+
+    dt = COURANT * fine * 1e-6 / (C_0 * np.sqrt(3))
+    time_steps = int(np.ceil(run_time / dt))
+    simulations = max(1, len(component.ports)) * num_modes
+
+    # port monitors store a complex field plane per frequency
+    port_cells = sum(
+        counts[2] * (counts[1] if round(p.orientation) % 180 == 0 else counts[0])
+        for p in component.ports
+    )
+    monitor_bytes = port_cells * num_freqs * 6 * 8
+    memory_GB = (cells * BYTES_PER_CELL + monitor_bytes) / 1e9
+    cell_updates = float(cells) * time_steps * simulations
+    return SimulationCost(
+        name=component.name,
+        size=tuple(size),
+        grid_step=fine,
+        cells=cells,
+        time_steps=time_steps,
+        simulations=simulations,
+        memory_GB=memory_GB,
+        runtime_s=cell_updates / CELL_UPDATES_PER_S,
+        credits=cell_updates / 1e12 * CREDITS_PER_1E12_CELL_UPDATES,
+    )
+
+
+def estimate_sweep(
+    cell: Callable[..., gf.Component],
+    combinations: Sequence[dict[str, Any]],
+    outlier_factor: float = 4.0,
+    max_memory_GB: float | None = None,
+    **kwargs: Any,
+) -> SweepCost:
+    """Returns the estimated cost of every combination of a sweep.
+
+    Args:
+        cell: cell function, called with the values of every combination.
+        combinations: parameter values of every simulation, for example from
+            ``sweep_combinations`` of sweep.py.
+        outlier_factor: combinations costing more than this times the median
+            are outliers.
+        max_memory_GB: combinations needing more memory are outliers.
+        kwargs: passed to :func:`estimate_cost`.
+    """
+    costs = [estimate_cost(cell(**combo), **kwargs) for combo in combinations]
+    if not costs:
+        return SweepCost(costs=[], outliers=[])
+    median = float(np.median([cost.credits for cost in costs]))
+    outliers = [
+        cost
+        for cost in costs
+        if cost.credits > outlier_factor * median
+        or (max_memory_GB is not None and cost.memory_GB > max_memory_GB)
+    ]
+    return SweepCost(costs=costs, outliers=outliers)
@@ -1,10 +1,21 @@
 import gdsfactory as gf
-import itertools
+import csv
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
 from csac_sin_pdk.sin300.cband import cells
 import csac_sin_pdk.sin300.cband
 from csac_sin_pdk.sin300.cband.config import PATH
 import os
 from shutil import copyfile
+from csac_sin_pdk.sin300.cband.simulation_tools.cost import SweepCost, estimate_sweep
+from csac_sin_pdk.sin300.cband.simulation_tools.sparameter_store import geometry_hash
+from csac_sin_pdk.sin300.cband.simulation_tools.sweep import (
+    sweep_combinations,
+    sweep_file_name,
+)
+import numpy as np
+from scipy.io import savemat
 from csac_sin_pdk.sin300.cband import PDK
 from csac_sin_pdk.sin300.cband.simulation_tools.simulation_settings import target_wl, target_bw
 
@@ -12,40 +23,22 @@ PDK.activate()
 
 from gplugins.lumerical import write_sparameters_lumerical
 
+um = 1e-6
+nl = ";\n"
+MANIFEST = "manifest.json"
 
-def gen_lum_sim_inputs(
-    cell,
-    parameters_swept: dict[str, list],
-    every_combo=True,
-    sim_type="FDTD",
-    layer_builder_settings: dict = {},
-    port_buffer: float = 0,
-    ymargin_top: float = 2,
-    ymargin_bot: float = 2,
-    xmargin_left: float = 2,
-    xmargin_right: float = 2,
-    distance_monitors_to_pml: float = 5,
-    sim_center_wavelength : float = target_wl,
-    sim_bw : float = target_bw
-):
-    um = 1e-6
-    sweep_name = cell().name + "_".join(parameters_swept.keys())
-    lumerical_script = ""
-    filename = cell().name
-    nl = ";\n"
 
-    if not every_combo:
-        # In this case, the values of the parameters should match exactly
-        if any(
-            len(param_values) != len(list(parameters_swept.values())[0])
-            for param_values in parameters_swept.values()
-        ):
-            raise IndexError(
-                "If not using a nested sweep, all parameter values should have the same length.\n"
-                + f"Here the lengths were {[len(param_values) for param_values in parameters_swept.values]}"
-            )
+def sweep_builder_script(
+    parameters_swept: dict[str, list], combinations: list[dict], nested: bool
+) -> str:
+    """Returns the script adding the Lumerical sweeps of a set of combinations.
 
-    if every_combo:
+    A nested sweep adds one sweep per parameter, each inserted into the
+    previous one. Otherwise a single sweep steps all parameters together
+    through the combinations.
+    """
+    lumerical_script = ""
+    if nested:
         for parameter_index, (param_name, param_values) in enumerate(
             parameters_swept.items()
         ):
@@ -59,166 +52,531 @@ def gen_lum_sim_inputs(
                 f'setsweep("{param_name}", "number of points", {len(param_values)});'
                 + "\n"
             )
-            parameter_setting = "para = struct" + nl
-            parameter_setting += f'para.Name = "{param_name}"' + nl
-            # parameter_setting += f"para.Parameter = {param_name}" + nl
-            parameter_setting += f'para.Type = "Number"' + nl
-            for index, value in enumerate(param_values):
-                parameter_setting += f"para.Value_{index+1} =  {value}" + nl
-
-            parameter_setting += f'addsweepparameter("{param_name}", para)' + nl
-            lumerical_script += parameter_setting
+            lumerical_script += _sweep_parameter(param_name, param_name, param_values)
             prev_param_name = param_name
+        return lumerical_script
+
+    sweep_name = "_".join(parameters_swept.keys())
+    lumerical_script += "addsweep" + nl
+    lumerical_script += f'setsweep("sweep", "name", "{sweep_name}")' + nl
+    lumerical_script += f'setsweep("{sweep_name}", "type", "Values")' + nl
+    lumerical_script += (
+        f'setsweep("{sweep_name}", "number of points", {len(combinations)})' + nl
+    )
+    for param_name in parameters_swept.keys():
+        lumerical_script += _sweep_parameter(
+            sweep_name, param_name, [combo[param_name] for combo in combinations]
+        )
+    return lumerical_script
+
+
+def _sweep_parameter(sweep_name: str, param_name: str, param_values: list) -> str:
+    parameter_setting = "para = struct" + nl
+    parameter_setting += f'para.Name = "{param_name}"' + nl
+    # parameter_setting += f"para.Parameter = {param_name}" + nl
+    parameter_setting += f'para.Type = "Number"' + nl
+    for index, value in enumerate(param_values):
+        parameter_setting += f"para.Value_{index+1} =  {value}" + nl
+    parameter_setting += f'addsweepparameter("{sweep_name}", para)' + nl
+    return parameter_setting
+
+
+def _generate_layout_script(
+    c: gf.Component,
+    component_extended: gf.Component,
+    sweep_file_name: str,
+    layer_process_file: str,
+    sim_type: str,
+    layer_builder_settings: dict,
+    xmargin_left: float,
+    xmargin_right: float,
+    ymargin_top: float,
+    ymargin_bot: float,
+    sim_center_wavelength: float,
+    sim_bw: float,
+) -> str:
+    """Returns the script building the Lumerical project of one combination.
+
+    1. Create a lumerical file
+    2. Create a layer builder object and import the GDS with it
+    3. Create a simulation region and a port wherever the component has one
+    """
+    bbox = component_extended.dbbox()
+    x_span = 2 * max(abs(bbox.p1.x), abs(bbox.p2.x)) + 5
+    y_span = 2 * max(abs(bbox.p1.y), abs(bbox.p2.y)) + 5
+    generate_layout_script = ""
+    generate_layout_script += "newproject" + nl
+    generate_layout_script += "addlayerbuilder" + nl
+    generate_layout_script += (
+        f'loadprocessfile("{os.path.basename(layer_process_file)}")' + nl
+    )
+    generate_layout_script += f'loadgdsfile("{sweep_file_name}.gds")' + nl
+    generate_layout_script += 'select("layer group")' + nl
+    generate_layout_script += (
+        f'set("gds sidewall angle position reference", "Middle")' + nl
+    )
+    generate_layout_script += (
+        f'set("gds position reference", "Centered at origin")' + nl
+    )
+    generate_layout_script += f'set("x span", {x_span*um})' + nl
+    generate_layout_script += f'set("y span", {y_span*um})' + nl
+
+    for param, value in layer_builder_settings.items():
+        generate_layout_script += f"set({param}, {value})" + nl
+
+    # That's the layer builder setup, now to focus on the actual simulation setup. First introduce a simulation region and ports.
+    generate_layout_script += f"add{sim_type.lower()}" + nl
+    generate_layout_script += f'set("x min", {(c.dbbox().p1.x - xmargin_left)*um})' + nl
+    generate_layout_script += f'set("x max", {(c.dbbox().p2.x + xmargin_right)*um})' + nl
+    generate_layout_script += f'set("y min", {(c.dbbox().p1.y - ymargin_bot)*um})' + nl
+    generate_layout_script += f'set("y max", {(c.dbbox().p2.y + ymargin_top)*um})' + nl
+
+    # Now for the ports:
+    for port in c.ports:
+        generate_layout_script += f"addport" + nl
+        generate_layout_script += f'set("x", {port.x*um})' + nl
+        generate_layout_script += f'set("y", {port.y*um})' + nl
+        generate_layout_script += f'set("x span", {2*port.width*um})' + nl
+        generate_layout_script += f'set("y span", {2*port.width*um})' + nl
+        generate_layout_script += (nl.join(
+                [
+                    f"set({port_prop}, {port_value})"
+                    for port_prop, port_value in convert_port_angle(
+                        port.orientation
+                    ).items()
+                ]
+            )
+            + nl
+        )
+    generate_layout_script += f'setglobalsource("center wavelength", {sim_center_wavelength*um})' + nl
+    generate_layout_script += f'setglobalsource("wavelength span", {sim_bw*um})' + nl
+    generate_layout_script += f'save("{sweep_file_name}")' + nl
+    return generate_layout_script
+
+
+def _build_combination(
+    cell,
+    param_combo: dict,
+    sweep_file_name: str,
+    sweep_folder_name: str,
+    previous_hash: str | None,
+    settings: dict,
+) -> dict:
+    """Builds one combination and writes its GDS and layout script if they changed.
+
+    Runs in a worker process, so it only takes and returns picklable values.
+    """
+    c = cell(**param_combo)
+    # Some pre-processing on the cell:
+    component_with_padding = gf.add_padding_container(
+        c,
+        default=0,
+        top=settings["ymargin_top"],
+        bottom=settings["ymargin_bot"],
+        left=settings["xmargin_left"],
+        right=settings["xmargin_right"],
+    )
+    margin = max(
+        settings["ymargin_top"],
+        settings["ymargin_bot"],
+        settings["xmargin_left"],
+        settings["xmargin_right"],
+    )
+    component_extended = gf.components.extend_ports(
+        component_with_padding,
+        length=settings["distance_monitors_to_pml"] + margin,
+    )
+    generate_layout_script = _generate_layout_script(
+        c, component_extended, sweep_file_name, **settings["script"]
+    )
+    combo_hash = hashlib.sha256(
+        (geometry_hash(component_extended) + generate_layout_script).encode()
+    ).hexdigest()
+
+    gds_path = os.path.join(sweep_folder_name, sweep_file_name + ".gds")
+    lsf_path = os.path.join(sweep_folder_name, sweep_file_name + "_generate_layout.lsf")
+    # a single looped script reads the combination from the sweep table instead
+    write_lsf = not settings["single_script"]
+    unchanged = (
+        combo_hash == previous_hash
+        and os.path.isfile(gds_path)
+        and (not write_lsf or os.path.isfile(lsf_path))
+    )
+    if not unchanged:
+        component_extended.write_gds(gds_path)
+        if write_lsf:
+            with open(lsf_path, "w") as gen_layout_file:
+                gen_layout_file.write(generate_layout_script)
+    bbox = component_extended.dbbox()
+    return {
+        "name": sweep_file_name,
+        "hash": combo_hash,
+        "written": not unchanged,
+        "values": param_combo,
+        "bbox": [
+            [c.dbbox().p1.x, c.dbbox().p1.y],
+            [c.dbbox().p2.x, c.dbbox().p2.y],
+        ],
+        "span": [
+            2 * max(abs(bbox.p1.x), abs(bbox.p2.x)) + 5,
+            2 * max(abs(bbox.p1.y), abs(bbox.p2.y)) + 5,
+        ],
+        "ports": [
+            {
+                "name": port.name,
+                "x": port.x,
+                "y": port.y,
+                "width": port.width,
+                "orientation": port.orientation,
+            }
+            for port in c.ports
+        ],
+    }
+
 
-            # Now iterate through each of the sub files. Save them to a subfolder under the correct name, get them to each load the corresponding GDS file.
+SWEEP_TABLE = "sweep_table"
+_AXES = {'"x-axis"': 1, '"y-axis"': 2}
+_DIRECTIONS = {'"Forward"': 1, '"Backward"': 0}
 
-        keys = parameters_swept.keys()
-        combinations = [
-            dict(zip(keys, combo))
-            for combo in (itertools.product(*parameters_swept.values()))
+
+def write_sweep_table(
+    sweep_folder_name: str,
+    parameters_swept: dict[str, list],
+    records: list[dict],
+    xmargin_left: float = 2,
+    xmargin_right: float = 2,
+    ymargin_top: float = 2,
+    ymargin_bot: float = 2,
+) -> None:
+    """Writes the table read by the looped layout script, as MAT and CSV.
+
+    One row per combination: GDS name, parameter values, layer builder
+    span and simulation region in m. Ports are (combination, port) arrays
+    padded with NaN, with their count in n_ports. The MAT file is loaded by
+    the solver, the CSV holds the same rows for inspection.
+    """
+    n = len(records)
+    max_ports = max((len(record["ports"]) for record in records), default=0)
+    table = {
+        "name": np.array([record["name"] for record in records], dtype=object),
+        "gds": np.array([record["name"] + ".gds" for record in records], dtype=object),
+        "x_span": np.array([record["span"][0] * um for record in records]),
+        "y_span": np.array([record["span"][1] * um for record in records]),
+        "x_min": np.array([(r["bbox"][0][0] - xmargin_left) * um for r in records]),
+        "x_max": np.array([(r["bbox"][1][0] + xmargin_right) * um for r in records]),
+        "y_min": np.array([(r["bbox"][0][1] - ymargin_bot) * um for r in records]),
+        "y_max": np.array([(r["bbox"][1][1] + ymargin_top) * um for r in records]),
+        "n_ports": np.array([len(record["ports"]) for record in records]),
+    }
+    for param_name in parameters_swept.keys():
+        table[param_name] = np.array(
+            [record["values"][param_name] for record in records], dtype=float
+        )
+
+    port_columns = ["x", "y", "span", "axis", "direction", "theta"]
+    ports = {column: np.full((n, max_ports), np.nan) for column in port_columns}
+    for i, record in enumerate(records):
+        for j, port in enumerate(record["ports"]):
+            props = convert_port_angle(port["orientation"])
+            ports["x"][i, j] = port["x"] * um
+            ports["y"][i, j] = port["y"] * um
+            ports["span"][i, j] = 2 * port["width"] * um
+            ports["axis"][i, j] = _AXES[props['"injection axis"']]
+            ports["direction"][i, j] = _DIRECTIONS[props['"direction"']]
+            ports["theta"][i, j] = props['"theta"']
+    for column, values in ports.items():
+        table["port_" + column] = values
+
+    savemat(os.path.join(sweep_folder_name, SWEEP_TABLE + ".mat"), table)
+
+    csv_path = os.path.join(sweep_folder_name, SWEEP_TABLE + ".csv")
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        row_columns = [k for k, v in table.items() if np.ndim(v) == 1]
+        header = row_columns + [
+            f"port{j + 1}_{column}"
+            for j in range(max_ports)
+            for column in port_columns
         ]
+        writer.writerow(header)
+        for i in range(n):
+            row = [table[column][i] for column in row_columns]
+            for j in range(max_ports):
+                row += [ports[column][i, j] for column in port_columns]
+            writer.writerow(row)
+
+
+def looped_layout_script(
+    layer_process_file: str,
+    sim_type: str,
+    layer_builder_settings: dict,
+    sim_center_wavelength: float,
+    sim_bw: float,
+) -> str:
+    """Returns one script building the Lumerical project of every combination.
+
+    The script loads the sweep table written by :func:`write_sweep_table`
+    and loops over its rows, replacing one generated script per combination.
+    """
+    script = ""
+    script += f'matlabload("{SWEEP_TABLE}.mat")' + nl
+    script += "for (i = 1:length(n_ports)) {\n"
+    script += "newproject" + nl
+    script += "addlayerbuilder" + nl
+    script += f'loadprocessfile("{os.path.basename(layer_process_file)}")' + nl
+    script += "loadgdsfile(gds{i})" + nl
+    script += 'select("layer group")' + nl
+    script += 'set("gds sidewall angle position reference", "Middle")' + nl
+    script += 'set("gds position reference", "Centered at origin")' + nl
+    script += 'set("x span", x_span(i))' + nl
+    script += 'set("y span", y_span(i))' + nl
+    for param, value in layer_builder_settings.items():
+        script += f"set({param}, {value})" + nl
+
+    script += f"add{sim_type.lower()}" + nl
+    script += 'set("x min", x_min(i))' + nl
+    script += 'set("x max", x_max(i))' + nl
+    script += 'set("y min", y_min(i))' + nl
+    script += 'set("y max", y_max(i))' + nl
+
+    script += "for (j = 1:n_ports(i)) {\n"
+    script += "addport" + nl
+    script += 'set("x", port_x(i, j))' + nl
+    script += 'set("y", port_y(i, j))' + nl
+    script += 'set("x span", port_span(i, j))' + nl
+    script += 'set("y span", port_span(i, j))' + nl
+    script += 'if (port_axis(i, j) == 1) { set("injection axis", "x-axis"); }'
+    script += ' else { set("injection axis", "y-axis"); }\n'
+    script += 'if (port_direction(i, j) == 1) { set("direction", "Forward"); }'
+    script += ' else { set("direction", "Backward"); }\n'
+    script += 'set("theta", port_theta(i, j))' + nl
+    script += "}\n"
+    script += f'setglobalsource("center wavelength", {sim_center_wavelength*um})' + nl
+    script += f'setglobalsource("wavelength span", {sim_bw*um})' + nl
+    script += "save(name{i})" + nl
+    script += "}\n"
+    return script
 
-        # Also for each file, place a port wherever there is a port in this component
-    else:
-        pass  # TODO: implement the script for not doing nested loops here
 
-    # Also create the GDSes that are needed:
+def gen_lum_sim_inputs(
+    cell,
+    parameters_swept: dict[str, list],
+    every_combo=True,
+    sim_type="FDTD",
+    layer_builder_settings: dict = {},
+    port_buffer: float = 0,
+    ymargin_top: float = 2,
+    ymargin_bot: float = 2,
+    xmargin_left: float = 2,
+    xmargin_right: float = 2,
+    distance_monitors_to_pml: float = 5,
+    sim_center_wavelength : float = target_wl,
+    sim_bw : float = target_bw,
+    max_workers: int | None = None,
+    mode: str | None = None,
+    samples: int | None = None,
+    seed: int | None = None,
+    single_script: bool = False,
+    output: str | os.PathLike | None = None,
+    overwrite: bool = False,
+):
+    """Writes the GDS files and Lumerical scripts of a parameter sweep.
+
+    Combinations are built in a process pool. Each one is hashed (geometry and
+    layout script) and its outputs are only rewritten when the hash differs
+    from the one in the sweep folder's manifest.json.
+
+    Args:
+        cell: cell function, called with the values of every combination.
+        parameters_swept: values of every swept parameter.
+        every_combo: if True, simulates every combination of the values,
+            otherwise the i-th values of all parameters together.
+        sim_type: Lumerical solver, for example FDTD.
+        layer_builder_settings: extra layer builder settings.
+        port_buffer: unused.
+        ymargin_top: simulation margin above the component in um.
+        ymargin_bot: simulation margin below the component in um.
+        xmargin_left: simulation margin left of the component in um.
+        xmargin_right: simulation margin right of the component in um.
+        distance_monitors_to_pml: distance of the monitors to the PML in um.
+        sim_center_wavelength: source center wavelength in um.
+        sim_bw: source bandwidth in um.
+        max_workers: processes building combinations. Defaults to the CPU count.
+        mode: product, zip, lhs or sobol, see :func:`sweep_combinations`.
+            Defaults to product if every_combo else zip.
+        samples: number of samples of the lhs and sobol modes.
+        seed: seed of the lhs and sobol samplers.
+        single_script: if True, writes one looped layout script and a sweep
+            table instead of one layout script per combination.
+        output: folder of the scripts and of the sweep folder. Defaults to
+            simulation_inputs next to this module.
+        overwrite: if True, rewrites every combination, even unchanged ones.
+
+    Returns:
+        one record per combination: name, hash, whether it was written,
+        parameter values, bounding box and ports.
+    """
+    filename = cell().name
+    mode = mode or ("product" if every_combo else "zip")
+    nested = mode == "product"
+    combinations = sweep_combinations(
+        parameters_swept, mode=mode, samples=samples, seed=seed
+    )
+    lumerical_script = sweep_builder_script(parameters_swept, combinations, nested)
 
-    with open(
-        os.path.join(
-            os.path.dirname(__file__), "simulation_inputs", "sweep_builder.lsf"
-        ),
-        "w",
-    ) as lsf:
-        print(os.path.dirname(__file__))
+    # Also create the GDSes that are needed:
+    inputs_folder = (
+        os.path.join(os.path.dirname(__file__), "simulation_inputs")
+        if output is None
+        else os.fspath(output)
+    )
+    os.makedirs(inputs_folder, exist_ok=True)
+    with open(os.path.join(inputs_folder, "sweep_builder.lsf"), "w") as lsf:
         lsf.write(lumerical_script)
 
     component_sweep_folder_name = filename + "_" + list(parameters_swept.keys())[0]
-    sweep_folder_name = os.path.join(
-        os.path.dirname(__file__),
-        "simulation_inputs",
-        filename + "_" + list(parameters_swept.keys())[0],
+    sweep_folder_name = os.path.join(inputs_folder, component_sweep_folder_name)
+    os.makedirs(sweep_folder_name, exist_ok=True)
+
+    # The layer builder file is shared by all combinations: copy it once
+    layer_process_file = PATH.sim_tools / "SiN_layer_builder_v2.lbr"
+    copyfile(
+        layer_process_file,
+        os.path.join(inputs_folder, os.path.basename(layer_process_file)),
     )
 
-    master_script = ""
-    master_script += f'addpath("{component_sweep_folder_name}")' + nl
-    master_script += f"sweep_builder" + nl
-    for param_combo in combinations:
-        c = cell(**param_combo)
-        # Some pre-processing on the cell:
-        component_with_padding = gf.add_padding_container(
-            c,
-            default=0,
-            top=ymargin_top,
-            bottom=ymargin_bot,
-            left=xmargin_left,
-            right=xmargin_right,
+    manifest_path = os.path.join(sweep_folder_name, MANIFEST)
+    manifest = {}
+    if os.path.isfile(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    settings = {
+        "ymargin_top": ymargin_top,
+        "ymargin_bot": ymargin_bot,
+        "xmargin_left": xmargin_left,
+        "xmargin_right": xmargin_right,
+        "distance_monitors_to_pml": distance_monitors_to_pml,
+        "single_script": single_script,
+        "script": {
+            "layer_process_file": str(layer_process_file),
+            "sim_type": sim_type,
+            "layer_builder_settings": layer_builder_settings,
+            "xmargin_left": xmargin_left,
+            "xmargin_right": xmargin_right,
+            "ymargin_top": ymargin_top,
+            "ymargin_bot": ymargin_bot,
+            "sim_center_wavelength": sim_center_wavelength,
+            "sim_bw": sim_bw,
+        },
+    }
+    names = [
+        sweep_file_name(parameters_swept, combo, None if nested else index)
+        for index, combo in enumerate(combinations)
+    ]
+    jobs = [
+        (
+            cell,
+            combo,
+            name,
+            sweep_folder_name,
+            None if overwrite else manifest.get(name),
+            settings,
         )
+        for combo, name in zip(combinations, names)
+    ]
+    if max_workers == 1 or len(jobs) < 2:
+        records = [_build_combination(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            records = list(pool.map(_build_combination, *zip(*jobs)))
 
-        component_extended = gf.components.extend_ports(
-            component_with_padding, length=distance_monitors_to_pml + max([ymargin_top, ymargin_bot, xmargin_left, xmargin_right])
-        )
+    # other sweeps of the same folder keep their hashes
+    manifest.update({record["name"]: record["hash"] for record in records})
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
 
-        if not os.path.isdir(sweep_folder_name):
-            os.makedirs(sweep_folder_name)
-        sweep_file_name = ""
-        for param_name in parameters_swept.keys():
-            sweep_file_name += (
-                param_name
-                + "_"
-                + str(parameters_swept[param_name].index(param_combo[param_name]) + 1)
-            )
-        component_extended.write_gds(
-            os.path.join(
-                os.path.dirname(__file__),
-                sweep_folder_name,
-                sweep_file_name + ".gds",
-            )
-        )
-        """The final part is the hardest. We need a LUMERICAL script that will:
-        1. Create a lumerical file
-        2. Create a layer builder object
-        3. Create a simulation region (start with FDTD, then move on to others?)
-        4. Import the GDS and use the layer builder 
-        A lot of this should be able to use the script that is used by GDSFactory+
-        """
-        layer_process_file = PATH.sim_tools  / "SiN_layer_builder_v2.lbr"
-        copyfile(
-            layer_process_file,
-            os.path.join(
-                os.path.dirname(__file__),
-                "simulation_inputs",
-                os.path.basename(layer_process_file),
-            ),
-        )
-        generate_layout_script = ""
-        generate_layout_script += "newproject" + nl
-        generate_layout_script += "addlayerbuilder" + nl
-        generate_layout_script += (
-            f'loadprocessfile("{os.path.basename(layer_process_file)}")' + nl
-        )
-        generate_layout_script += f'loadgdsfile("{sweep_file_name + '.gds'}")' + nl
-        generate_layout_script += 'select("layer group")' + nl
-        generate_layout_script += (
-            f'set("gds sidewall angle position reference", "Middle")' + nl
-        )
-        generate_layout_script += (
-            f'set("gds position reference", "Centered at origin")' + nl
+    # Also include a master script, whose only purpose is to write the underlying scripts
+    master_script = ""
+    master_script += f'addpath("{component_sweep_folder_name}")' + nl
+    master_script += f"sweep_builder" + nl
+    if single_script:
+        write_sweep_table(
+            sweep_folder_name,
+            parameters_swept,
+            records,
+            xmargin_left=xmargin_left,
+            xmargin_right=xmargin_right,
+            ymargin_top=ymargin_top,
+            ymargin_bot=ymargin_bot,
         )
-        # generate_layout_script += (f'set("x", {component_extended.dbbox().center().x*um})' + nl)
-        # generate_layout_script += (f'set("y", {component_extended.dbbox().center().y*um})' + nl)
-        generate_layout_script += (f'set("x span", {(2*max([abs(component_extended.dbbox().p1.x), 
-                                                           abs(component_extended.dbbox().p2.x)]) + 5)*um})' + nl)
-        generate_layout_script += (f'set("y span", {(2*max([abs(component_extended.dbbox().p1.y), 
-                                                           abs(component_extended.dbbox().p2.y)]) + 5)*um})' + nl)
-
-        for param, value in layer_builder_settings.items():
-            generate_layout_script += f"set({param}, {value})" + nl
-
-        # That's the layer builder setup, now to focus on the actual simulation setup. First introduce a simulation region and ports.
-        generate_layout_script += f"add{sim_type.lower()}" + nl
-        generate_layout_script += f'set("x min", {(c.dbbox().p1.x - xmargin_left)*um})' + nl
-        generate_layout_script += f'set("x max", {(c.dbbox().p2.x + xmargin_right)*um})' + nl
-        generate_layout_script += f'set("y min", {(c.dbbox().p1.y - ymargin_bot)*um})' + nl
-        generate_layout_script += f'set("y max", {(c.dbbox().p2.y + ymargin_top)*um})' + nl
-
-        # Now for the ports:
-        for port in c.ports:
-            generate_layout_script += f"addport" + nl
-            generate_layout_script += f'set("x", {port.x*um})' + nl
-            generate_layout_script += f'set("y", {port.y*um})' + nl
-            generate_layout_script += f'set("x span", {2*port.width*um})' + nl
-            generate_layout_script += f'set("y span", {2*port.width*um})' + nl
-            generate_layout_script += (nl.join(
-                    [
-                        f"set({port_prop}, {port_value})"
-                        for port_prop, port_value in convert_port_angle(
-                            port.orientation
-                        ).items()
-                    ]
+        with open(os.path.join(sweep_folder_name, "generate_layouts.lsf"), "w") as f:
+            f.write(
+                looped_layout_script(
+                    str(layer_process_file),
+                    sim_type,
+                    layer_builder_settings,
+                    sim_center_wavelength,
+                    sim_bw,
                 )
-                + nl
             )
-        generate_layout_script += f'setglobalsource("center wavelength", {sim_center_wavelength*um})' + nl
-        generate_layout_script += f'setglobalsource("wavelength span", {sim_bw*um})' + nl
-        generate_layout_script += f'save("{sweep_file_name}")' + nl
-        with open(
-            os.path.join(sweep_folder_name, sweep_file_name + "_generate_layout.lsf"),
-            "w",
-        ) as gen_layout_file:
-            gen_layout_file.write(generate_layout_script)
-
-        # Also include a master script, whose only purpose is to write the underlying scripts
-
-        master_script += f'feval("{sweep_file_name + '_generate_layout.lsf'}")' + nl
-
-    with open(
-        os.path.join(
-            os.path.dirname(__file__), "simulation_inputs", "master_script.lsf"
-        ),
-        "w",
-    ) as master_file:
+        master_script += f'feval("generate_layouts.lsf")' + nl
+    else:
+        for name in names:
+            master_script += f'feval("{name}_generate_layout.lsf")' + nl
+
+    with open(os.path.join(inputs_folder, "master_script.lsf"), "w") as master_file:
         master_file.write(master_script)
+    return records
+
+
+def estimate_lum_sim_cost(
+    cell,
+    parameters_swept: dict[str, list],
+    every_combo=True,
+    ymargin_top: float = 2,
+    ymargin_bot: float = 2,
+    xmargin_left: float = 2,
+    xmargin_right: float = 2,
+    sim_center_wavelength: float = target_wl,
+    sim_bw: float = target_bw,
+    mode: str | None = None,
+    samples: int | None = None,
+    seed: int | None = None,
+    **kwargs,
+) -> SweepCost:
+    """Returns the estimated cost of the sweep gen_lum_sim_inputs would write.
+
+    The simulation region is the component bounding box grown by the largest
+    margin, as in the generated scripts, which use no symmetry.
+
+    Args:
+        cell: cell function, called with the values of every combination.
+        parameters_swept: values of every swept parameter.
+        every_combo: if True, every combination of the values.
+        ymargin_top: simulation margin above the component in um.
+        ymargin_bot: simulation margin below the component in um.
+        xmargin_left: simulation margin left of the component in um.
+        xmargin_right: simulation margin right of the component in um.
+        sim_center_wavelength: source center wavelength in um.
+        sim_bw: source bandwidth in um.
+        mode: product, zip, lhs or sobol, see :func:`sweep_combinations`.
+        samples: number of samples of the lhs and sobol modes.
+        seed: seed of the lhs and sobol samplers.
+        kwargs: passed to :func:`estimate_sweep`, for example sim_size_z.
+    """
+    combinations = sweep_combinations(
+        parameters_swept, every_combo, mode=mode, samples=samples, seed=seed
+    )
+    return estimate_sweep(
+        cell,
+        combinations,
+        extend_ports=0,
+        pad_xy_inner=max(ymargin_top, ymargin_bot, xmargin_left, xmargin_right),
+        wavelength=sim_center_wavelength,
+        bandwidth=sim_bw,
+        **{"symmetry": (0, 0, 0), **kwargs},
+    )
 
 
 def lsf_write_command(command):
@@ -0,0 +1,265 @@
+"""Dispersive material models of the SiN platform.
+
+The SiN index is fitted once from the measured Cornerstone data in
+``pdk_dev/CORNERSTONE-SiN-index-Data.csv`` with a Sellmeier model,
+``n^2 = 1 + sum_i B_i wl^2 / (wl^2 - C_i)`` with the wavelength in um. The
+coefficients are cached in ``sellmeier_coefficients.yaml`` next to this
+module, together with the hash of the data they were fitted from. Loading
+them only reads the cache, :func:`refit_sin_coefficients` refits it when
+the data changes. The SiO2 cladding uses the Malitson coefficients. Both
+models give vectorized indices and dispersive tidy3d media, so every solver
+sees the same material at every frequency instead of a constant
+permittivity.
+
+.. code::
+
+    import numpy as np
+    from csac_sin_pdk.sin300.cband.simulation_tools.materials import (
+        n_sin,
+        sin_medium,
+    )
+
+    print(n_sin(np.linspace(1.5, 1.6, 11)))
+    medium = sin_medium()  # td.Sellmeier, medium.pole_residue for the poles
+"""
+
+from __future__ import annotations
+
+import hashlib
+import pathlib
+import warnings
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+import yaml
+from numpy.typing import ArrayLike
+from scipy.optimize import least_squares
+
+from csac_sin_pdk.sin300.cband.config import PATH
+
+__all__ = [
+    "SIN_INDEX_DATA",
+    "SIO2_SELLMEIER",
+    "clear_material_cache",
+    "dispersive_media",
+    "fit_sellmeier",
+    "load_index_data",
+    "n_sin",
+    "n_sio2",
+    "refit_sin_coefficients",
+    "sellmeier_index",
+    "sin_coefficients",
+    "sin_medium",
+    "sio2_medium",
+]
+
+SIN_INDEX_DATA = PATH.repo / "pdk_dev" / "CORNERSTONE-SiN-index-Data.csv"
+COEFFICIENTS_FILE = PATH.sim_tools / "sellmeier_coefficients.yaml"
+# fit range in um, below it the data runs into the absorption edge
+FIT_RANGE = (0.3, 1.7)
+# Malitson, J. Opt. Soc. Am. 55, 1205 (1965), (B, C) with C in um^2
+SIO2_SELLMEIER = (
+    (0.6961663, 4.67914826e-3),
+    (0.4079426, 1.35120631e-2),
+    (0.8974794, 97.9340025),
+)
+
+Coefficients = tuple[tuple[float, float], ...]
+
+_cache: dict[str, Coefficients] = {}
+
+
+def clear_material_cache() -> None:
+    """Drops the cached Sellmeier coefficients."""
+    _cache.clear()
+
+
+def load_index_data(
+    path: pathlib.Path | str = SIN_INDEX_DATA,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the wavelengths in um and the indices of a measured index file.
+
+    Args:
+        path: csv file with a header row, the wavelength in nm and the index.
+    """
+    data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+    return data[:, 0] * 1e-3, data[:, 1]
+
+
+def sellmeier_index(wavelength: ArrayLike, coeffs: Sequence[Sequence[float]]) -> Any:
+    """Returns the index of a Sellmeier model.
+
+    Args:
+        wavelength: wavelengths in um, any shape.
+        coeffs: (B, C) of every term, with C in um^2.
+    """
+    wl2 = np.square(np.asarray(wavelength, dtype=float))
+    eps = 1.0 + sum(b * wl2 / (wl2 - c) for b, c in coeffs)
+    return np.sqrt(eps)
+
+
+def fit_sellmeier(
+    wavelength: ArrayLike,
+    index: ArrayLike,
+    num_terms: int = 2,
+    wavelength_range: tuple[float, float] | None = FIT_RANGE,
+) -> Coefficients:
+    """Returns the Sellmeier coefficients fitted to measured indices.
+
+    The first term has its pole below the shortest wavelength (UV), the
+    others above the longest one (IR), so the model has no pole inside the
+    fitted range.
+
+    Args:
+        wavelength: wavelengths in um.
+        index: refractive indices.
+        num_terms: Sellmeier terms.
+        wavelength_range: (min, max) wavelengths in um to fit. None fits all.
+    """
+    if num_terms < 1:
+        raise ValueError(f"num_terms={num_terms} must be at least 1.")
+    wavelength = np.asarray(wavelength, dtype=float)
+    index = np.asarray(index, dtype=float)
+    if wavelength_range is not None:
+        keep = (wavelength >= wavelength_range[0]) & (wavelength <= wavelength_range[1])
+        wavelength, index = wavelength[keep], index[keep]
+    if wavelength.size < 2 * num_terms:
+        raise ValueError(
+            f"{wavelength.size} points cannot fit {num_terms} Sellmeier terms."
+        )
+    uv = 0.99 * wavelength.min() ** 2
+    ir = 4 * wavelength.max() ** 2
+    x0 = [index.mean() ** 2 - 1, 0.5 * uv] + [0.1, 10 * ir] * (num_terms - 1)
+    lower = [0.0, 0.0] + [0.0, ir] * (num_terms - 1)
+    upper = [np.inf, uv] + [np.inf, np.inf] * (num_terms - 1)
+
+    def residual(p: np.ndarray) -> np.ndarray:
+        return sellmeier_index(wavelength, p.reshape(-1, 2)) - index
+
+    result = least_squares(residual, x0, bounds=(lower, upper))
+    return tuple((float(b), float(c)) for b, c in result.x.reshape(-1, 2))
+
+
+def _data_hash(wavelength: np.ndarray, index: np.ndarray) -> str:
+    # hash the parsed values, so line endings or formatting do not matter
+    data = np.ascontiguousarray(np.c_[wavelength, index], dtype=np.float64)
+    return hashlib.sha256(data.tobytes()).hexdigest()
+
+
+def refit_sin_coefficients(
+    path: pathlib.Path | str = SIN_INDEX_DATA,
+    cache_file: pathlib.Path | str = COEFFICIENTS_FILE,
+) -> Coefficients:
+    """Fits the Sellmeier coefficients of SiN and rewrites the cache file.
+
+    Run it after the measured data changes, also as
+    ``python -m csac_sin_pdk.sin300.cband.simulation_tools.materials``.
+
+    Args:
+        path: measured index data.
+        cache_file: yaml file with the coefficients and the data hash.
+    """
+    path, cache_file = pathlib.Path(path), pathlib.Path(cache_file)
+    wavelength, index = load_index_data(path)
+    coeffs = fit_sellmeier(wavelength, index)
+    fitted = sellmeier_index(wavelength, coeffs) - index
+    keep = (wavelength >= FIT_RANGE[0]) & (wavelength <= FIT_RANGE[1])
+    cache_file.write_text(
+        yaml.safe_dump(
+            {
+                "source": path.name,
+                "sha256": _data_hash(wavelength, index),
+                "wavelength_range": list(FIT_RANGE),
+                "max_error": float(np.abs(fitted[keep]).max()),
+                "coeffs": [list(term) for term in coeffs],
+            },
+            sort_keys=False,
+        )
+    )
+    _cache[f"{path}:{cache_file}"] = coeffs
+    return coeffs
+
+
+def sin_coefficients(
+    path: pathlib.Path | str = SIN_INDEX_DATA,
+    cache_file: pathlib.Path | str = COEFFICIENTS_FILE,
+) -> Coefficients:
+    """Returns the cached Sellmeier coefficients of SiN.
+
+    The cache file is only read, never written. If the data it was fitted
+    from has changed, it warns to run :func:`refit_sin_coefficients`.
+    Without the data, for example in an installed package, the cache file is
+    used as is.
+
+    Args:
+        path: measured index data.
+        cache_file: yaml file with the coefficients and the data hash.
+    """
+    path, cache_file = pathlib.Path(path), pathlib.Path(cache_file)
+    key = f"{path}:{cache_file}"
+    if key in _cache:
+        return _cache[key]
+    if not cache_file.exists():
+        raise FileNotFoundError(
+            f"{cache_file} does not exist, run refit_sin_coefficients()."
+        )
+    cached = yaml.safe_load(cache_file.read_text())
+    if path.exists() and cached["sha256"] != _data_hash(*load_index_data(path)):
+        warnings.warn(
+            f"{cache_file} was not fitted from {path}, "
+            "run refit_sin_coefficients() to update it.",
+            stacklevel=2,
+        )
+    coeffs = tuple(tuple(term) for term in cached["coeffs"])
+    _cache[key] = coeffs
+    return coeffs
+
+
+def n_sin(wavelength: ArrayLike) -> Any:
+    """Returns the SiN index.
+
+    Args:
+        wavelength: wavelengths in um, any shape.
+    """
+    return sellmeier_index(wavelength, sin_coefficients())
+
+
+def n_sio2(wavelength: ArrayLike) -> Any:
+    """Returns the SiO2 index.
+
+    Args:
+        wavelength: wavelengths in um, any shape.
+    """
+    return sellmeier_index(wavelength, SIO2_SELLMEIER)
+
+
+def sin_medium(name: str = "SiN") -> Any:
+    """Returns the dispersive tidy3d medium of SiN.
+
+    Args:
+        name: medium name.
+    """
+    import tidy3d as td
+
+    return td.Sellmeier(coeffs=sin_coefficients(), name=name)
+
+
+def sio2_medium(name: str = "SiO2") -> Any:
+    """Returns the dispersive tidy3d medium of SiO2.
+
+    Args:
+        name: medium name.
+    """
+    import tidy3d as td
+
+    return td.Sellmeier(coeffs=SIO2_SELLMEIER, name=name)
+
+
+def dispersive_media() -> dict[str, Any]:
+    """Returns the dispersive tidy3d media by material name of the layer stack."""
+    return {"sin": sin_medium(), "sio2": sio2_medium()}
+
+
+if __name__ == "__main__":
+    print(refit_sin_coefficients())
@@ -10,6 +10,7 @@ import gplugins.tidy3d as gt
 # from gplugins.femwell.mode_solver import compute_cross_section_modes
 import numpy as np
 from csac_sin_pdk.sin300.cband import PDK
+from csac_sin_pdk.sin300.cband.simulation_tools.materials import dispersive_media
 
 PDK.activate()
 
@@ -188,13 +189,14 @@ class mode_tidy3D_interface():
             c.show()  # or c.write_gds(...), etc.
 
             ## For now let's just use the FEMWELL - unclear if we can actually save the 
+            media = dispersive_media()
             strip = gt.modes.Waveguide(
                 wavelength=1.55,
                 core_width=0.5,
                 core_thickness=0.3,
                 slab_thickness=0.0,
-                core_material=2,
-                clad_material=1.44,
+                core_material=media["sin"].pole_residue,
+                clad_material=media["sio2"].pole_residue,
             )
             w = np.linspace(0.4, 1, 5)
             neff = gt.modes.sweep_n_eff(strip, core_width=w)
@@ -0,0 +1,369 @@
+"""Content-addressed S-parameter store with a SQLite catalogue.
+
+S-parameters are stored once per content as ``blobs/<sha[:2]>/<sha>.npz``,
+where sha hashes the arrays themselves, so identical results of different
+simulations share one file. A SQLite catalogue maps each entry (cell name,
+settings, layer stack hash and simulation settings) to its blob. Numeric
+settings are indexed separately, so results of a sweep can be queried by
+value or range without loading any file.
+
+.. code::
+
+    from csac_sin_pdk.sin300.cband.simulation_tools.sparameter_store import (
+        SparameterStore,
+    )
+
+    store = SparameterStore()
+    store.put("coupler", {"length": 20, "gap": 0.3}, sp, simulation=sim)
+    sp = store.get("coupler", {"length": 20, "gap": 0.3}, simulation=sim)
+    for entry in store.find("coupler", length=(10, 30)):
+        print(entry.settings, entry.path)
+    store.gc()
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import tempfile
+import time
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+from kfactory import kdb
+
+__all__ = [
+    "SparameterEntry",
+    "SparameterStore",
+    "entry_key",
+    "geometry_hash",
+    "layer_stack_hash",
+    "simulation_key",
+    "sparameters_hash",
+]
+
+PathType = pathlib.Path | str
+
+dirpath_default = pathlib.Path.home() / ".gdsfactory" / "sparameters"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    cell TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    layer_stack TEXT NOT NULL,
+    simulation TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_cell ON entries (cell, layer_stack);
+CREATE INDEX IF NOT EXISTS entries_sha ON entries (sha);
+CREATE TABLE IF NOT EXISTS params (
+    key TEXT NOT NULL REFERENCES entries (key) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS params_value ON params (name, value);
+CREATE INDEX IF NOT EXISTS params_key ON params (key);
+"""
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def entry_key(
+    cell: str,
+    settings: Mapping[str, Any],
+    layer_stack: str = "",
+    simulation: Mapping[str, Any] | None = None,
+) -> str:
+    """Returns the catalogue key of a cell, its settings and how it was simulated."""
+    text = _dumps([cell, dict(settings), layer_stack, dict(simulation or {})])
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def layer_stack_hash(layer_stack: Any) -> str:
+    """Returns a hash of a layer stack, or of its JSON if it is a pydantic model."""
+    if hasattr(layer_stack, "model_dump_json"):
+        text = layer_stack.model_dump_json()
+    else:
+        text = _dumps(layer_stack)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def geometry_hash(component: Any) -> str:
+    """Returns a hash of the merged polygons of every layer and of the ports."""
+    h = hashlib.sha256()
+    for layer_index in sorted(component.kcl.layer_indexes()):
+        region = kdb.Region(component.begin_shapes_rec(layer_index)).merged()
+        if region.is_empty():
+            continue
+        h.update(str(component.kcl.get_info(layer_index)).encode())
+        h.update("\n".join(sorted(str(p) for p in region.each())).encode())
+    for port in component.ports:
+        h.update(f"{port.name} {port.trans} {port.width} {port.layer_info}".encode())
+    return h.hexdigest()
+
+
+def simulation_key(
+    component: Any, layer_stack: Any, simulation: Mapping[str, Any]
+) -> str:
+    """Returns the cache key of a simulation without building any solver objects.
+
+    Args:
+        component: simulated component, hashed by :func:`geometry_hash`.
+        layer_stack: layer stack, hashed by :func:`layer_stack_hash`.
+        simulation: simulation arguments.
+    """
+    text = _dumps(
+        [geometry_hash(component), layer_stack_hash(layer_stack), dict(simulation)]
+    )
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def sparameters_hash(sp: Mapping[str, np.ndarray]) -> str:
+    """Returns a hash of the names, dtypes, shapes and values of S-parameters."""
+    h = hashlib.sha256()
+    for name in sorted(sp):
+        array = np.ascontiguousarray(sp[name])
+        h.update(f"{name}|{array.dtype.str}|{array.shape}|".encode())
+        h.update(array.tobytes())
+    return h.hexdigest()
+
+
+@dataclass
+class SparameterEntry:
+    """Catalogue entry of stored S-parameters.
+
+    Args:
+        key: catalogue key, see :func:`entry_key`.
+        cell: cell name.
+        settings: cell settings.
+        layer_stack: layer stack hash.
+        simulation: simulation settings.
+        sha: content hash of the S-parameters.
+        path: npz file holding the S-parameters.
+        created: time the entry was written, in seconds since the epoch.
+    """
+
+    key: str
+    cell: str
+    settings: dict[str, Any]
+    layer_stack: str
+    simulation: dict[str, Any]
+    sha: str
+    path: pathlib.Path
+    created: float
+
+    def load(self) -> dict[str, np.ndarray]:
+        """Returns the S-parameters of the entry."""
+        return dict(np.load(self.path))
+
+
+class SparameterStore:
+    """S-parameters stored by content and catalogued by cell and settings.
+
+    Args:
+        dirpath: store directory, holding catalogue.sqlite and blobs/.
+    """
+
+    def __init__(self, dirpath: PathType = dirpath_default) -> None:
+        """Create the store directory and catalogue if they do not exist."""
+        self.dirpath = pathlib.Path(dirpath)
+        self.blobs = self.dirpath / "blobs"
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        self.catalogue = self.dirpath / "catalogue.sqlite"
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        con = sqlite3.connect(self.catalogue, timeout=30)
+        con.execute("PRAGMA foreign_keys = ON")
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def blob_path(self, sha: str) -> pathlib.Path:
+        """Returns the npz file of a content hash."""
+        return self.blobs / sha[:2] / f"{sha}.npz"
+
+    def _entry(self, row: tuple[Any, ...]) -> SparameterEntry:
+        key, cell, settings, layer_stack, simulation, sha, created = row
+        return SparameterEntry(
+            key=key,
+            cell=cell,
+            settings=json.loads(settings),
+            layer_stack=layer_stack,
+            simulation=json.loads(simulation),
+            sha=sha,
+            path=self.blob_path(sha),
+            created=created,
+        )
+
+    def put(
+        self,
+        cell: str,
+        settings: Mapping[str, Any],
+        sp: Mapping[str, np.ndarray],
+        layer_stack: str = "",
+        simulation: Mapping[str, Any] | None = None,
+    ) -> SparameterEntry:
+        """Stores S-parameters, replacing any previous entry with the same key.
+
+        Args:
+            cell: cell name.
+            settings: cell settings.
+            sp: S-parameters by name, for example ``o1@0,o2@0`` and wavelengths.
+            layer_stack: layer stack hash, see :func:`layer_stack_hash`.
+            simulation: simulation settings.
+        """
+        settings = json.loads(_dumps(dict(settings)))
+        simulation = json.loads(_dumps(dict(simulation or {})))
+        key = entry_key(cell, settings, layer_stack, simulation)
+        sha = sparameters_hash(sp)
+        path = self.blob_path(sha)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(suffix=".npz", dir=path.parent)
+            os.close(fd)
+            np.savez_compressed(tmp, **sp)
+            os.replace(tmp, path)
+
+        created = time.time()
+        with self._connect() as con:
+            con.execute("DELETE FROM entries WHERE key = ?", (key,))
+            con.execute(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    cell,
+                    _dumps(settings),
+                    layer_stack,
+                    _dumps(simulation),
+                    sha,
+                    created,
+                ),
+            )
+            con.executemany(
+                "INSERT INTO params VALUES (?, ?, ?, ?)",
+                [
+                    (key, name, *_param_value(value))
+                    for name, value in settings.items()
+                ],
+            )
+        return SparameterEntry(
+            key, cell, settings, layer_stack, simulation, sha, path, created
+        )
+
+    def entry(self, key: str) -> SparameterEntry | None:
+        """Returns the entry of a catalogue key, or None."""
+        with self._connect() as con:
+            row = con.execute("SELECT * FROM entries WHERE key = ?", (key,)).fetchone()
+        return None if row is None else self._entry(row)
+
+    def get(
+        self,
+        cell: str,
+        settings: Mapping[str, Any],
+        layer_stack: str = "",
+        simulation: Mapping[str, Any] | None = None,
+    ) -> dict[str, np.ndarray] | None:
+        """Returns stored S-parameters, or None if they were never stored.
+
+        Args:
+            cell: cell name.
+            settings: cell settings.
+            layer_stack: layer stack hash.
+            simulation: simulation settings.
+        """
+        settings = json.loads(_dumps(dict(settings)))
+        simulation = json.loads(_dumps(dict(simulation or {})))
+        entry = self.entry(entry_key(cell, settings, layer_stack, simulation))
+        if entry is None or not entry.path.exists():
+            return None
+        return entry.load()
+
+    def find(
+        self,
+        cell: str | None = None,
+        layer_stack: str | None = None,
+        **params: Any,
+    ) -> list[SparameterEntry]:
+        """Returns the entries matching a cell, a layer stack and settings.
+
+        Args:
+            cell: cell name.
+            layer_stack: layer stack hash.
+            params: setting values. A (min, max) tuple matches a closed range
+                of numbers, any other value matches exactly.
+        """
+        query = "SELECT * FROM entries WHERE 1"
+        args: list[Any] = []
+        if cell is not None:
+            query += " AND cell = ?"
+            args.append(cell)
+        if layer_stack is not None:
+            query += " AND layer_stack = ?"
+            args.append(layer_stack)
+        for name, value in params.items():
+            query += " AND key IN (SELECT key FROM params WHERE name = ?"
+            args.append(name)
+            if isinstance(value, tuple):
+                low, high = value
+                query += " AND value BETWEEN ? AND ?)"
+                args += [low, high]
+            else:
+                number, text = _param_value(value)
+                if number is None:
+                    query += " AND text = ?)"
+                    args.append(text)
+                else:
+                    query += " AND value = ?)"
+                    args.append(number)
+        query += " ORDER BY created"
+        with self._connect() as con:
+            rows = con.execute(query, args).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def delete(self, key: str) -> None:
+        """Removes an entry from the catalogue. Its blob is removed by :meth:`gc`."""
+        with self._connect() as con:
+            con.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def gc(self) -> tuple[int, int]:
+        """Removes orphans: blobs without entries and entries without blobs.
+
+        Returns:
+            number of removed blobs and number of removed entries.
+        """
+        with self._connect() as con:
+            rows = con.execute("SELECT key, sha FROM entries").fetchall()
+            dangling = [key for key, sha in rows if not self.blob_path(sha).exists()]
+            con.executemany(
+                "DELETE FROM entries WHERE key = ?", [(key,) for key in dangling]
+            )
+        used = {sha for _, sha in rows}
+        blobs = 0
+        for path in self.blobs.glob("*/*.npz"):
+            if path.stem not in used:
+                path.unlink()
+                blobs += 1
+        return blobs, len(dangling)
+
+
+def _param_value(value: Any) -> tuple[float | None, str | None]:
+    """Returns the (number, text) columns of a setting value."""
+    if isinstance(value, int | float) and not isinstance(value, bool):
+        return float(value), None
+    return None, _dumps(value)
@@ -0,0 +1,532 @@
+"""Headless parameter sweeps of the FDTD and FDE simulators.
+
+A sweep spec, in YAML or JSON, names a cell or a cross-section of the PDK,
+the values of the swept parameters and the simulator. It replaces the
+tkinter flows of ``send_component_to_FDTD`` and ``send_to_FDE``, so that the
+same sweeps run unattended on compute nodes.
+
+.. code:: yaml
+
+    simulator: tidy3d  # tidy3d, fde, lumerical, cost or module:function
+    cell: coupler  # or cross_section: strip for fde
+    settings: {gap: 0.27}  # fixed arguments of the cell
+    parameters:
+      length: [10, 20, 30]
+      dy: {min: 4, max: 8}  # a range, for the lhs and sobol modes
+    mode: product  # product, zip, lhs or sobol
+    samples: 16
+    seed: 0
+    simulation: {sim_size_z: 3.0}  # arguments of the simulator
+
+Combinations run in a process pool. Each one gets its own directory in
+``<output>/<name>`` with the GDS of the component, the simulator results and
+a ``record.yaml``. Combinations with a record are skipped when the sweep is
+run again, so an interrupted sweep resumes where it stopped.
+``results.csv`` lists every combination with its status and results.
+
+.. code::
+
+    python -m csac_sin_pdk.sin300.cband.simulation_tools.sweep spec.yaml -o sweeps
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import importlib
+import itertools
+import json
+import pathlib
+import time
+import traceback
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, fields
+from functools import partial
+from typing import Any
+
+import gdsfactory as gf
+import numpy as np
+import yaml
+from gdsfactory.pdk import get_layer_stack
+from scipy.stats import qmc
+
+from csac_sin_pdk.sin300.cband import PDK
+
+__all__ = [
+    "SIMULATORS",
+    "SWEEP_MODES",
+    "SweepResult",
+    "SweepSpec",
+    "main",
+    "run_sweep",
+    "sweep_combinations",
+    "sweep_file_name",
+]
+
+SWEEP_MODES = ("product", "zip", "lhs", "sobol")
+RECORD = "record.yaml"
+RESULTS = "results.csv"
+
+
+def _sampled_values(values, u):
+    """Maps unit samples to a (min, max) range or to a list of discrete values."""
+    if isinstance(values, tuple):
+        low, high = values
+        return [float(v) for v in low + u * (high - low)]
+    index = np.minimum((u * len(values)).astype(int), len(values) - 1)
+    return [values[i] for i in index]
+
+
+def sweep_combinations(
+    parameters_swept: dict[str, list],
+    every_combo=True,
+    mode: str | None = None,
+    samples: int | None = None,
+    seed: int | None = None,
+) -> list[dict]:
+    """Returns the parameter values of every simulation of a sweep.
+
+    Args:
+        parameters_swept: values of every swept parameter. For the lhs and
+            sobol modes, a tuple (min, max) is a continuous range and a list
+            holds the discrete values to pick from.
+        every_combo: product mode if True, zip mode if False. Ignored if mode is set.
+        mode: product (every combination), zip (the i-th value of every
+            parameter together), lhs (Latin hypercube) or sobol (scrambled
+            Sobol sequence).
+        samples: number of samples of the lhs and sobol modes. Repeated
+            combinations of discrete values are dropped.
+        seed: seed of the lhs and sobol samplers.
+    """
+    mode = mode or ("product" if every_combo else "zip")
+    keys = list(parameters_swept.keys())
+    if mode == "product":
+        return [
+            dict(zip(keys, combo))
+            for combo in (itertools.product(*parameters_swept.values()))
+        ]
+    if mode == "zip":
+        # In this case, the values of the parameters should match exactly
+        lengths = [len(param_values) for param_values in parameters_swept.values()]
+        if len(set(lengths)) > 1:
+            raise IndexError(
+                "If not using a nested sweep, all parameter values should have the same length.\n"
+                + f"Here the lengths were {lengths}"
+            )
+        return [dict(zip(keys, combo)) for combo in zip(*parameters_swept.values())]
+    if mode not in SWEEP_MODES:
+        raise ValueError(f"mode={mode!r} must be one of {SWEEP_MODES}")
+    if not samples or samples < 1:
+        raise ValueError(f"mode={mode!r} needs a positive number of samples")
+
+    if mode == "lhs":
+        sampler = qmc.LatinHypercube(d=len(keys), seed=seed)
+    else:
+        sampler = qmc.Sobol(d=len(keys), scramble=True, seed=seed)
+    u = sampler.random(samples)
+    columns = [
+        _sampled_values(values, u[:, i])
+        for i, values in enumerate(parameters_swept.values())
+    ]
+    combinations = []
+    seen = set()
+    for combo in zip(*columns):
+        if combo not in seen:
+            seen.add(combo)
+            combinations.append(dict(zip(keys, combo)))
+    return combinations
+
+
+def sweep_file_name(
+    parameters_swept: dict[str, list], param_combo: dict, index: int | None = None
+) -> str:
+    """Returns the file name of a combination.
+
+    Nested sweeps name each parameter with its 1-based value index, other
+    sweeps name the 1-based position of the combination.
+    """
+    if index is not None:
+        return f"sample_{index + 1}"
+    name = ""
+    for param_name in parameters_swept.keys():
+        name += (
+            param_name
+            + "_"
+            + str(parameters_swept[param_name].index(param_combo[param_name]) + 1)
+        )
+    return name
+
+
+def _simulate_tidy3d(
+    component: gf.Component,
+    folder: pathlib.Path,
+    store: str | None = None,
+    **simulation: Any,
+) -> dict[str, Any]:
+    """Runs the S-parameters of a component in tidy3d."""
+    from csac_sin_pdk.sin300.cband.simulation_tools.sparameter_store import (
+        SparameterStore,
+    )
+    from csac_sin_pdk.sin300.cband.simulation_tools.tidy3D_backend import (
+        CSAC_t3d_write_params,
+    )
+
+    filepath = folder / "sparameters.npz"
+    sp = CSAC_t3d_write_params(
+        component,
+        run=True,
+        dirpath=folder,
+        filepath=filepath,
+        folder_name=folder.parent.name,
+        store=SparameterStore(store) if store else None,
+        **{"verbose": False, **simulation},
+    )
+    return {"results": filepath.name, "sparameters": len(sp) - 1}
+
+
+def _simulate_fde(
+    cross_section: gf.CrossSection,
+    folder: pathlib.Path,
+    layer: str = "core",
+    wavelength: float | list[float] = 1.55,
+    num_modes: int = 2,
+    **simulation: Any,
+) -> dict[str, Any]:
+    """Solves the modes of a straight waveguide of a cross-section in tidy3d.
+
+    The core is the layer stack level of the given name, with the width of
+    the cross-section, in the dispersive media of materials.py.
+    """
+    from gplugins.tidy3d.modes import Waveguide
+
+    from csac_sin_pdk.sin300.cband.simulation_tools.materials import (
+        dispersive_media,
+    )
+
+    level = get_layer_stack().layers[layer]
+    media = dispersive_media()
+    waveguide = Waveguide(
+        wavelength=wavelength,
+        core_width=cross_section.width,
+        core_thickness=level.thickness,
+        core_material=media[level.material].pole_residue,
+        clad_material=media["sio2"].pole_residue,
+        sidewall_angle=np.deg2rad(level.sidewall_angle or 0),
+        num_modes=num_modes,
+        cache_path=None,
+        **simulation,
+    )
+    arrays = {"wavelength": np.atleast_1d(wavelength), "n_eff": waveguide.n_eff}
+    if waveguide.n_group is not None:
+        arrays["n_group"] = waveguide.n_group
+    filepath = folder / "modes.npz"
+    np.savez_compressed(filepath, **arrays)
+    return {
+        "results": filepath.name,
+        "n_eff": float(np.real(np.asarray(waveguide.n_eff).flat[0])),
+    }
+
+
+def _simulate_cost(
+    component: gf.Component, folder: pathlib.Path, **simulation: Any
+) -> dict[str, Any]:
+    """Estimates the FDTD cost of a component, see cost.py."""
+    from csac_sin_pdk.sin300.cband.simulation_tools.cost import estimate_cost
+
+    cost = asdict(estimate_cost(component, **simulation))
+    cost["size"] = list(cost["size"])
+    filepath = folder / "cost.yaml"
+    filepath.write_text(yaml.safe_dump(cost, sort_keys=False))
+    return {
+        "results": filepath.name,
+        "credits": cost["credits"],
+        "memory_GB": cost["memory_GB"],
+    }
+
+
+SIMULATORS: dict[str, Callable[..., dict[str, Any]]] = {
+    "tidy3d": _simulate_tidy3d,
+    "fde": _simulate_fde,
+    "cost": _simulate_cost,
+}
+
+
+def _get_simulator(name: str) -> Callable[..., dict[str, Any]]:
+    """Returns a built-in simulator or imports a module:function one."""
+    if name in SIMULATORS:
+        return SIMULATORS[name]
+    module, _, function = name.partition(":")
+    return getattr(importlib.import_module(module), function)
+
+
+@dataclass
+class SweepSpec:
+    """Parameter sweep of a cell or cross-section.
+
+    Args:
+        simulator: tidy3d (S-parameters), fde (modes of a cross-section),
+            lumerical (layouts and scripts), cost (FDTD cost estimates), or
+            ``module:function`` of a simulator called with the component or
+            cross-section, the combination directory and the simulation
+            arguments, returning a dict of results.
+        cell: cell of the active PDK.
+        cross_section: cross-section of the active PDK, for fde.
+        parameters: values of every swept parameter. A ``{min, max}`` mapping
+            is a range for the lhs and sobol modes.
+        settings: fixed arguments of the cell or cross-section.
+        simulation: arguments of the simulator.
+        mode: product, zip, lhs or sobol, see :func:`sweep_combinations`.
+        samples: number of samples of the lhs and sobol modes.
+        seed: seed of the lhs and sobol samplers.
+        name: name of the sweep directory. Defaults to the cell or
+            cross-section.
+    """
+
+    simulator: str
+    cell: str | None = None
+    cross_section: str | None = None
+    parameters: dict[str, Any] = field(default_factory=dict)
+    settings: dict[str, Any] = field(default_factory=dict)
+    simulation: dict[str, Any] = field(default_factory=dict)
+    mode: str = "product"
+    samples: int | None = None
+    seed: int | None = None
+    name: str | None = None
+
+    def __post_init__(self) -> None:
+        """Checks the spec."""
+        if (self.cell is None) == (self.cross_section is None):
+            raise ValueError("Set exactly one of cell and cross_section.")
+        if self.simulator == "fde" and self.cross_section is None:
+            raise ValueError("The fde simulator needs a cross_section.")
+        if self.simulator != "fde" and self.cell is None:
+            raise ValueError(f"The {self.simulator} simulator needs a cell.")
+        simulators = (*SIMULATORS, "lumerical")
+        if self.simulator not in simulators and ":" not in self.simulator:
+            raise ValueError(
+                f"simulator={self.simulator!r} must be one of {simulators} "
+                "or module:function"
+            )
+        if self.mode not in SWEEP_MODES:
+            raise ValueError(f"mode={self.mode!r} must be one of {SWEEP_MODES}")
+        self.name = self.name or self.cell or self.cross_section
+
+    @classmethod
+    def from_file(cls, filepath: pathlib.Path | str) -> SweepSpec:
+        """Returns the spec of a YAML or JSON file."""
+        filepath = pathlib.Path(filepath)
+        text = filepath.read_text()
+        data = json.loads(text) if filepath.suffix == ".json" else yaml.safe_load(text)
+        unknown = set(data) - {f.name for f in fields(cls)}
+        if unknown:
+            raise ValueError(f"Unknown keys {sorted(unknown)} in {filepath}")
+        return cls(**data)
+
+    @property
+    def parameters_swept(self) -> dict[str, list | tuple]:
+        """Parameter values, with ranges as (min, max) tuples."""
+        return {
+            key: (values["min"], values["max"]) if isinstance(values, dict) else values
+            for key, values in self.parameters.items()
+        }
+
+    def combinations(self) -> list[dict[str, Any]]:
+        """Returns the parameter values of every combination."""
+        return sweep_combinations(
+            self.parameters_swept,
+            mode=self.mode,
+            samples=self.samples,
+            seed=self.seed,
+        )
+
+    def combination_names(self) -> list[str]:
+        """Returns the directory name of every combination."""
+        nested = self.mode == "product"
+        return [
+            sweep_file_name(self.parameters_swept, combo, None if nested else index)
+            for index, combo in enumerate(self.combinations())
+        ]
+
+
+@dataclass
+class SweepResult:
+    """Outcome of a sweep.
+
+    Args:
+        output: sweep directory.
+        records: name, status (done, cached or error), seconds, error,
+            parameter values and results of every combination.
+    """
+
+    output: pathlib.Path
+    records: list[dict[str, Any]]
+
+    @property
+    def failed(self) -> list[dict[str, Any]]:
+        """Records of the combinations that failed."""
+        return [record for record in self.records if record["status"] == "error"]
+
+    def __str__(self) -> str:
+        """Returns a one-line summary."""
+        statuses = [record["status"] for record in self.records]
+        counts = ", ".join(
+            f"{statuses.count(status)} {status}"
+            for status in ("done", "cached", "error")
+            if status in statuses
+        )
+        return f"{len(self.records)} combinations ({counts or 'none'}) in {self.output}"
+
+
+def _init_worker() -> None:
+    PDK.activate()
+
+
+def _run_combination(
+    spec: SweepSpec,
+    combo: dict[str, Any],
+    folder: pathlib.Path,
+    overwrite: bool,
+) -> dict[str, Any]:
+    """Builds and simulates one combination, recording errors instead of raising.
+
+    Runs in a worker process, so it only takes and returns picklable values.
+    """
+    record_path = folder / RECORD
+    if record_path.exists() and not overwrite:
+        record = yaml.safe_load(record_path.read_text())
+        if record["status"] == "done":
+            return {**record, "status": "cached"}
+
+    folder.mkdir(parents=True, exist_ok=True)
+    record = {"name": folder.name, "status": "done", "seconds": 0.0, "error": ""}
+    record.update(combo)
+    t0 = time.perf_counter()
+    try:
+        kwargs = {**spec.settings, **combo}
+        if spec.cell is not None:
+            target = gf.get_component(spec.cell, **kwargs)
+            target.write_gds(folder / "component.gds")
+        else:
+            target = gf.get_cross_section(spec.cross_section, **kwargs)
+        simulator = _get_simulator(spec.simulator)
+        record.update(simulator(target, folder, **spec.simulation))
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+        (folder / "error.txt").write_text(traceback.format_exc())
+    record["seconds"] = time.perf_counter() - t0
+    record_path.write_text(yaml.safe_dump(_plain(record), sort_keys=False))
+    return record
+
+
+def _plain(record: dict[str, Any]) -> dict[str, Any]:
+    """Converts numpy scalars so that a record can be dumped to YAML."""
+    return {k: v.item() if isinstance(v, np.generic) else v for k, v in record.items()}
+
+
+def _run_lumerical(
+    spec: SweepSpec,
+    output: pathlib.Path,
+    max_workers: int | None,
+    overwrite: bool,
+) -> list[dict[str, Any]]:
+    """Writes the Lumerical layouts and scripts of a sweep to ``output``."""
+    from csac_sin_pdk.sin300.cband.simulation_tools.lumerical_backend import (
+        gen_lum_sim_inputs,
+    )
+
+    records = gen_lum_sim_inputs(
+        cell=partial(gf.get_component, spec.cell, **spec.settings),
+        parameters_swept=spec.parameters_swept,
+        mode=spec.mode,
+        samples=spec.samples,
+        seed=spec.seed,
+        max_workers=max_workers,
+        output=output,
+        overwrite=overwrite,
+        **spec.simulation,
+    )
+    return [
+        {
+            "name": record["name"],
+            "status": "done" if record["written"] else "cached",
+            "seconds": 0.0,
+            "error": "",
+            **record["values"],
+            "hash": record["hash"],
+        }
+        for record in records
+    ]
+
+
+def run_sweep(
+    spec: SweepSpec | pathlib.Path | str,
+    output: pathlib.Path | str = "sweeps",
+    max_workers: int | None = None,
+    overwrite: bool = False,
+) -> SweepResult:
+    """Runs every combination of a sweep and writes the results.
+
+    Args:
+        spec: sweep spec, or the path of a YAML or JSON spec file.
+        output: directory of the sweeps. The results go to ``output/name``.
+        max_workers: processes running combinations. Defaults to the CPU
+            count. 1 runs them in this process.
+        overwrite: if True, reruns the combinations that are already done.
+    """
+    if not isinstance(spec, SweepSpec):
+        spec = SweepSpec.from_file(spec)
+    output = pathlib.Path(output) / spec.name
+    output.mkdir(parents=True, exist_ok=True)
+    (output / "spec.yaml").write_text(yaml.safe_dump(asdict(spec), sort_keys=False))
+
+    if spec.simulator == "lumerical":
+        # gen_lum_sim_inputs keeps its own manifest and process pool
+        records = _run_lumerical(spec, output, max_workers, overwrite)
+    else:
+        combinations = spec.combinations()
+        jobs = [
+            (spec, combo, output / name, overwrite)
+            for combo, name in zip(combinations, spec.combination_names())
+        ]
+        if max_workers == 1 or len(jobs) < 2:
+            records = [_run_combination(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_init_worker
+            ) as pool:
+                records = list(pool.map(_run_combination, *zip(*jobs)))
+
+    columns = list(dict.fromkeys(key for record in records for key in record))
+    with open(output / RESULTS, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(records)
+    return SweepResult(output=output, records=records)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Runs a sweep spec from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("spec", help="YAML or JSON sweep spec")
+    parser.add_argument("-o", "--output", default="sweeps")
+    parser.add_argument("-j", "--max-workers", type=int, default=None)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args(argv)
+
+    PDK.activate()
+    result = run_sweep(
+        args.spec,
+        output=args.output,
+        max_workers=args.max_workers,
+        overwrite=args.overwrite,
+    )
+    print(result)
+    for record in result.failed:
+        print(f"{record['name']}: {record['error']}")
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,205 @@
+"""Mirror-symmetry detection for FDTD simulation domains.
+
+Tidy3D symmetry planes pass through the simulation centre and halve the
+domain for each plane that is used. :func:`detect_symmetry` checks the
+three planes through the centre of a component:
+
+- x and y planes: the merged shapes of every layer of the layer stack must
+  be mirror images of themselves, and so must the ports.
+- z plane: every layer with shapes must be centred on the simulation centre
+  with vertical sidewalls.
+
+The S-parameter sources sit on the ports, so a plane can only be used if
+every port lies on it and propagates along it. A 2x2 coupler is symmetric,
+but each port excites one arm only, so its planes are reported as
+geometric mirrors and left off.
+
+The sign of a plane follows the mode polarization. A TE mode has its main
+electric field in-plane and normal to the vertical plane along the
+waveguide, so that plane is odd (-1) and the z plane is even (+1). For TM
+the signs swap. Higher-order modes alternate in parity, and a plane keeps
+the modes of one parity only, so symmetry is off when ports carry more than
+one mode.
+
+.. code::
+
+    from csac_sin_pdk.sin300.cband import PDK
+    from csac_sin_pdk.sin300.cband.simulation_tools.symmetry import detect_symmetry
+
+    PDK.activate()
+    report = detect_symmetry(gf.get_component("straight"))
+    print(report)  # symmetry (0, -1, 0)
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import gdsfactory as gf
+from gdsfactory.pdk import get_layer_stack
+from gdsfactory.technology import LayerStack
+from kfactory import kdb
+
+__all__ = ["SymmetryReport", "detect_symmetry"]
+
+
+@dataclass
+class SymmetryReport:
+    """Mirror planes through the centre of a component.
+
+    Args:
+        center: simulation centre (x, y, z) in um.
+        mirror: whether the geometry and ports are mirror images of
+            themselves about the x, y and z planes.
+        ports_on_plane: whether every port lies on and propagates along the
+            x, y and z planes.
+        symmetry: tidy3d symmetry, non-zero for the planes that can be used.
+    """
+
+    center: tuple[float, float, float]
+    mirror: tuple[bool, bool, bool]
+    ports_on_plane: tuple[bool, bool, bool]
+    symmetry: tuple[int, int, int]
+
+    @property
+    def reduction(self) -> int:
+        """Factor by which the symmetry planes shrink the domain."""
+        return 2 ** sum(s != 0 for s in self.symmetry)
+
+    def __str__(self) -> str:
+        """Returns a one-line summary."""
+        planes = "".join(a for a, m in zip("xyz", self.mirror) if m) or "none"
+        return (
+            f"mirror planes: {planes}, symmetry {self.symmetry}, "
+            f"domain / {self.reduction}"
+        )
+
+
+def _mirrored(region: kdb.Region, axis: int, twice_center: int) -> kdb.Region:
+    """Mirrors a region about x = twice_center / 2 (axis 0) or y (axis 1)."""
+    if axis == 0:
+        return region.transformed(kdb.Trans(kdb.Trans.M90, twice_center, 0))
+    return region.transformed(kdb.Trans(kdb.Trans.M0, 0, twice_center))
+
+
+def _center_z(
+    layer_stack: LayerStack, layers: list[str], center_z: float | str | None
+) -> float:
+    if isinstance(center_z, int | float):
+        return float(center_z)
+    if isinstance(center_z, str):
+        level = layer_stack.layers[center_z]
+        return level.zmin + level.thickness / 2
+    zs = [
+        z
+        for name in layers
+        for level in [layer_stack.layers[name]]
+        for z in (level.zmin, level.zmin + level.thickness)
+    ]
+    return (min(zs) + max(zs)) / 2 if zs else 0.0
+
+
+def detect_symmetry(
+    component: gf.Component,
+    layer_stack: LayerStack | None = None,
+    polarization: str | None = "te",
+    center_z: float | str | None = None,
+    tolerance: float = 0.002,
+    num_modes: int = 1,
+) -> SymmetryReport:
+    """Returns the mirror planes of a component and the tidy3d symmetry.
+
+    Args:
+        component: component to simulate.
+        layer_stack: layers extruded into the simulation. Defaults to the
+            active PDK layer stack.
+        polarization: te or tm mode polarization. None disables symmetry,
+            since the parity of the modes is unknown.
+        center_z: z of the simulation centre, or a layer name for the
+            centre of that layer. Defaults to the centre of the layers with
+            shapes, like ``Tidy3DComponent``.
+        tolerance: largest mismatch in um still considered symmetric.
+        num_modes: modes of every port. More than one disables symmetry,
+            since the modes do not share one parity.
+    """
+    if polarization not in ("te", "tm", None):
+        raise ValueError(f"polarization={polarization!r} must be 'te', 'tm' or None")
+    layer_stack = layer_stack or get_layer_stack()
+    dbu = component.kcl.dbu
+    tol = round(tolerance / dbu)
+    bbox = component.kdb_cell.bbox()
+    twice = (bbox.left + bbox.right, bbox.bottom + bbox.top)
+
+    regions = {}
+    for name, level in layer_stack.layers.items():
+        region = level.layer.get_shapes(component)
+        if not region.is_empty():
+            regions[name] = region.merged()
+
+    mirror = []
+    for axis in (0, 1):
+        geometry = all(
+            (region ^ _mirrored(region, axis, twice[axis])).sized(-tol).is_empty()
+            for region in regions.values()
+        )
+        mirror.append(geometry and _ports_mirrored(component, axis, twice[axis], tol))
+    cz = _center_z(layer_stack, list(regions), center_z)
+    mirror.append(
+        all(
+            level.sidewall_angle == 0
+            and abs(level.zmin + level.thickness / 2 - cz) <= tolerance
+            for level in (layer_stack.layers[name] for name in regions)
+        )
+    )
+
+    ports_on_plane = []
+    for axis, along in ((0, (90, 270)), (1, (0, 180))):
+        ports_on_plane.append(
+            all(
+                abs(2 * round(port.center[axis] / dbu) - twice[axis]) <= 2 * tol
+                and round(port.orientation) % 360 in along
+                for port in component.ports
+            )
+        )
+    # ports are in-plane, their modes are centred on the z plane
+    ports_on_plane.append(True)
+
+    # TE: odd about the vertical plane along the waveguide, even about z
+    parities = {"te": (-1, 1), "tm": (1, -1), None: (0, 0)}
+    in_plane, vertical = parities[polarization if num_modes == 1 else None]
+    parity = (in_plane, in_plane, vertical)
+    symmetry = tuple(
+        p if m and on else 0 for p, m, on in zip(parity, mirror, ports_on_plane)
+    )
+    center = (twice[0] * dbu / 2, twice[1] * dbu / 2, cz)
+    return SymmetryReport(
+        center=center,
+        mirror=tuple(mirror),
+        ports_on_plane=tuple(ports_on_plane),
+        symmetry=symmetry,
+    )
+
+
+def _ports_mirrored(
+    component: gf.Component, axis: int, twice_center: int, tol: int
+) -> bool:
+    """Whether the mirror image of every port is a port of the same width."""
+    dbu = component.kcl.dbu
+    ports = [
+        (round(p.x / dbu), round(p.y / dbu), round(p.orientation) % 360, p.width)
+        for p in component.ports
+    ]
+    for x, y, angle, width in ports:
+        if axis == 0:
+            image = (twice_center - x, y, (180 - angle) % 360)
+        else:
+            image = (x, twice_center - y, (-angle) % 360)
+        if not any(
+            abs(image[0] - px) <= tol
+            and abs(image[1] - py) <= tol
+            and image[2] == pa
+            and width == pw
+            for px, py, pa, pw in ports
+        ):
+            return False
+    return True
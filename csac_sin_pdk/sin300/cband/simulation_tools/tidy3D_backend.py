@@ -29,6 +29,14 @@ from gplugins.tidy3d.materials import MaterialSpecTidy3d, get_medium
 from collections.abc import Sequence
 from gplugins.tidy3d.util import get_mode_solvers, get_port_normal, sort_layers
 from tidy3d.web.api.webapi import upload
+from csac_sin_pdk.sin300.cband.simulation_tools.batch import BatchManager
+from csac_sin_pdk.sin300.cband.simulation_tools.materials import dispersive_media
+from csac_sin_pdk.sin300.cband.simulation_tools.symmetry import detect_symmetry
+from csac_sin_pdk.sin300.cband.simulation_tools.sparameter_store import (
+    SparameterStore,
+    layer_stack_hash,
+    simulation_key,
+)
 
 PathType = pathlib.Path | str
 
@@ -37,10 +45,31 @@ dirpath_default = home / ".gdsfactory" / "sparameters"
 
 material_name_to_medium = {
     "si": td.Medium(name="Si", permittivity=3.47**2),
-    "sio2": td.Medium(name="SiO2", permittivity=1.47**2),
-    "sin": td.Medium(name="SiN", permittivity=2.0**2),
+    **dispersive_media(),
 }
 
+
+def _sparameters(s) -> dict[str, np.ndarray]:
+    """Returns the S-parameters of a tidy3d scattering matrix.
+
+    Keys are ``port_in@mode_in,port_out@mode_out``, plus the wavelengths.
+    """
+    sp = {}
+    for port_in in s.port_in.values:
+        for port_out in s.port_out.values:
+            for mode_index_in in s.mode_index_in.values:
+                for mode_index_out in s.mode_index_out.values:
+                    sp[f"{port_in}@{mode_index_in},{port_out}@{mode_index_out}"] = (
+                        s.sel(
+                            port_in=port_in,
+                            port_out=port_out,
+                            mode_index_in=mode_index_in,
+                            mode_index_out=mode_index_out,
+                        ).values
+                    )
+    sp["wavelengths"] = td.constants.C_0 / s.f.values
+    return sp
+
 def CSAC_t3d_write_params(
     component: Component,
     layer_stack: LayerStack | None = None,
@@ -64,7 +93,7 @@ def CSAC_t3d_write_params(
     extra_monitors: tuple[Any, ...] | None = None,
     mode_spec: td.ModeSpec = td.ModeSpec(num_modes=1, filter_pol="te"),
     boundary_spec: td.BoundarySpec = td.BoundarySpec.all_sides(boundary=td.PML()),
-    symmetry: tuple[Symmetry, Symmetry, Symmetry] = (0, 0, 0),
+    symmetry: tuple[Symmetry, Symmetry, Symmetry] | Literal["auto"] = "auto",
     run_time: float = 1e-12,
     run : bool = False,
     shutoff: float = 1e-5,
@@ -80,6 +109,8 @@ def CSAC_t3d_write_params(
     plot_epsilon: bool = False,
     filepath: PathType | None = None,
     overwrite: bool = False,
+    store: SparameterStore | None = None,
+    batch: BatchManager | None = None,
     **kwargs: Any,
 ) -> Sparameters:
     """Writes the S-parameters for a component.
@@ -109,7 +140,9 @@ def CSAC_t3d_write_params(
         mode_spec: The mode specification for the ComponentModeler. Defaults to td.ModeSpec(num_modes=1, filter_pol="te").
         boundary_spec: The boundary specification for the ComponentModeler.
             Defaults to td.BoundarySpec.all_sides(boundary=td.PML()).
-        symmetry (tuple[Symmetry, Symmetry, Symmetry], optional): The symmetry for the simulation. Defaults to (0,0,0).
+        symmetry (tuple[Symmetry, Symmetry, Symmetry], optional): The symmetry for the simulation.
+            Defaults to "auto": detected from the geometry, ports and mode polarization.
+            "auto" uses no symmetry when mode_spec has more than one mode.
         run_time: The run time for the ComponentModeler.
         shutoff: The shutoff value for the ComponentModeler. Defaults to 1e-5.
         folder_name: The folder name for the ComponentModeler in flexcompute website. Defaults to "default".
@@ -122,12 +155,79 @@ def CSAC_t3d_write_params(
         plot_mode_index: which mode index to plot. Defaults to 0.
         plot_mode_port_name: which port name to plot. Defaults to None.
         plot_epsilon: whether to plot epsilon. Defaults to False.
-        filepath: Optional file path for the S-parameters. If None, uses hash of simulation.
+        filepath: Optional file path for the S-parameters. If None, uses the cache key.
         overwrite: Whether to overwrite existing S-parameters. Defaults to False.
+        store: Optional S-parameter store. Results are looked up in and saved to it,
+            catalogued by component name, settings, layer stack and simulation settings.
+        batch: Optional batch manager. If run is False, the simulations are added to it
+            instead of being uploaded one at a time; batch.run() submits them all,
+            then assembles the S-parameters and saves them like a run would.
         kwargs: Additional keyword arguments for the tidy3d Simulation constructor.
 
     """
     layer_stack = layer_stack or get_layer_stack()
+    if symmetry == "auto":
+        symmetry = detect_symmetry(
+            component,
+            layer_stack,
+            polarization=mode_spec.filter_pol,
+            center_z=center_z,
+            num_modes=mode_spec.num_modes,
+        ).symmetry
+
+    # The cache key hashes the geometry, layer stack and simulation arguments,
+    # so cached results are found without extruding the component into tidy3d.
+    simulation = dict(
+        material_mapping=material_mapping,
+        extend_ports=extend_ports,
+        port_offset=port_offset,
+        pad_xy_inner=pad_xy_inner,
+        pad_xy_outer=pad_xy_outer,
+        pad_z_inner=pad_z_inner,
+        pad_z_outer=pad_z_outer,
+        dilation=dilation,
+        wavelength=wavelength,
+        bandwidth=bandwidth,
+        num_freqs=num_freqs,
+        min_steps_per_wvl=min_steps_per_wvl,
+        center_z=center_z,
+        sim_size_z=sim_size_z,
+        port_size_mult=port_size_mult,
+        run_only=run_only,
+        element_mappings=element_mappings,
+        extra_monitors=extra_monitors,
+        mode_spec=mode_spec,
+        boundary_spec=boundary_spec,
+        symmetry=symmetry,
+        run_time=run_time,
+        shutoff=shutoff,
+        **kwargs,
+    )
+    cache_key = simulation_key(component, layer_stack, simulation)
+    store_key = dict(
+        cell=component.name,
+        settings=component.settings.model_dump(),
+        layer_stack=layer_stack_hash(layer_stack),
+        simulation=dict(key=cache_key),
+    )
+    dirpath = pathlib.Path(dirpath)
+    filepath = pathlib.Path(filepath or dirpath / f"{cache_key}.npz")
+    if filepath.suffix != ".npz":
+        filepath = filepath.with_suffix(".npz")
+
+    plot = (
+        plot_simulation_layer_name
+        or plot_simulation_z
+        or plot_simulation_x
+        or (plot_mode_index is not None and plot_mode_port_name)
+    )
+    if not plot and not overwrite:
+        if store is not None and (stored := store.get(**store_key)) is not None:
+            print(f"Simulation loaded from {store.dirpath!r}")
+            return stored
+        if filepath.exists():
+            print(f"Simulation loaded from {filepath!r}")
+            return dict(np.load(filepath))
 
     c = gft3d.Tidy3DComponent(
         component=component,
@@ -214,43 +314,41 @@ def CSAC_t3d_write_params(
         plt.show()
         return sp
 
-    dirpath = pathlib.Path(dirpath)
     dirpath.mkdir(parents=True, exist_ok=True)
-    filepath = filepath or dirpath / f"{modeler._hash_self()}.npz"
-    filepath = pathlib.Path(filepath)
-    if filepath.suffix != ".npz":
-        filepath = filepath.with_suffix(".npz")
-
-    if filepath.exists() and not overwrite:
-        print(f"Simulation loaded from {filepath!r}")
-        return dict(np.load(filepath))
-    else:
-        time.sleep(0.2)
-        if run: 
-            s = modeler.run()
-            for port_in in s.port_in.values:
-                for port_out in s.port_out.values:
-                    for mode_index_in in s.mode_index_in.values:
-                        for mode_index_out in s.mode_index_out.values:
-                            sp[f"{port_in}@{mode_index_in},{port_out}@{mode_index_out}"] = (
-                                s.sel(
-                                    port_in=port_in,
-                                    port_out=port_out,
-                                    mode_index_in=mode_index_in,
-                                    mode_index_out=mode_index_out,
-                                ).values
-                            )
-
-            frequency = s.f.values
-            sp["wavelengths"] = td.constants.C_0 / frequency
-            np.savez_compressed(filepath, **sp)
-            print(f"Simulation saved to {filepath!r}")
-            return sp
-        else: ## Don't run: instead save the created simulation
-            for key, value in modeler.sim_dict.items():
-                upload(value, folder_name = folder_name, task_name = key)
-            return
-        
+    time.sleep(0.2)
+    def save(sp: dict[str, np.ndarray]) -> None:
+        np.savez_compressed(filepath, **sp)
+        print(f"Simulation saved to {filepath!r}")
+        if store is not None:
+            store.put(sp=sp, **store_key)
+
+    if run: 
+        sp = _sparameters(modeler.run())
+        save(sp)
+        return sp
+    elif batch is not None:
+        task_names = {}
+        for key, value in modeler.sim_dict.items():
+            job = batch.add(f"{cache_key[:16]}_{key}", value, folder_name=folder_name)
+            task_names[job.name] = key
+
+        def collect(paths: dict[str, pathlib.Path]) -> None:
+            # the modeler reads the data of each task by its task name.
+            # _internal_construct_smatrix is gone in tidy3d 2.10, which is
+            # why pyproject.toml pins tidy3d below it.
+            batch_data = {
+                task_names[name]: td.SimulationData.from_file(str(path))
+                for name, path in paths.items()
+            }
+            save(_sparameters(modeler._internal_construct_smatrix(batch_data)))
+
+        batch.collect(list(task_names), collect)
+        return
+    else: ## Don't run: instead save the created simulation
+        for key, value in modeler.sim_dict.items():
+            upload(value, folder_name = folder_name, task_name = key)
+        return
+    
 
 # class Waveguide(BaseModel, extra="forbid"):
 #     """Waveguide Model.
@@ -3,7 +3,6 @@
 from collections.abc import Callable
 from functools import partial, wraps
 from typing import Any
-from gdsfactory.technology import lyp_to_dataclass
 
 import gdsfactory as gf
 from doroutes.bundles import add_bundle_astar
@@ -17,18 +16,17 @@ from gdsfactory.technology import (
     LayerLevel,
     LayerMap,
     LayerStack,
-    LayerViews,
     LogicalLayer,
 )
 from gdsfactory.typings import (
     ConnectivitySpec,
-    Floats,
     Layer,
     LayerSpec,
-    LayerSpecs,
 )
 
 from csac_sin_pdk.sin300.cband.config import PATH
+from csac_sin_pdk.sin300.cband.routing.astar import add_bundle_astar_multires
+from csac_sin_pdk.sin300.cband.routing.fanout import add_fanout_metal
 
 nm = 1e-3
 
@@ -45,6 +43,7 @@ class LayerMapFab(LayerMap):
     labels: Layer = (100, 0)
     oxide_window: Layer = (22, 0)
     PADDING: Layer = (980, 0)
+    DRC_MARKER: Layer = (990, 0)
 
 
 LAYER = LayerMapFab
@@ -114,6 +113,23 @@ class Tech:
 
     gap_strip = 0.27
 
+    spacing_doe = 20
+
+    # design rules: provisional placeholders, not from a foundry rule deck.
+    # Only min_spacing_wg follows the PDK (the strip coupler gap). Replace
+    # them with the foundry values once they are available.
+    min_width_wg = 0.25
+    min_spacing_wg = gap_strip
+    min_radius_wg = 20
+    min_width_heater = 2.0
+    min_spacing_heater = 5.0
+    min_width_pad = 5.0
+    min_spacing_pad = 10
+    min_enclosure_pad_heater = 2.0
+
+    # propagation loss per cross-section in dB/cm, for loss budgets
+    loss_dB_cm = {"strip": 0.5, "strip_heater_metal": 0.5}
+
 
 TECH = Tech()
 
@@ -247,6 +263,38 @@ route_astar_metal = partial(
     spacing=15,
 )
 
+route_astar_multires = partial(
+    add_bundle_astar_multires,
+    layers=["WG"],
+    bend="bend_euler",
+    straight="straight",
+    grid_unit=2500,
+    spacing=3,
+)
+
+route_astar_metal_multires = partial(
+    add_bundle_astar_multires,
+    layers=["PAD"],
+    bend="wire_corner",
+    straight="straight_metal",
+    grid_unit=2500,
+    spacing=15,
+)
+
+
+route_fanout_metal = partial(
+    add_fanout_metal,
+    bend="bend_metal",
+    straight="straight_metal",
+    spacing=10,
+)
+
+route_fanout_metal_corner = partial(
+    add_fanout_metal,
+    bend="wire_corner",
+    straight="straight_metal",
+    spacing=10,
+)
 
 routing_strategies = dict(
     route_bundle=route_bundle,
@@ -254,6 +302,10 @@ routing_strategies = dict(
     route_bundle_metal_corner=route_bundle_metal_corner,
     route_astar=route_astar,
     route_astar_metal=route_astar_metal,
+    route_astar_multires=route_astar_multires,
+    route_astar_metal_multires=route_astar_metal_multires,
+    route_fanout_metal=route_fanout_metal,
+    route_fanout_metal_corner=route_fanout_metal_corner,
 )
 
 if __name__ == "__main__":
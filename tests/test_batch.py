@@ -0,0 +1,126 @@
+"""Test batch submission against the local mock backend."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from csac_sin_pdk.sin300.cband import PDK
+from csac_sin_pdk.sin300.cband.simulation_tools.batch import BatchManager, MockBackend
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def solve(payload: dict) -> dict[str, np.ndarray]:
+    """Returns a transmission of 1 / length, failing for negative lengths."""
+    if payload["length"] < 0:
+        raise ValueError("negative length")
+    return {"o1@0,o2@0": np.array([1 / payload["length"]])}
+
+
+class FlakyBackend(MockBackend):
+    """Mock backend whose first status poll fails."""
+
+    def __init__(self) -> None:
+        """Create a backend failing once."""
+        super().__init__(solve)
+        self.failures = 1
+
+    def status(self, task_id: str) -> str:
+        """Raises on the first poll, then returns the mock status."""
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("timed out")
+        return super().status(task_id)
+
+
+def test_batch_runs_concurrently(tmp_path) -> None:
+    """Jobs run concurrently and failed ones are not downloaded."""
+    backend = MockBackend(solve, delay=0.05)
+    batch = BatchManager(backend, tmp_path / "journal.jsonl", poll_interval=0.01)
+    for length in (1, 2, 4, -1):
+        batch.add(f"length_{length}", {"length": length})
+    jobs = batch.run(timeout=10)
+
+    assert jobs["length_-1"].status == "error"
+    assert backend.submitted == 4
+    assert backend.downloaded == 3
+    sp = np.load(jobs["length_4"].path)
+    np.testing.assert_allclose(sp["o1@0,o2@0"], 0.25)
+
+
+def test_batch_resumes_from_journal(tmp_path) -> None:
+    """A new manager resumes submitted jobs without resubmitting them."""
+    backend = MockBackend(solve, delay=0.05)
+    journal = tmp_path / "journal.jsonl"
+    batch = BatchManager(backend, journal, poll_interval=0.01)
+    for length in (1, 2):
+        batch.add(f"length_{length}", {"length": length})
+    asyncio.run(batch.submit())  # interrupted before any poll
+
+    resumed = BatchManager(backend, journal, poll_interval=0.01)
+    assert [job.status for job in resumed.jobs.values()] == ["submitted"] * 2
+    jobs = resumed.run(timeout=10)
+    assert all(job.status == "downloaded" for job in jobs.values())
+    assert backend.submitted == 2
+
+    again = BatchManager(backend, journal, poll_interval=0.01)
+    again.add("length_1", {"length": 1})
+    again.run(timeout=10)
+    assert (backend.submitted, backend.downloaded) == (2, 2)
+
+
+def test_batch_retries_failed_polls(tmp_path) -> None:
+    """A failed poll is journaled and the job is polled again."""
+    journal = tmp_path / "journal.jsonl"
+    batch = BatchManager(FlakyBackend(), journal, poll_interval=0.01)
+    batch.add("length_1", {"length": 1})
+    jobs = batch.run(timeout=10)
+    assert jobs["length_1"].status == "downloaded"
+    assert jobs["length_1"].error is None
+    records = [json.loads(line) for line in journal.read_text().splitlines()]
+    error = "ConnectionError('timed out')"
+    assert records[2] == {**records[1], "error": error, "poll_errors": 1}
+
+
+def test_batch_gives_up_on_failing_polls(tmp_path) -> None:
+    """A job whose polls keep failing is marked as an error."""
+    journal = tmp_path / "journal.jsonl"
+    batch = BatchManager(MockBackend(solve), journal, poll_interval=0.01)
+    batch.add("length_1", {"length": 1})
+    asyncio.run(batch.submit())
+
+    # a new backend does not know the task ids of the journal
+    resumed = BatchManager(
+        MockBackend(solve), journal, poll_interval=0.01, max_poll_errors=3
+    )
+    jobs = resumed.run()
+    assert jobs["length_1"].status == "error"
+    assert jobs["length_1"].poll_errors == 3
+    assert jobs["length_1"].error.startswith("KeyError")
+
+
+def test_batch_collects_downloaded_groups(tmp_path) -> None:
+    """Collectors get the result paths once their whole group is downloaded."""
+    journal = tmp_path / "journal.jsonl"
+    batch = BatchManager(MockBackend(solve), journal, poll_interval=0.01)
+    for length in (1, 2, -1):
+        batch.add(f"length_{length}", {"length": length})
+    collected = []
+    batch.collect(["length_1", "length_2"], collected.append)
+    batch.collect(["length_1", "length_-1"], collected.append)
+    with pytest.raises(ValueError):
+        batch.collect(["length_3"], collected.append)
+    batch.run(timeout=10)
+
+    [paths] = collected
+    assert sorted(paths) == ["length_1", "length_2"]
+    sp = np.load(paths["length_2"])
+    np.testing.assert_allclose(sp["o1@0,o2@0"], 0.5)
@@ -0,0 +1,95 @@
+"""Test the hierarchical circuit simulation."""
+
+from __future__ import annotations
+
+import gdsfactory as gf
+import gplugins.sax.models as sm
+import numpy as np
+import pytest
+import sax
+
+from csac_sin_pdk.sin300.cband import PDK
+from csac_sin_pdk.sin300.cband.circuit import SMatrixCache, simulate_hierarchical
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def straight(wl: float = 1.55, length: float = 10.0) -> sax.SDict:
+    """Lossy straight."""
+    return sm.straight(wl=wl, length=length, neff=2.38, ng=4.3, loss_dB_cm=3.0)
+
+
+def coupler_ring(wl: float = 1.55, length_x: float = 4.0) -> sax.SDict:
+    """Weak ring coupler."""
+    return sm.coupler(wl=wl, length=length_x, coupling0=0.05)
+
+
+models = {"straight": straight, "bend_euler": straight, "coupler_ring": coupler_ring}
+
+
+@gf.cell
+def chain(component: gf.typings.ComponentSpec, copies: int) -> gf.Component:
+    """Returns copies of a two-port component connected in series."""
+    c = gf.Component()
+    refs = [c << gf.get_component(component) for _ in range(copies)]
+    for prev, ref in zip(refs, refs[1:]):
+        ref.connect("o1", prev.ports["o2"])
+    c.add_port("o1", port=refs[0].ports["o1"])
+    c.add_port("o2", port=refs[-1].ports["o2"])
+    return c
+
+
+def test_simulate_hierarchical() -> None:
+    """Repeated blocks are cached and the result matches a flat circuit."""
+    ring = gf.get_component("ring_single", length_x=3)
+    c = chain(chain(ring, copies=3), copies=2)
+    wl = np.linspace(1.54, 1.56, 21)
+    cache = SMatrixCache()
+    s = simulate_hierarchical(c, wl=wl, models=models, cache=cache)
+    # 4 unique leaves (two straights, a bend, a coupler), ring, chain and top;
+    # the second bend and short straight of the ring are hits
+    assert (cache.hits, cache.misses) == (2, 7)
+
+    circuit, _ = sax.circuit(c.get_netlist(recursive=True), models=models)
+    expected = circuit(wl=wl)
+    np.testing.assert_allclose(s["o1", "o2"], expected["o1", "o2"], atol=1e-12)
+
+    simulate_hierarchical(c, wl=wl, models=models, cache=cache)
+    assert cache.misses == 7
+    simulate_hierarchical(c, wl=wl[:5], models=models, cache=cache)
+    assert cache.misses == 14
+
+
+def test_simulate_hierarchical_pdk_models() -> None:
+    """Without explicit models, the PDK models are used."""
+    c = chain(gf.get_component("ring_single", length_x=3), copies=2)
+    wl = np.linspace(1.54, 1.56, 11)
+    s = simulate_hierarchical(c, wl=wl, cache=SMatrixCache())
+
+    circuit, _ = sax.circuit(c.get_netlist(recursive=True), models=PDK.models)
+    expected = circuit(wl=wl)
+    np.testing.assert_allclose(s["o1", "o2"], expected["o1", "o2"], atol=1e-12)
+    assert np.all(np.abs(s["o1", "o2"]) <= 1)
+
+
+def test_simulate_hierarchical_keys_models() -> None:
+    """Other models are not served the S-matrices of earlier models."""
+    c = chain(gf.get_component("ring_single", length_x=3), copies=2)
+    wl = np.linspace(1.54, 1.56, 11)
+    cache = SMatrixCache()
+    s = simulate_hierarchical(c, wl=wl, models=models, cache=cache)
+
+    def lossy(wl: float = 1.55, length: float = 10.0) -> sax.SDict:
+        """Straight with a high loss."""
+        return sm.straight(wl=wl, length=length, neff=2.38, ng=4.3, loss_dB_cm=300.0)
+
+    other = {**models, "bend_euler": lossy}
+    lossy_s = simulate_hierarchical(c, wl=wl, models=other, cache=cache)
+    circuit, _ = sax.circuit(c.get_netlist(recursive=True), models=other)
+    expected = circuit(wl=wl)
+    np.testing.assert_allclose(lossy_s["o1", "o2"], expected["o1", "o2"], atol=1e-12)
+    assert not np.allclose(lossy_s["o1", "o2"], s["o1", "o2"])
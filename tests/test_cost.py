@@ -0,0 +1,49 @@
+"""Test the simulation cost estimator."""
+
+from __future__ import annotations
+
+import gdsfactory as gf
+import pytest
+
+from csac_sin_pdk.sin300.cband import PDK, cells
+from csac_sin_pdk.sin300.cband.simulation_tools.cost import (
+    estimate_cost,
+    estimate_sweep,
+)
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def test_estimate_cost_scales_with_domain_and_symmetry() -> None:
+    """Cells follow the domain, grid and symmetry, credits the run time."""
+    straight = gf.get_component("straight")
+    full = estimate_cost(straight, symmetry=(0, 0, 0))
+    half = estimate_cost(straight, symmetry=(0, -1, 0))
+    assert half.cells == full.cells // 2
+    assert estimate_cost(straight).cells == half.cells
+    assert estimate_cost(straight, num_modes=2).cells == full.cells
+    assert full.simulations == 2
+    pml = 2 * 12 * 1.45 / (1.44 * 30)
+    assert full.size[0] == pytest.approx(10 + 2 * (0.5 + 2) + pml)
+    assert full.size[2] == pytest.approx(4 + pml)
+
+    finer = estimate_cost(straight, min_steps_per_wvl=60, symmetry=(0, 0, 0))
+    assert finer.cells > 6 * full.cells
+    assert finer.time_steps == pytest.approx(2 * full.time_steps, rel=0.01)
+    longer = estimate_cost(straight, run_time=2e-12, symmetry=(0, 0, 0))
+    assert longer.credits == pytest.approx(2 * full.credits, rel=0.01)
+
+
+def test_estimate_sweep_flags_outliers() -> None:
+    """Expensive or memory-hungry combinations are outliers."""
+    combinations = [{"length": length} for length in (10, 20, 30, 400)]
+    sweep = estimate_sweep(cells.coupler, combinations)
+    assert [cost.name for cost in sweep.outliers] == ["coupler_L400_G0p27"]
+    assert sweep.credits == pytest.approx(sum(c.credits for c in sweep.costs))
+
+    limited = estimate_sweep(cells.coupler, combinations[:2], max_memory_GB=0.0)
+    assert len(limited.outliers) == 2
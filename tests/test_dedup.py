@@ -0,0 +1,109 @@
+"""Test geometry deduplication."""
+
+from __future__ import annotations
+
+import gdsfactory as gf
+import pytest
+
+from csac_sin_pdk.sin300.cband import PDK, cells
+from csac_sin_pdk.sin300.cband.cells.csac_euler import (
+    SiN300nm_1550nm_TE_CSAC_Euler_bend,
+)
+from csac_sin_pdk.sin300.cband.dedup import dedup, find_duplicates, write_gds_dedup
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def two_equal_bends(radius: float = 40) -> gf.Component:
+    """Returns a component with the same bend from two different factories."""
+    c = gf.Component()
+    c << cells.bend_euler(radius=radius, p=1)
+    ref = c << SiN300nm_1550nm_TE_CSAC_Euler_bend(radius=radius, p=1)
+    ref.dmovex(100)
+    return c
+
+
+def test_find_duplicates() -> None:
+    """Euler bends from two factories are detected as duplicates."""
+    duplicates = find_duplicates(two_equal_bends())
+    assert len(duplicates) == 1
+    [aliases] = duplicates.values()
+    assert aliases[0].startswith("SiN300nm_1550nm_TE_CSAC_Euler_bend")
+
+
+def test_different_geometry_is_kept() -> None:
+    """Bends with different radii are not merged."""
+    c = gf.Component()
+    c << cells.bend_euler(radius=40)
+    c << cells.bend_euler(radius=50)
+    assert find_duplicates(c) == {}
+
+
+def box_with_port(port_name: str) -> gf.Component:
+    """Returns a new cell with the same box and a port of the given name."""
+    c = gf.Component()
+    c.add_polygon([(0, 0), (10, 0), (10, 1), (0, 1)], layer=(1, 0))
+    c.add_port(port_name, center=(10, 0.5), width=1, orientation=0, layer=(1, 0))
+    return c
+
+
+def test_different_ports_are_kept(tmp_path) -> None:
+    """Cells with the same polygons but different ports are not merged."""
+    c = gf.Component()
+    c << box_with_port("o1")
+    ref = c << box_with_port("o2")
+    ref.dmovey(10)
+    assert find_duplicates(c) == {}
+    assert find_duplicates(c, include_ports=False) != {}
+    assert write_gds_dedup(c, tmp_path / "dedup.gds")[1].cells_removed == 0
+    assert dedup(c).cells_removed == 0
+
+
+def test_write_gds_dedup(tmp_path) -> None:
+    """Writing a deduplicated copy leaves the component untouched."""
+    c = two_equal_bends()
+    n_cells = len(c.called_cells())
+    gdspath, report = write_gds_dedup(c, tmp_path / "dedup.gds")
+    assert gdspath.exists()
+    assert report.cells_removed == 1
+    assert len(c.called_cells()) == n_cells
+
+
+def test_dedup_in_place() -> None:
+    """Dedup in place rewires both instances to the same cell."""
+    # bends no other component of the session instantiates
+    c = two_equal_bends(radius=41.5)
+    bbox = c.dbbox()
+    report = dedup(c)
+    assert report.cells_removed == 1
+    assert report.vertices_removed > 0
+    assert len({inst.cell.name for inst in c.insts}) == 1
+    assert c.dbbox() == bbox
+
+
+def test_dedup_leaves_shared_cells() -> None:
+    """Cells shared with a sibling component are neither rewired nor deleted."""
+    bends = two_equal_bends(radius=42.5)
+    c = gf.Component()
+    c << bends
+    sibling = gf.Component()
+    sibling << bends
+    names = {inst.cell.name for inst in bends.insts}
+    netlist = sibling.get_netlist(recursive=True)
+
+    report = dedup(c)
+    assert (report.cells_removed, report.aliases) == (0, {})
+    assert {inst.cell.name for inst in bends.insts} == names
+    assert sibling.get_netlist(recursive=True) == netlist
+
+    ref = c << SiN300nm_1550nm_TE_CSAC_Euler_bend(radius=42.5, p=1)
+    ref.dmovey(200)
+    report = dedup(c)
+    assert report.cells_removed == 0
+    assert len(report.aliases) == 1
+    assert ref.cell.name == cells.bend_euler(radius=42.5, p=1).name
+    assert {inst.cell.name for inst in bends.insts} == names
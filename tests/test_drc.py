@@ -0,0 +1,91 @@
+"""Test the tiled design-rule checks."""
+
+from __future__ import annotations
+
+import json
+
+import gdsfactory as gf
+import pytest
+
+from csac_sin_pdk.sin300.cband import PDK
+from csac_sin_pdk.sin300.cband.drc import DrcCache, run_drc
+from csac_sin_pdk.sin300.cband.tech import LAYER
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def violating() -> gf.Component:
+    """Returns a component with one violation of each rule."""
+    c = gf.Component()
+    c.add_polygon([(0, 0), (10, 0), (10, 0.2), (0, 0.2)], layer=LAYER.WG)
+    c.add_polygon([(0, 5), (10, 5), (10, 6), (0, 6)], layer=LAYER.WG)
+    c.add_polygon([(0, 6.1), (10, 6.1), (10, 7.1), (0, 7.1)], layer=LAYER.WG)
+    c.add_polygon([(50, 0), (80, 0), (80, 30), (50, 30)], layer=LAYER.PAD)
+    c.add_polygon([(51, 10), (70, 10), (70, 20), (51, 20)], layer=LAYER.HEATER)
+    bend = c << gf.get_component(
+        "bend_euler", radius=10, allow_min_radius_violation=True
+    )
+    bend.move((100, 0))
+    return c
+
+
+def test_violations_are_found() -> None:
+    """Each rule of the deck flags its violation."""
+    report = run_drc(violating(), tile_size=5.0)
+    counts = {name: e.count() for name, e in report.violations.items()}
+    assert counts == {"WG.W.1": 1, "WG.S.1": 1, "WG.R.1": 1, "PAD.EN.1": 1}
+    assert report.tiles > 1
+
+
+def test_clean_ring() -> None:
+    """A PDK ring passes every rule."""
+    report = run_drc(gf.get_component("ring_single"), tile_size=20.0)
+    assert report.num_violations == 0, report.summary()
+
+
+def test_clean_metal_cells() -> None:
+    """Every PDK cell with heater or pad metal passes every rule."""
+    checked = {}
+    for name in sorted(PDK.cells):
+        try:
+            c = gf.get_component(name)
+        except TypeError:  # helpers that need arguments
+            continue
+        if c.bbox(LAYER.PAD).empty() and c.bbox(LAYER.HEATER).empty():
+            continue
+        checked[name] = run_drc(c).num_violations
+    assert "wire_corner45" in checked
+    assert all(count == 0 for count in checked.values()), checked
+
+
+def test_cache_rechecks_changed_tiles(tmp_path) -> None:
+    """Only tiles touched by a change are checked again."""
+    c = violating()
+    cache = DrcCache(tmp_path / "drc.json")
+    first = run_drc(c, tile_size=20.0, cache=cache)
+    assert first.cached_tiles == 0
+
+    second = run_drc(c, tile_size=20.0, cache=DrcCache(tmp_path / "drc.json"))
+    assert second.cached_tiles == second.tiles
+    assert second.summary()["rules"] == first.summary()["rules"]
+
+    c.add_polygon([(0, 2), (10, 2), (10, 2.1), (0, 2.1)], layer=LAYER.WG)
+    third = run_drc(c, tile_size=20.0, cache=cache)
+    assert 0 < third.cached_tiles < third.tiles
+    assert third.violations["WG.W.1"].count() == 2
+
+
+def test_report_outputs(tmp_path) -> None:
+    """The JSON summary and the marker cell match the report."""
+    c = violating()
+    report = run_drc(c)
+    summary = json.loads(report.write_json(tmp_path / "drc.json").read_text())
+    assert summary["violations"] == report.num_violations
+    assert len(summary["rules"]["WG.S.1"]["boxes"]) == 1
+    markers = report.markers(c)
+    assert not markers.bbox(LAYER.DRC_MARKER).empty()
+    assert c.bbox(LAYER.DRC_MARKER).empty()
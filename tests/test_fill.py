@@ -0,0 +1,50 @@
+"""Test the density map and the fill generator."""
+
+from __future__ import annotations
+
+import gdsfactory as gf
+import numpy as np
+import pytest
+from kfactory import kdb
+
+from csac_sin_pdk.sin300.cband import PDK
+from csac_sin_pdk.sin300.cband.fill import add_fill, density_map
+from csac_sin_pdk.sin300.cband.tech import LAYER
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def test_density_map() -> None:
+    """Tile densities count the merged layers of each tile."""
+    c = gf.Component()
+    c.add_polygon([(0, 0), (50, 0), (50, 100), (0, 100)], layer=LAYER.WG)
+    c.add_polygon([(25, 0), (100, 0), (100, 10), (25, 10)], layer=LAYER.PAD)
+    c.add_polygon([(150, 150), (200, 150), (200, 200), (150, 200)], layer=LAYER.WG)
+    m = density_map(c, tile_size=100)
+    np.testing.assert_allclose(m.density, [[0.55, 0], [0, 0.25]])
+    assert m.at(160, 190) == 0.25
+    assert m.tile_box(1, 0) == (0, 100, 100, 200)
+    assert m.below(0.1).tolist() == [[0, 1], [1, 0]]
+    with pytest.raises(ValueError):
+        m.at(-1, 0)
+
+
+def test_add_fill() -> None:
+    """Fill reaches the target density, clear of the waveguides, as instance arrays."""
+    c = gf.Component()
+    c.add_polygon([(0, 0), (200, 0), (200, 1), (0, 1)], layer=LAYER.WG)
+    c.add_polygon([(0, 199), (200, 199), (200, 200), (0, 200)], layer=LAYER.WG)
+    after = add_fill(c, target=0.2, tile_size=100, clearance=3)
+    assert after.density.min() >= 0.2
+    assert after.density.max() < 0.25
+
+    fill = kdb.Region(c.begin_shapes_rec(gf.get_layer(LAYER.PADDING)))
+    wg = kdb.Region(c.begin_shapes_rec(gf.get_layer(LAYER.WG)))
+    assert fill.separation_check(wg, 3000).is_empty()
+    instances = list(c.kdb_cell.each_inst())
+    assert len(instances) < fill.count() / 5
+    assert all(inst.is_regular_array() for inst in instances)
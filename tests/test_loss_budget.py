@@ -0,0 +1,76 @@
+"""Test the layout-derived loss budget."""
+
+from __future__ import annotations
+
+from functools import partial
+
+import gdsfactory as gf
+import numpy as np
+import pytest
+
+from csac_sin_pdk.sin300.cband import PDK, models
+from csac_sin_pdk.sin300.cband.loss_budget import loss_budget
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def test_loss_budget_cutbacks() -> None:
+    """Grating pairs of the cutbacks differ by the waveguide loss."""
+    c = gf.get_component("cutback_ridge_assembled")
+    budget = loss_budget(c, rates={"strip": 2.0})
+    assert budget.terminals == 8
+    losses = sorted(loss for _, _, loss in budget.pairs())
+    expected = [12 + length * 2e-4 for length in c.info["lengths"]]
+    np.testing.assert_allclose(losses, expected)
+    assert len(budget.pairs(max_loss_dB=12.5)) == 2
+
+
+def test_loss_budget_ports() -> None:
+    """Cells without gratings are reduced to their own ports."""
+    c = gf.get_component("cutback")
+    budget = loss_budget(c, rates={"strip": 1.0})
+    assert budget.ports == ["o1", "o2"]
+    assert budget.loss_dB[0, 1] == pytest.approx(c.info["length"] * 1e-4)
+
+    with pytest.raises(ValueError, match="propagation loss"):
+        loss_budget(c, rates={"rib": 1.0})
+
+
+def test_loss_budget_device_models() -> None:
+    """PDK MMIs use their model loss_dB and gratings the model loss."""
+    c = gf.Component()
+    mmi = c << gf.get_component("SiN300nm_1550nm_TE_STRIP_2x1_MMI")
+    c.add_ports(mmi.ports)
+    budget = loss_budget(c, rates={"strip": 0.0})
+    assert budget.ports == ["o1", "o2", "o3"]
+    assert budget.terminals == 0
+    assert budget.loss_dB[0, 1] == pytest.approx(0.3)
+    assert budget.loss_dB[1, 2] == np.inf
+
+    c = gf.get_component("cutback_ridge_assembled")
+    grating = partial(models.grating_coupler_elliptical, loss=4)
+    budget = loss_budget(
+        c,
+        rates={"strip": 2.0},
+        models={**PDK.models, "SiN300nm_1550nm_TE_STRIP_Grating": grating},
+    )
+    losses = sorted(loss for _, _, loss in budget.pairs())
+    expected = [8 + length * 2e-4 for length in c.info["lengths"]]
+    np.testing.assert_allclose(losses, expected)
+
+
+def test_loss_budget_coupled_ports() -> None:
+    """Device losses only connect the port pairs their model couples."""
+    c = gf.Component()
+    mmi = c << gf.get_component("SiN300nm_1550nm_TE_STRIP_2x2_MMI")
+    c.add_ports(mmi.ports)
+    budget = loss_budget(c, rates={"strip": 0.0})
+    assert budget.ports == ["o1", "o2", "o3", "o4"]
+    inputs, outputs = budget.loss_dB[:2, :2], budget.loss_dB[2:, 2:]
+    for same_side in (inputs, outputs):
+        np.testing.assert_array_equal(same_side, [[0, np.inf], [np.inf, 0]])
+    np.testing.assert_allclose(budget.loss_dB[:2, 2:], 0.3)
@@ -0,0 +1,35 @@
+"""Test the analytic length bookkeeping of the loss structures."""
+
+from __future__ import annotations
+
+import pytest
+
+from csac_sin_pdk.sin300.cband import PDK, cells
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def test_cutback_length() -> None:
+    """Cutback length is the rows plus the U-turns."""
+    rows, length, spacing = 4, 500.0, 60.0
+    c = cells.cutback(rows=rows, length=length, spacing=spacing)
+    bend = cells.bend_euler()
+    u_turn = 2 * bend.info["length"] + spacing - 2 * 30
+    assert c.info["num_bends"] == 2 * (rows - 1)
+    assert c.info["length"] == pytest.approx(rows * length + (rows - 1) * u_turn, abs=1e-3)
+    assert c.info["route_info_strip_length"] == pytest.approx(c.info["length"], abs=1e-3)
+
+
+def test_spiral_bends_are_shared() -> None:
+    """All bends of a spiral reference one cell."""
+    c = cells.spiral(num_loops=2)
+    bends = {inst.cell.name for inst in c.insts if inst.cell.name.startswith("bend")}
+    assert len(bends) == 1
+    assert c.info["num_bends"] == 2 + 2 * 4 * 2
+    assert c.info["length"] == pytest.approx(
+        c.info["length_straight"] + c.info["length_bend"]
+    )
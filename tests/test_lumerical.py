@@ -0,0 +1,133 @@
+"""Test the incremental Lumerical sweep inputs."""
+
+from __future__ import annotations
+
+import csv
+import json
+from functools import partial
+
+import gdsfactory as gf
+import numpy as np
+import pytest
+from scipy.io import loadmat
+
+from csac_sin_pdk.sin300.cband import PDK
+from csac_sin_pdk.sin300.cband.simulation_tools.lumerical_backend import (
+    MANIFEST,
+    SWEEP_TABLE,
+    gen_lum_sim_inputs,
+    looped_layout_script,
+    write_sweep_table,
+)
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def sweep(tmp_path, **kwargs) -> list[dict]:
+    """Writes the inputs of a straight sweep to tmp_path."""
+    kwargs.setdefault("parameters_swept", {"length": [10, 20]})
+    return gen_lum_sim_inputs(
+        cell=partial(gf.get_component, "straight"),
+        output=tmp_path,
+        max_workers=1,
+        **kwargs,
+    )
+
+
+def test_unchanged_combinations_are_skipped(tmp_path) -> None:
+    """A second run writes nothing, changed or deleted outputs are rewritten."""
+    records = sweep(tmp_path)
+    assert [record["written"] for record in records] == [True, True]
+    [folder] = tmp_path.glob("*_length")
+    gds = {record["name"]: folder / f"{record['name']}.gds" for record in records}
+    mtimes = {name: path.stat().st_mtime_ns for name, path in gds.items()}
+
+    records = sweep(tmp_path)
+    assert [record["written"] for record in records] == [False, False]
+    assert {name: path.stat().st_mtime_ns for name, path in gds.items()} == mtimes
+
+    records = sweep(tmp_path, parameters_swept={"length": [10, 30]})
+    assert [record["written"] for record in records] == [False, True]
+
+    gds["length_1"].unlink()
+    records = sweep(tmp_path, parameters_swept={"length": [10, 30]})
+    assert [record["written"] for record in records] == [True, False]
+    assert gds["length_1"].exists()
+
+
+def test_manifest_keeps_other_sweeps(tmp_path) -> None:
+    """A sampled sweep in the folder of a product sweep keeps both hashes."""
+    product = sweep(tmp_path)
+    sampled = sweep(
+        tmp_path, parameters_swept={"length": (10, 20)}, mode="lhs", samples=2, seed=0
+    )
+    [folder] = tmp_path.glob("*_length")
+    manifest = json.loads((folder / MANIFEST).read_text())
+    assert manifest == {record["name"]: record["hash"] for record in product + sampled}
+    assert sorted(manifest) == ["length_1", "length_2", "sample_1", "sample_2"]
+
+    records = sweep(tmp_path)
+    assert [record["written"] for record in records] == [False, False]
+
+
+def test_sweep_table_round_trip(tmp_path) -> None:
+    """The MAT and CSV tables hold NaN-padded ports and the GDS names."""
+    records = [
+        {
+            "name": "length_1",
+            "values": {"length": 10},
+            "bbox": [[0.0, -1.0], [10.0, 1.0]],
+            "span": [25.0, 7.0],
+            "ports": [
+                {"name": "o1", "x": 0.0, "y": 0.0, "width": 0.5, "orientation": 180},
+                {"name": "o2", "x": 10.0, "y": 0.0, "width": 0.5, "orientation": 0},
+            ],
+        },
+        {
+            "name": "length_2",
+            "values": {"length": 20},
+            "bbox": [[0.0, -1.0], [20.0, 1.0]],
+            "span": [45.0, 7.0],
+            "ports": [
+                {"name": "o1", "x": 0.0, "y": 1.0, "width": 1.0, "orientation": 90},
+            ],
+        },
+    ]
+    write_sweep_table(str(tmp_path), {"length": [10, 20]}, records, xmargin_left=3)
+
+    table = loadmat(tmp_path / f"{SWEEP_TABLE}.mat", squeeze_me=True)
+    assert list(table["gds"]) == ["length_1.gds", "length_2.gds"]
+    assert list(table["name"]) == ["length_1", "length_2"]
+    np.testing.assert_array_equal(table["n_ports"], [2, 1])
+    np.testing.assert_array_equal(table["length"], [10, 20])
+    np.testing.assert_allclose(table["x_min"], [-3e-6, -3e-6])
+    np.testing.assert_allclose(table["x_span"], [25e-6, 45e-6])
+    np.testing.assert_allclose(table["port_x"], [[0, 10e-6], [0, np.nan]])
+    np.testing.assert_allclose(table["port_span"], [[1e-6, 1e-6], [2e-6, np.nan]])
+    np.testing.assert_array_equal(table["port_axis"], [[1, 1], [2, np.nan]])
+    np.testing.assert_array_equal(table["port_direction"], [[1, 0], [1, np.nan]])
+
+    with open(tmp_path / f"{SWEEP_TABLE}.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["gds"] for row in rows] == ["length_1.gds", "length_2.gds"]
+    assert [int(row["n_ports"]) for row in rows] == [2, 1]
+    assert float(rows[0]["port2_x"]) == pytest.approx(10e-6)
+    assert np.isnan(float(rows[1]["port2_x"]))
+
+
+def test_looped_layout_script_reads_the_table() -> None:
+    """The looped script uses the columns written to the sweep table."""
+    script = looped_layout_script(
+        "SiN_layer_builder_v2.lbr", "FDTD", {'"x"': 0}, 1.55, 0.1
+    )
+    assert f'matlabload("{SWEEP_TABLE}.mat")' in script
+    assert "loadgdsfile(gds{i})" in script
+    assert "for (j = 1:n_ports(i))" in script
+    for column in ("x_span", "y_max", "port_x", "port_theta"):
+        assert f"{column}(i" in script
+    assert 'set("x", 0)' in script
+    assert script.count("{") == script.count("}")
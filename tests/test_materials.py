@@ -0,0 +1,77 @@
+"""Test the dispersive material models."""
+
+from __future__ import annotations
+
+import warnings
+
+import numpy as np
+import pytest
+import yaml
+
+from csac_sin_pdk.sin300.cband import PDK
+from csac_sin_pdk.sin300.cband.simulation_tools import materials
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def test_sin_fit_matches_data() -> None:
+    """The SiN fit follows the measured index, SiO2 its Sellmeier model."""
+    wavelength, index = materials.load_index_data()
+    keep = (wavelength >= 0.3) & (wavelength <= 1.7)
+    fitted = materials.n_sin(wavelength[keep])
+    assert fitted.shape == index[keep].shape
+    assert np.abs(fitted - index[keep]).max() < 0.005
+    assert materials.n_sin(1.55) == pytest.approx(1.99, abs=0.005)
+    assert materials.n_sio2(1.55) == pytest.approx(1.444, abs=0.001)
+    assert materials.n_sin(np.full((2, 3), 1.55)).shape == (2, 3)
+
+
+def test_sin_coefficients_refit_when_data_changes(tmp_path) -> None:
+    """Coefficients are only refitted on request, stale caches warn."""
+    wavelength = np.linspace(0.4, 1.7, 50)
+    coeffs = ((2.5, 0.02), (0.1, 20.0))
+    data = tmp_path / "index.csv"
+    cache_file = tmp_path / "coeffs.yaml"
+    index = materials.sellmeier_index(wavelength, coeffs)
+    np.savetxt(data, np.c_[wavelength * 1e3, index], delimiter=",", header="wl,n")
+    with pytest.raises(FileNotFoundError):
+        materials.sin_coefficients(data, cache_file)
+
+    fitted = materials.refit_sin_coefficients(data, cache_file)
+    assert yaml.safe_load(cache_file.read_text())["max_error"] < 1e-4
+    np.testing.assert_allclose(
+        materials.sellmeier_index(wavelength, fitted), index, atol=1e-4
+    )
+
+    # the same values with other line endings are the same data
+    materials.clear_material_cache()
+    data.write_bytes(data.read_bytes().replace(b"\n", b"\r\n"))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert materials.sin_coefficients(data, cache_file) == fitted
+
+    materials.clear_material_cache()
+    cached = cache_file.read_text()
+    np.savetxt(data, np.c_[wavelength * 1e3, index + 0.1], delimiter=",", header="wl,n")
+    with pytest.warns(UserWarning, match="refit_sin_coefficients"):
+        assert materials.sin_coefficients(data, cache_file) == fitted
+    assert cache_file.read_text() == cached
+
+    refitted = materials.refit_sin_coefficients(data, cache_file)
+    assert materials.sin_coefficients(data, cache_file) == refitted
+    assert materials.sellmeier_index(1.55, refitted) == pytest.approx(
+        materials.sellmeier_index(1.55, fitted) + 0.1, abs=1e-3
+    )
+    materials.clear_material_cache()
+
+
+def test_sin_coefficients_match_data() -> None:
+    """The tracked coefficients were fitted from the tracked data."""
+    materials.clear_material_cache()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        materials.sin_coefficients()
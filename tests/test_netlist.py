@@ -0,0 +1,50 @@
+"""Test the memoised netlist extraction."""
+
+from __future__ import annotations
+
+import json
+
+import gdsfactory as gf
+import pytest
+
+from csac_sin_pdk.sin300.cband import PDK
+from csac_sin_pdk.sin300.cband.netlist import NetlistCache, get_netlist
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def dumps(netlist: dict) -> str:
+    """Returns a netlist as canonical JSON."""
+    return json.dumps(netlist, sort_keys=True, default=str)
+
+
+@pytest.mark.parametrize("name", ["ring_single", "ring_double"])
+def test_netlist_matches_gdsfactory(name: str) -> None:
+    """The extracted netlist equals the gdsfactory one."""
+    c = gf.get_component(name)
+    assert dumps(get_netlist(c)) == dumps(c.get_netlist())
+    assert dumps(get_netlist(c, recursive=True)) == dumps(
+        c.get_netlist(recursive=True)
+    )
+
+
+def test_netlist_cache_reextracts_modified_cells() -> None:
+    """Only cells changed since the last call are extracted again."""
+    cache = NetlistCache()
+    c = gf.Component()
+    ring = c << gf.get_component("ring_single")
+    c << gf.get_component("ring_double")
+    first = cache.get_netlist_recursive(c)
+    assert (cache.hits, cache.misses) == (0, 3)
+
+    assert dumps(cache.get_netlist_recursive(c)) == dumps(first)
+    assert (cache.hits, cache.misses) == (3, 3)
+
+    ring.move((100, 0))
+    moved = cache.get_netlist_recursive(c)
+    assert (cache.hits, cache.misses) == (5, 4)
+    assert dumps(moved) == dumps(c.get_netlist(recursive=True))
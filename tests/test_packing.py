@@ -0,0 +1,56 @@
+"""Test the DOE packing engine."""
+
+from __future__ import annotations
+
+import gdsfactory as gf
+import numpy as np
+import pytest
+
+from csac_sin_pdk.sin300.cband import PDK
+from csac_sin_pdk.sin300.cband.packing import pack_components, pack_rectangles
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def overlaps(xy: np.ndarray, sizes: np.ndarray, spacing: float) -> bool:
+    """Returns True if any two rectangles are closer than spacing."""
+    lo = xy - spacing / 2 + 1e-6
+    hi = xy + sizes + spacing / 2 - 1e-6
+    apart = (lo[:, None] >= hi[None]) | (lo[None] >= hi[:, None])
+    touching = ~apart.any(axis=2)
+    np.fill_diagonal(touching, False)
+    return bool(touching.any())
+
+
+@pytest.mark.parametrize("method", ["skyline", "shelf"])
+def test_pack_rectangles(method: str) -> None:
+    """Packed rectangles stay in the strip and keep their spacing."""
+    rng = np.random.default_rng(0)
+    sizes = rng.uniform(5, 200, size=(300, 2))
+    xy = pack_rectangles(sizes, width=1000, spacing=20, method=method)
+    assert xy.min() >= 0
+    assert (xy[:, 0] + sizes[:, 0]).max() <= 1000 + 1e-6
+    assert not overlaps(xy, sizes, spacing=20)
+
+
+def test_pack_rectangles_too_tall() -> None:
+    """Packing raises when the rectangles do not fit the height."""
+    with pytest.raises(ValueError, match="height"):
+        pack_rectangles([(100, 100)] * 20, width=250, height=300)
+
+
+def test_pack_components_floorplan() -> None:
+    """Copies are placed as instance arrays inside the floorplan."""
+    die = gf.Component()
+    die.add_polygon([(0, 0), (3000, 0), (3000, 3000), (0, 3000)], layer="floorplan")
+    c = pack_components(
+        components=("ring_single_shared", "cutback"), copies=(100, 2), floorplan=die
+    )
+    assert c.info["num_cells"] == 102
+    assert len(c.insts) <= 1 + 2 * 2
+    assert c.dbbox().right <= 3000
+    assert c.dbbox().top <= 3000
@@ -0,0 +1,49 @@
+"""Test the build profiler."""
+
+from __future__ import annotations
+
+import gdsfactory as gf
+import pytest
+
+from csac_sin_pdk.sin300.cband import PDK
+from csac_sin_pdk.sin300.cband.profiling import profile
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def test_profile_records_hits_and_misses(tmp_path) -> None:
+    """The first build of a cell is a miss, the cached one a hit."""
+    with profile() as prof:
+        c = gf.get_component("straight", length=17.125)
+        gf.get_component("straight", length=17.125)
+
+    records = [r for r in prof.records if r.name == "straight"]
+    assert [r.cache_hit for r in records] == [False, True]
+    assert {r.cell_name for r in records} == {c.name}
+    assert records[0].vertices == c.kdb_cell.shapes(gf.get_layer("WG")).size() * 4
+    assert records[1].vertices == 0
+    [row] = [row for row in prof.summary() if row.name == "straight"]
+    assert (row.calls, row.hits, row.misses) == (2, 1, 1)
+    assert prof.write_chrome_trace(tmp_path / "trace.json").exists()
+
+
+def test_profile_restores_pdk() -> None:
+    """The cells and routing strategies are unwrapped on exit."""
+    cells = dict(PDK.cells)
+    strategies = dict(PDK.routing_strategies)
+    with pytest.raises(RuntimeError), profile() as prof:
+        assert PDK.cells["straight"] is not cells["straight"]
+        assert all(
+            PDK.routing_strategies[name] is not func
+            for name, func in strategies.items()
+        )
+        raise RuntimeError("build failed")
+    assert prof.records == []
+    assert all(PDK.cells[name] is func for name, func in cells.items())
+    assert all(
+        PDK.routing_strategies[name] is func for name, func in strategies.items()
+    )
@@ -0,0 +1,58 @@
+"""Test the ring resonator DOE arrays."""
+
+from __future__ import annotations
+
+import gdsfactory as gf
+import pytest
+
+from csac_sin_pdk.sin300.cband import PDK
+from csac_sin_pdk.sin300.cband.cells.ring_arrays import (
+    ring_array,
+    ring_label,
+    ring_single_shared,
+)
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def test_ring_array_layout() -> None:
+    """One instance array per unique ring, on the pitch, with one label per copy."""
+    c = ring_array(
+        gaps=(0.2, 0.3), radii=(30, 40), lengths_x=(4,), copies=3, pitch_x=120
+    )
+    assert c.info["num_unique_rings"] == 4
+    assert c.info["num_rings"] == 12
+
+    insts = list(c.insts)
+    assert len(insts) == 4
+    assert all(inst.na == 3 and inst.nb == 1 for inst in insts)
+    assert {inst.instance.da.x for inst in insts} == {120}
+    assert len({inst.cell.name for inst in insts}) == 4
+    xs = sorted({round(inst.dxmin, 3) for inst in insts})
+    assert xs[1] - xs[0] == pytest.approx(3 * 120)
+
+    shapes = c.kdb_cell.shapes(gf.get_layer("labels"))
+    labels = {shape.text_string for shape in shapes.each() if shape.is_text()}
+    assert len(labels) == 12
+    assert ring_label("rings", 40, 0.3, 4, 2) in labels
+
+    with pytest.raises(ValueError):
+        ring_array(copies=0)
+
+
+def test_ring_single_shared_reuses_subcells() -> None:
+    """Rings of a sweep share their bends and straights."""
+    small = ring_single_shared(gap=0.2, radius=30)
+    large = ring_single_shared(gap=0.4, radius=30)
+    cells = {inst.cell.name for inst in small.insts}
+    assert cells == {inst.cell.name for inst in large.insts}
+    assert [p.name for p in small.ports] == ["o1", "o2"]
+    bend = gf.get_component("bend_euler", radius=30, cross_section="strip")
+    assert small.info["length"] == pytest.approx(
+        4 * bend.info["length"] + 2 * 4.0 + 2 * 0.6
+    )
+    assert small.dysize < large.dysize
@@ -0,0 +1,196 @@
+"""Test the routing engines."""
+
+from __future__ import annotations
+
+import gdsfactory as gf
+import pytest
+from kfactory import kdb
+
+from csac_sin_pdk.sin300.cband import PDK
+from csac_sin_pdk.sin300.cband.routing import (
+    RouteCache,
+    astar,
+    get_obstacle_index,
+    partition_bundles,
+    route_bundles,
+    route_cache,
+    routing_context,
+)
+from csac_sin_pdk.sin300.cband.routing.benchmark import synthetic_die
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def route_overlaps(c: gf.Component, layer: str = "WG") -> tuple[int, int]:
+    """Returns the area of routes on top of devices and on top of each other."""
+    layer_index = gf.get_layer(layer)
+    devices = kdb.Region(c.kdb_cell.shapes(layer_index))
+    routes = kdb.Region()
+    for inst in c.kdb_cell.each_inst():
+        routes += kdb.Region(inst.cell.begin_shapes_rec(layer_index)).transformed(
+            inst.cplx_trans
+        )
+    return (routes & devices).area(), routes.area() - routes.merged().area()
+
+
+@pytest.mark.parametrize("wgs_per_bundle", [1, 3])
+def test_route_astar_multires(wgs_per_bundle: int) -> None:
+    """Routes avoid the devices and each other."""
+    c, bundles = synthetic_die(6, wgs_per_bundle=wgs_per_bundle, seed=1)
+    route = PDK.routing_strategies["route_astar_multires"]
+    for ports1, ports2 in bundles:
+        route(c, ports1, ports2)
+    assert route_overlaps(c) == (0, 0)
+
+
+def test_pyramid_is_reused() -> None:
+    """Routing refreshes the cached pyramid instead of rebuilding it."""
+    c, bundles = synthetic_die(2, seed=2)
+    route = PDK.routing_strategies["route_astar_multires"]
+    route(c, *bundles[0])
+    pyramid = astar.get_pyramid(c, ["WG"], grid_unit=2500)
+    route(c, *bundles[1])
+    assert astar.get_pyramid(c, ["WG"], grid_unit=2500) is pyramid
+
+
+def test_obstacle_index_is_incremental() -> None:
+    """Routes are inserted into the index without rebuilding it."""
+    c, bundles = synthetic_die(4, seed=3)
+    index = get_obstacle_index(c, ["WG"])
+    route = PDK.routing_strategies["route_astar_multires"]
+    for ports1, ports2 in bundles:
+        route(c, ports1, ports2)
+    assert get_obstacle_index(c, ["WG"]) is index
+    assert (index.generation, index.revision) == (1, len(bundles))
+    expected = kdb.Region(c.kdb_cell.begin_shapes_rec(gf.get_layer("WG")))
+    assert (index.region() ^ expected).is_empty()
+
+
+def test_obstacle_index_sees_moved_instances() -> None:
+    """Moving an instance between two routes rebuilds the index."""
+    c, bundles = synthetic_die(2, seed=3)
+    route = PDK.routing_strategies["route_astar_multires"]
+    route(c, *bundles[0])
+    index = get_obstacle_index(c, ["WG"])
+    astar.get_pyramid(c, ["WG"], grid_unit=2500)
+    ref = next(iter(c.insts))
+    ref.dmove((0, 500))
+    layer = gf.get_layer("WG")
+
+    assert get_obstacle_index(c, ["WG"]) is index
+    assert index.generation == 2
+    expected = kdb.Region(c.kdb_cell.begin_shapes_rec(layer))
+    assert (index.region() ^ expected).is_empty()
+    assert astar.get_pyramid(c, ["WG"], grid_unit=2500).generation == 2
+
+    route(c, *bundles[1])
+    expected = kdb.Region(c.kdb_cell.begin_shapes_rec(layer))
+    assert (get_obstacle_index(c, ["WG"]).region() ^ expected).is_empty()
+
+
+def test_routing_context_collisions() -> None:
+    """A route drawn on top of an earlier one is reported."""
+    c, bundles = synthetic_die(2, seed=3)
+    with routing_context(check_collisions=True) as context:
+        route = PDK.routing_strategies["route_bundle"]
+        route(c, *bundles[0])
+        with pytest.raises(ValueError, match="overlaps"):
+            route(c, *bundles[0])
+    assert context.routes == 1
+    assert PDK.routing_strategies["route_bundle"] is not route
+
+
+def test_partition_bundles() -> None:
+    """Bundles sharing a device end up in one group, distant ones do not."""
+    _, bundles = synthetic_die(6, seed=1)
+    assert partition_bundles(bundles, margin=100_000) == [[0, 1, 2], [3, 4, 5]]
+    assert partition_bundles(bundles, margin=10_000) == [[i] for i in range(6)]
+
+
+def test_route_bundles_is_deterministic() -> None:
+    """Concurrent routing gives the same layout for any number of workers."""
+    layouts = []
+    for max_workers in (1, 3):
+        c, bundles = synthetic_die(6, wgs_per_bundle=2, seed=1)
+        schedule = route_bundles(c, bundles, max_workers=max_workers)
+        assert len(schedule.waves) == 3
+        assert route_overlaps(c) == (0, 0)
+        layouts.append(kdb.Region(c.kdb_cell.begin_shapes_rec(gf.get_layer("WG"))))
+    assert (layouts[0] ^ layouts[1]).is_empty()
+
+
+@pytest.mark.parametrize("strategy", ["route_bundle", "route_astar_multires"])
+def test_route_cache_replays(strategy: str) -> None:
+    """A rebuilt die replays its routes and gets the same layout."""
+    cache = RouteCache()
+    layouts = []
+    for _ in range(2):
+        c, bundles = synthetic_die(4, seed=4)
+        with route_cache(cache=cache):
+            for ports1, ports2 in bundles:
+                PDK.routing_strategies[strategy](c, ports1, ports2)
+        layouts.append(kdb.Region(c.kdb_cell.begin_shapes_rec(gf.get_layer("WG"))))
+    assert (cache.hits, cache.misses) == (4, 4)
+    assert (layouts[0] ^ layouts[1]).is_empty()
+
+
+def test_route_cache_obstacle_change() -> None:
+    """A new obstacle next to a cached route forces it to be rerouted."""
+    cache = RouteCache()
+    c, bundles = synthetic_die(1, seed=4)
+    with route_cache(cache=cache):
+        routes = PDK.routing_strategies["route_bundle"](c, *bundles[0])
+    x, y = routes[0].instances[0].dcenter
+    c, bundles = synthetic_die(1, seed=4)
+    c.add_polygon([(x, y + 5), (x + 1, y + 5), (x + 1, y + 6), (x, y + 6)], layer="WG")
+    with route_cache(cache=cache):
+        PDK.routing_strategies["route_bundle"](c, *bundles[0])
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def heater_array(
+    n: int, pitch: float = 30.0, pad_pitch: float = 120.0
+) -> tuple[gf.Component, gf.ComponentReference, gf.ComponentReference]:
+    """Returns a column of heaters facing east and a column of pads facing west."""
+    c = gf.Component()
+    heater = gf.get_component(
+        "straight", cross_section="strip_heater_metal", length=200
+    )
+    pad = gf.get_component("straight_metal", length=80, width=80)
+    heaters = gf.Component()
+    pads = gf.Component()
+    for i in range(n):
+        h = heaters << heater
+        h.dmove((0, i * pitch))
+        heaters.add_port(f"e{i}", port=h.ports["e2"])
+    y0 = (n - 1) * pitch / 2 - (n + 3) * pad_pitch / 2
+    for j in range(n + 4):
+        p = pads << pad
+        p.dmove((600 + 20 * n, y0 + j * pad_pitch))
+        pads.add_port(f"e{j}", port=p.ports["e1"])
+    return c, c << heaters, c << pads
+
+
+@pytest.mark.parametrize(
+    "strategy", ["route_fanout_metal", "route_fanout_metal_corner"]
+)
+def test_route_fanout_metal(strategy: str) -> None:
+    """Every heater gets its own pad through wires that never touch."""
+    c, heaters, pads = heater_array(12)
+    route = PDK.routing_strategies[strategy]
+    assigned = route(c, list(heaters.ports), list(pads.ports))
+    ys = [p.dcenter[1] for p in assigned]
+    assert ys == sorted(ys)
+    layer_index = gf.get_layer("PAD")
+    wires = kdb.Region()
+    for inst in c.kdb_cell.each_inst():
+        if inst.cell_index in (heaters.cell.cell_index(), pads.cell.cell_index()):
+            continue
+        wires += kdb.Region(inst.cell.begin_shapes_rec(layer_index)).transformed(
+            inst.cplx_trans
+        )
+    assert wires.merged().count() == len(heaters.ports)
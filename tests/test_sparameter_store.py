@@ -0,0 +1,82 @@
+"""Test the content-addressed S-parameter store."""
+
+from __future__ import annotations
+
+import gdsfactory as gf
+import numpy as np
+import pytest
+
+from csac_sin_pdk.sin300.cband import PDK
+from csac_sin_pdk.sin300.cband.simulation_tools.sparameter_store import (
+    SparameterStore,
+    simulation_key,
+)
+from csac_sin_pdk.sin300.cband.tech import LAYER_STACK
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def sparameters(t: float) -> dict[str, np.ndarray]:
+    """Returns S-parameters with a flat transmission."""
+    wavelengths = np.linspace(1.5, 1.6, 5)
+    return {"o1@0,o2@0": np.full(5, t, dtype=complex), "wavelengths": wavelengths}
+
+
+def test_store_lookup_and_range_queries(tmp_path) -> None:
+    """Entries are found by exact settings and by ranges, blobs are shared."""
+    store = SparameterStore(tmp_path)
+    simulation = {"wavelength": 1.55, "num_freqs": 5}
+    for length in (10, 20, 30):
+        store.put(
+            "coupler",
+            {"length": length, "gap": 0.3},
+            sparameters(length / 100),
+            layer_stack="ls",
+            simulation=simulation,
+        )
+    # identical results share one blob
+    store.put("straight", {"length": 10}, sparameters(0.1), layer_stack="ls")
+    assert len(list(store.blobs.glob("*/*.npz"))) == 3
+
+    sp = store.get("coupler", {"gap": 0.3, "length": 20}, "ls", simulation)
+    np.testing.assert_allclose(sp["o1@0,o2@0"], 0.2)
+    assert store.get("coupler", {"gap": 0.3, "length": 20}, "other", simulation) is None
+
+    entries = store.find("coupler", length=(15, 40), gap=0.3)
+    assert [e.settings["length"] for e in entries] == [20, 30]
+    assert [e.cell for e in store.find(length=10)] == ["coupler", "straight"]
+    assert store.find("coupler", layer_stack="other") == []
+
+
+def test_store_gc_removes_orphans(tmp_path) -> None:
+    """gc drops unreferenced blobs and entries without a blob."""
+    store = SparameterStore(tmp_path)
+    kept = store.put("coupler", {"length": 10}, sparameters(0.1))
+    dropped = store.put("coupler", {"length": 20}, sparameters(0.2))
+    store.delete(dropped.key)
+    assert store.gc() == (1, 0)
+    assert not dropped.path.exists()
+    assert kept.path.exists()
+
+    kept.path.unlink()
+    assert store.gc() == (0, 1)
+    assert store.find("coupler") == []
+
+
+def test_simulation_key_tracks_geometry_and_arguments() -> None:
+    """The key changes with the geometry and the simulation arguments."""
+    simulation = {"wavelength": 1.55, "num_freqs": 21}
+    key = simulation_key(gf.get_component("coupler"), LAYER_STACK, simulation)
+    assert key == simulation_key(
+        gf.get_component("coupler", length=20.0), LAYER_STACK, dict(simulation)
+    )
+    assert key != simulation_key(
+        gf.get_component("coupler", gap=0.5), LAYER_STACK, simulation
+    )
+    assert key != simulation_key(
+        gf.get_component("coupler"), LAYER_STACK, {**simulation, "num_freqs": 11}
+    )
@@ -0,0 +1,104 @@
+"""Test headless sweeps."""
+
+from __future__ import annotations
+
+import csv
+
+import pytest
+import yaml
+
+from csac_sin_pdk.sin300.cband import PDK
+from csac_sin_pdk.sin300.cband.simulation_tools.sweep import (
+    SweepSpec,
+    main,
+    run_sweep,
+    sweep_combinations,
+)
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def test_sweep_combinations_modes() -> None:
+    """Product, zip and sampled combinations."""
+    parameters = {"length": [10, 20], "gap": [0.2, 0.3]}
+    assert len(sweep_combinations(parameters, mode="product")) == 4
+    assert sweep_combinations(parameters, mode="zip")[1] == {"length": 20, "gap": 0.3}
+    sampled = sweep_combinations({"length": (10, 20)}, mode="lhs", samples=5, seed=0)
+    assert all(10 <= combo["length"] <= 20 for combo in sampled)
+
+
+def test_spec_checks() -> None:
+    """Invalid specs raise and ranges become tuples."""
+    with pytest.raises(ValueError):
+        SweepSpec(simulator="tidy3d", cell="coupler", cross_section="strip")
+    with pytest.raises(ValueError):
+        SweepSpec(simulator="fde", cell="coupler")
+    with pytest.raises(ValueError):
+        SweepSpec(simulator="meep", cell="coupler")
+    spec = SweepSpec(
+        simulator="cost",
+        cell="coupler",
+        parameters={"length": {"min": 10, "max": 20}},
+        mode="sobol",
+        samples=4,
+    )
+    assert spec.parameters_swept == {"length": (10, 20)}
+    assert spec.combination_names() == [f"sample_{i}" for i in range(1, 5)]
+
+
+def test_run_sweep_writes_and_resumes(tmp_path) -> None:
+    """Sweeps record errors and skip finished combinations on rerun."""
+    spec = tmp_path / "spec.yaml"
+    spec.write_text(
+        yaml.safe_dump(
+            {
+                "simulator": "cost",
+                "cell": "coupler",
+                "parameters": {"length": [-5, 10, 20], "gap": [0.27]},
+                "simulation": {"min_steps_per_wvl": 10},
+            },
+            sort_keys=False,
+        )
+    )
+    assert main([str(spec), "-o", str(tmp_path / "out"), "-j", "2"]) == 1
+
+    output = tmp_path / "out" / "coupler"
+    with open(output / "results.csv") as f:
+        rows = {row["name"]: row for row in csv.DictReader(f)}
+    assert sorted(rows) == ["length_1gap_1", "length_2gap_1", "length_3gap_1"]
+    assert rows["length_1gap_1"]["status"] == "error"
+    assert "needs to be > 0" in rows["length_1gap_1"]["error"]
+    assert float(rows["length_3gap_1"]["credits"]) > float(
+        rows["length_2gap_1"]["credits"]
+    )
+    assert (output / "length_2gap_1" / "component.gds").exists()
+    assert (output / "length_2gap_1" / "cost.yaml").exists()
+    assert (output / "length_1gap_1" / "error.txt").exists()
+
+    result = run_sweep(spec, output=tmp_path / "out", max_workers=1)
+    statuses = [record["status"] for record in result.records]
+    assert statuses == ["error", "cached", "cached"]
+    assert len(result.failed) == 1
+
+
+def test_run_sweep_lumerical(tmp_path) -> None:
+    """Lumerical inputs go to the output folder and overwrite rewrites them."""
+    spec = SweepSpec(
+        simulator="lumerical", cell="straight", parameters={"length": [10, 20]}
+    )
+    result = run_sweep(spec, output=tmp_path, max_workers=1)
+    assert [record["status"] for record in result.records] == ["done", "done"]
+    assert (result.output / "master_script.lsf").exists()
+    folder = next(result.output.glob("*_length"))
+    assert sorted(p.name for p in folder.glob("*.gds")) == [
+        f"{record['name']}.gds" for record in result.records
+    ]
+
+    result = run_sweep(spec, output=tmp_path, max_workers=1)
+    assert [record["status"] for record in result.records] == ["cached", "cached"]
+    result = run_sweep(spec, output=tmp_path, max_workers=1, overwrite=True)
+    assert [record["status"] for record in result.records] == ["done", "done"]
@@ -0,0 +1,59 @@
+"""Test mirror-symmetry detection."""
+
+from __future__ import annotations
+
+import gdsfactory as gf
+import pytest
+
+from csac_sin_pdk.sin300.cband import PDK
+from csac_sin_pdk.sin300.cband.simulation_tools.symmetry import detect_symmetry
+from csac_sin_pdk.sin300.cband.tech import LAYER_STACK
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+@gf.cell
+def straight_vertical() -> gf.Component:
+    """Returns a straight along y."""
+    c = gf.Component()
+    ref = c << gf.get_component("straight")
+    ref.rotate(90)
+    c.add_ports(ref.ports)
+    return c
+
+
+def test_symmetry_planes_through_all_ports() -> None:
+    """Planes are used only when every port lies on them."""
+    assert detect_symmetry(gf.get_component("straight")).symmetry == (0, -1, 0)
+    assert detect_symmetry(straight_vertical()).symmetry == (-1, 0, 0)
+    tm = detect_symmetry(gf.get_component("straight"), polarization="tm")
+    assert tm.symmetry == (0, 1, 0)
+
+    # mirror symmetric, but every port excites one arm only
+    coupler = detect_symmetry(gf.get_component("coupler"))
+    assert coupler.mirror == (True, True, False)
+    assert coupler.symmetry == (0, 0, 0)
+    assert detect_symmetry(gf.get_component("bend_euler")).mirror[:2] == (False, False)
+
+
+def test_symmetry_z_needs_vertical_sidewalls() -> None:
+    """The z plane needs centred layers with vertical sidewalls."""
+    layer_stack = LAYER_STACK.model_copy(deep=True)
+    layer_stack.layers["core"].sidewall_angle = 0
+    report = detect_symmetry(gf.get_component("straight"), layer_stack)
+    assert report.symmetry == (0, -1, 1)
+    assert report.reduction == 4
+    assert report.center[2] == pytest.approx(0.15)
+
+
+def test_symmetry_off_for_several_modes() -> None:
+    """Modes of both parities would be dropped, so several modes use no plane."""
+    straight = gf.get_component("straight")
+    report = detect_symmetry(straight, num_modes=2)
+    assert report.mirror == detect_symmetry(straight).mirror
+    assert report.symmetry == (0, 0, 0)
+    assert report.reduction == 1
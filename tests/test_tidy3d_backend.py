@@ -0,0 +1,85 @@
+"""Test the tidy3d backend against a local mock of the simulation service."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+import tidy3d as td
+
+from csac_sin_pdk.sin300.cband import PDK, cells
+from csac_sin_pdk.sin300.cband.simulation_tools.batch import BatchManager, MockBackend
+from csac_sin_pdk.sin300.cband.simulation_tools.tidy3D_backend import (
+    CSAC_t3d_write_params,
+)
+
+
+@pytest.fixture(autouse=True)
+def activate_pdk() -> None:
+    """Activate PDK."""
+    PDK.activate()
+
+
+def solve(sim: td.Simulation) -> td.SimulationData:
+    """Returns mode amplitudes of 1 into the source port and 0.5 elsewhere."""
+    [source] = sim.sources
+    data = []
+    for monitor in sim.monitors:
+        num_modes = monitor.mode_spec.num_modes
+        amps = np.full((2, len(monitor.freqs), num_modes), 0.5, dtype=complex)
+        if monitor.name == source.name:
+            # injected amplitude 1, reflected 0.1
+            amps[:] = 0.1
+            amps[["+", "-"].index(source.direction)] = 1.0
+        coords = dict(f=list(monitor.freqs), mode_index=np.arange(num_modes))
+        data.append(
+            td.ModeData(
+                monitor=monitor,
+                amps=td.ModeAmpsDataArray(
+                    amps, coords=dict(direction=["+", "-"], **coords)
+                ),
+                n_complex=td.ModeIndexDataArray(
+                    np.full((len(monitor.freqs), num_modes), 1.5 + 0j),
+                    coords=coords,
+                ),
+            )
+        )
+    return td.SimulationData(simulation=sim, data=data)
+
+
+class SimulationDataBackend(MockBackend):
+    """Mock backend writing tidy3d simulation data files."""
+
+    suffix = ".hdf5"
+
+    def download(self, task_id, path) -> None:
+        """Writes the simulation data of a task."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._tasks[task_id].result().to_file(str(path))
+        self.downloaded += 1
+
+
+def test_write_params_batch_collects_sparameters(tmp_path) -> None:
+    """A batch run assembles and saves the S-parameters of every task."""
+    component = cells.straight(length=2)
+    batch = BatchManager(
+        SimulationDataBackend(solve), tmp_path / "journal.jsonl", poll_interval=0.01
+    )
+    filepath = tmp_path / "straight.npz"
+    kwargs = dict(
+        num_freqs=3,
+        symmetry=(0, 0, 0),
+        dirpath=tmp_path,
+        filepath=filepath,
+        batch=batch,
+    )
+    assert CSAC_t3d_write_params(component, **kwargs) is None
+    assert len(batch.jobs) == 2
+    assert not filepath.exists()
+
+    jobs = batch.run(timeout=60)
+    assert all(job.status == "downloaded" for job in jobs.values())
+    sp = dict(np.load(filepath))
+    assert len(sp["wavelengths"]) == 3
+    np.testing.assert_allclose(sp["o1@0,o2@0"], 0.5)
+    np.testing.assert_allclose(sp["o2@0,o1@0"], 0.5)
+    np.testing.assert_allclose(sp["o1@0,o1@0"], 0.1)